@@ -0,0 +1,144 @@
+# AABBTree: bounding volume hierarchy over face bounding boxes
+# Turns "which faces could this ray / box touch?" into O(log n) candidates instead of an all-faces scan
+import numpy as np
+
+LEAF_SIZE = 4
+
+
+class AABBTree:
+    """
+    Static AABB tree over an (N, 6) array of boxes (xmin, ymin, zmin, xmax, ymax, zmax).
+
+    Nodes are stored in flat NumPy arrays. Each node covers a contiguous run
+    of `order`, so a leaf is just a slice of box indices.
+    """
+
+    def __init__(self, boxes, leaf_size=LEAF_SIZE):
+        """
+        Build the tree by recursively splitting boxes at the median centre along the longest axis.
+
+        Args:
+            boxes (np.ndarray): (N, 6) box array, e.g. BoundingBoxStore.face_boxes
+            leaf_size (int): Maximum number of boxes per leaf
+        """
+        self.boxes = np.asarray(boxes, dtype=float)
+        self.leaf_size = leaf_size
+        count = len(self.boxes)
+        self.order = np.arange(count)
+        max_nodes = max(1, 2 * count)
+        self.node_boxes = np.zeros((max_nodes, 6), dtype=float)
+        self.left = np.full(max_nodes, -1, dtype=np.int64)
+        self.right = np.full(max_nodes, -1, dtype=np.int64)
+        self.start = np.zeros(max_nodes, dtype=np.int64)
+        self.end = np.zeros(max_nodes, dtype=np.int64)
+        self.node_count = 0
+        if count:
+            centres = 0.5 * (self.boxes[:, :3] + self.boxes[:, 3:])
+            self._build(0, count, centres)
+
+    def _build(self, start, end, centres):
+        node = self.node_count
+        self.node_count += 1
+        members = self.order[start:end]
+        self.node_boxes[node, :3] = self.boxes[members, :3].min(axis=0)
+        self.node_boxes[node, 3:] = self.boxes[members, 3:].max(axis=0)
+        self.start[node], self.end[node] = start, end
+        if end - start <= self.leaf_size:
+            return node
+
+        spread = centres[members].max(axis=0) - centres[members].min(axis=0)
+        axis = int(np.argmax(spread))
+        mid = (end - start) // 2
+        split = np.argpartition(centres[members, axis], mid)
+        self.order[start:end] = members[split]
+        self.left[node] = self._build(start, start + mid, centres)
+        self.right[node] = self._build(start + mid, end, centres)
+        return node
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _is_leaf(self, node):
+        return self.left[node] < 0
+
+    def query_box(self, box):
+        """
+        Return the indices of all boxes overlapping a query box.
+
+        Args:
+            box: (6,) query box (xmin, ymin, zmin, xmax, ymax, zmax)
+
+        Returns:
+            list: Indices into the original box array
+        """
+        if not self.node_count:
+            return []
+        box = np.asarray(box, dtype=float)
+        lo, hi = box[:3], box[3:]
+        hits = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            bounds = self.node_boxes[node]
+            if np.any(bounds[:3] > hi) or np.any(bounds[3:] < lo):
+                continue
+            if self._is_leaf(node):
+                members = self.order[self.start[node]:self.end[node]]
+                leaf_boxes = self.boxes[members]
+                overlap = np.all(leaf_boxes[:, :3] <= hi, axis=1) & np.all(leaf_boxes[:, 3:] >= lo, axis=1)
+                hits.extend(members[overlap].tolist())
+            else:
+                stack.append(self.left[node])
+                stack.append(self.right[node])
+        return hits
+
+    def query_ray(self, origin, direction, t_max=np.inf, padding=0.0):
+        """
+        Return the indices of all boxes a ray passes through.
+
+        Args:
+            origin: (3,) ray origin
+            direction: (3,) ray direction (need not be normalized)
+            t_max (float): Ignore boxes entered beyond this ray parameter
+            padding (float): Grow every box by this amount before testing (absorbs tolerances)
+
+        Returns:
+            list: Indices into the original box array
+        """
+        if not self.node_count:
+            return []
+        origin = np.asarray(origin, dtype=float)
+        direction = np.asarray(direction, dtype=float)
+        with np.errstate(divide='ignore'):
+            inverse = 1.0 / direction
+        hits = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if not _ray_hits_boxes(self.node_boxes[node:node + 1], origin, inverse, t_max, padding)[0]:
+                continue
+            if self._is_leaf(node):
+                members = self.order[self.start[node]:self.end[node]]
+                mask = _ray_hits_boxes(self.boxes[members], origin, inverse, t_max, padding)
+                hits.extend(members[mask].tolist())
+            else:
+                stack.append(self.left[node])
+                stack.append(self.right[node])
+        return hits
+
+
+def _ray_hits_boxes(boxes, origin, inverse, t_max, padding):
+    """Vectorized slab test of one ray against a (K, 6) box array."""
+    lo = boxes[:, :3] - padding
+    hi = boxes[:, 3:] + padding
+    with np.errstate(invalid='ignore'):
+        t1 = (lo - origin) * inverse
+        t2 = (hi - origin) * inverse
+    # Axis-parallel rays give 0 * inf = nan: inside the slab -> unbounded, outside -> miss
+    parallel = ~np.isfinite(inverse)
+    inside = (origin >= lo) & (origin <= hi)
+    t_near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    t_far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+    enter = np.maximum(t_near.max(axis=1), 0.0)
+    leave = np.minimum(t_far.min(axis=1), t_max)
+    return enter <= leave
@@ -5,6 +5,8 @@ from flask import Flask, render_template, request, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
 from cad_analyzer import CADAnalyzer
 from cad_classifier import CADClassifier
+from batch_classify import file_sha256
+from fingerprint_index import FingerprintIndex, compute_fingerprint
 from OCC.Core.IFSelect import IFSelect_RetDone
 from OCC.Core.BRepBndLib import brepbndlib
 from OCC.Core.BRepGProp import brepgprop
@@ -33,6 +35,10 @@ print(f"Upload directory contents: {os.listdir(app.config['UPLOAD_FOLDER'])}")
 
 ALLOWED_EXTENSIONS = {'step', 'stp'}
 
+# Fingerprints of every analyzed part, used to find similar prior uploads
+FINGERPRINT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fingerprints')
+fingerprint_index = FingerprintIndex(FINGERPRINT_FOLDER)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -81,9 +87,30 @@ def upload_file():
             bounding_box = analyzer.get_bounding_box()
             print(f"Got bounding box: {bounding_box}")
             
-            features, analysis = analyzer.detect_features()
+            content_hash = file_sha256(step_path)
+            cached = fingerprint_index.get(content_hash)
+            if cached:
+                print(f"Reusing cached analysis for identical part {content_hash[:12]}")
+                features, analysis = cached['features'], cached['analysis']
+            else:
+                features, analysis = analyzer.detect_features()
             print(f"Detected {len(features)} features after post-processing")
             
+            fingerprint = compute_fingerprint(features, analysis, bounding_box)
+            similar_parts = [{
+                'content_hash': match['key'],
+                'filename': match['payload'].get('filename'),
+                'distance': match['distance'],
+            } for match in fingerprint_index.query(fingerprint, k=5, exclude=content_hash)]
+            print(f"Found {len(similar_parts)} similar prior parts")
+            if not cached:
+                fingerprint_index.add(content_hash, fingerprint, {
+                    'filename': filename,
+                    'bounding_box': bounding_box,
+                    'features': features,
+                    'analysis': analysis,
+                })
+            
             print(f"Exporting STL to {stl_path}")
             analyzer.export_stl(stl_path)
             print(f"STL file exists after export: {os.path.exists(stl_path)}")
@@ -95,6 +122,7 @@ def upload_file():
                 'bounding_box': bounding_box,
                 'features': features,
                 'analysis': analysis,
+                'similar_parts': similar_parts,
                 'mesh_url': f'/mesh/{file_id}.stl'
             }
             print(f"Sending response: {response_data}")
@@ -0,0 +1,294 @@
+# Batch classifier: run CADAnalyzer + CADClassifier over a directory of STEP files
+# Usage: python batch_classify.py <dir-or-glob> -o results.jsonl [-j 8] [--timeout 300]
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+import traceback
+
+STEP_EXTENSIONS = ('.step', '.stp')
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def collect_step_files(source):
+    """
+    Expand a directory or glob pattern into a sorted list of STEP files.
+
+    Args:
+        source (str): Directory (searched recursively) or glob pattern
+
+    Returns:
+        list: Absolute paths of matching STEP files
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, names in os.walk(source):
+            paths.extend(os.path.join(root, n) for n in names if n.lower().endswith(STEP_EXTENSIONS))
+    else:
+        paths = [p for p in glob.glob(source, recursive=True) if p.lower().endswith(STEP_EXTENSIONS)]
+    return sorted(os.path.abspath(p) for p in paths)
+
+
+def classify_file(path, verbose=False):
+    """
+    Analyze and classify a single STEP file.
+
+    Args:
+        path (str): Path to the STEP file
+        verbose (bool): Keep the analyzer/classifier debug output
+
+    Returns:
+        dict: Result row with features and timing columns (seconds)
+    """
+    row = {'path': path, 'status': 'ok', 'error': None}
+    start = time.perf_counter()
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        # Imported here so the parent process never loads OCC
+        from cad_classifier import CADClassifier
+        with sink:
+            classifier = CADClassifier(path)
+            loaded = time.perf_counter()
+            features = classifier.classify_features()
+            classified = time.perf_counter()
+        row.update({
+            'bounding_box': classifier.overall_dimensions,
+            'feature_count': len(features),
+            'feature_types': _count_types(features),
+            'analyzer_feature_types': classifier.analyzer_analysis.get('feature_types', {}),
+            'features': features,
+            'load_seconds': loaded - start,
+            'classify_seconds': classified - loaded,
+        })
+    except Exception as e:
+        row.update({'status': 'error', 'error': f"{type(e).__name__}: {e}", 'traceback': traceback.format_exc()})
+    row['total_seconds'] = time.perf_counter() - start
+    return row
+
+
+def _count_types(features):
+    counts = {}
+    for feature in features:
+        counts[feature['type']] = counts.get(feature['type'], 0) + 1
+    return counts
+
+
+def _worker(conn, verbose):
+    """Child process entry point: classify each path received on `conn` until None arrives."""
+    try:
+        while True:
+            path = conn.recv()
+            if path is None:
+                break
+            conn.send(classify_file(path, verbose))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
+
+
+class _Worker:
+    """A long-lived classifier process and the file it is working on, if any."""
+
+    def __init__(self, ctx, verbose):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(child_conn, verbose), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.job = None  # (path, sha256, started)
+
+    def submit(self, path, sha):
+        self.conn.send(path)
+        self.job = (path, sha, time.perf_counter())
+
+    def stop(self, kill=False):
+        """Let the process exit after its current file, or terminate it right away."""
+        if not kill:
+            try:
+                self.conn.send(None)
+            except OSError:
+                kill = True
+        if kill:
+            self.process.terminate()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def run_pool(jobs, workers, timeout, verbose=False):
+    """
+    Classify files with at most `workers` long-lived processes, killing any file that exceeds `timeout`.
+
+    Each worker pays the interpreter start and the OCC import once and then
+    classifies files one at a time. Only a worker whose file timed out or
+    crashed is replaced: a stuck OCC call can only be stopped by terminating
+    its process, which is what keeps the per-file timeout enforceable.
+
+    Args:
+        jobs (list): (path, sha256) pairs to classify
+        workers (int): Maximum number of concurrent processes
+        timeout (float): Per-file wall clock limit in seconds
+        verbose (bool): Keep the analyzer/classifier debug output
+
+    Yields:
+        dict: One result row per file, in completion order
+    """
+    ctx = multiprocessing.get_context()
+    pending = list(reversed(jobs))
+    pool = []
+
+    try:
+        while pending or any(worker.job for worker in pool):
+            for worker in pool:
+                if worker.job is None and pending:
+                    worker.submit(*pending.pop())
+            while pending and len(pool) < workers:
+                worker = _Worker(ctx, verbose)
+                worker.submit(*pending.pop())
+                pool.append(worker)
+
+            busy = [worker for worker in pool if worker.job]
+            multiprocessing.connection.wait([worker.conn for worker in busy], timeout=0.5)
+            now = time.perf_counter()
+            for worker in busy:
+                path, sha, started = worker.job
+                row, broken = None, True
+                if worker.conn.poll():
+                    try:
+                        row, broken = worker.conn.recv(), False
+                    except EOFError:
+                        worker.process.join(timeout=5)
+                        row = {'path': path, 'status': 'error',
+                               'error': f"Worker exited with code {worker.process.exitcode}"}
+                elif now - started > timeout:
+                    row = {'path': path, 'status': 'timeout', 'error': f"Exceeded {timeout:.0f}s timeout"}
+                elif not worker.process.is_alive():
+                    row = {'path': path, 'status': 'error',
+                           'error': f"Worker exited with code {worker.process.exitcode}"}
+                if row is None:
+                    continue
+                worker.job = None
+                if broken:
+                    # The next free slot starts a fresh process
+                    worker.stop(kill=True)
+                    pool.remove(worker)
+                row['sha256'] = sha
+                row.setdefault('total_seconds', now - started)
+                yield row
+    finally:
+        for worker in pool:
+            worker.stop(kill=worker.job is not None)
+
+
+def _output_format(path, requested):
+    if requested:
+        return requested
+    return 'parquet' if path.lower().endswith('.parquet') else 'jsonl'
+
+
+def load_completed(output, fmt):
+    """
+    Read previous results and return them with the set of hashes already done.
+
+    Only rows with status 'ok' count as done, so errors and timeouts are retried.
+    """
+    if not os.path.exists(output):
+        return [], set()
+    if fmt == 'parquet':
+        import pandas as pd
+        rows = pd.read_parquet(output).to_dict('records')
+    else:
+        with open(output) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    done = {r['sha256'] for r in rows if r.get('status') == 'ok'}
+    return rows, done
+
+
+def write_parquet(rows, output):
+    """Write rows to Parquet, JSON-encoding the nested columns."""
+    import pandas as pd
+    nested = ('bounding_box', 'feature_types', 'analyzer_feature_types', 'features')
+    flat = []
+    for row in rows:
+        row = dict(row)
+        for key in nested:
+            if key in row and not isinstance(row[key], str):
+                row[key] = json.dumps(row[key], default=float)
+        flat.append(row)
+    pd.DataFrame(flat).to_parquet(output, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify a directory of STEP files in parallel.")
+    parser.add_argument('source', help="Directory (searched recursively) or glob pattern of STEP files")
+    parser.add_argument('-o', '--output', default='results.jsonl', help="Output file (.jsonl or .parquet)")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], help="Output format (default: from extension)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument('--timeout', type=float, default=300.0, help="Per-file timeout in seconds")
+    parser.add_argument('--no-resume', action='store_true', help="Reprocess files that are already in the output")
+    parser.add_argument('--verbose', action='store_true', help="Show analyzer/classifier debug output")
+    args = parser.parse_args(argv)
+
+    fmt = _output_format(args.output, args.format)
+    files = collect_step_files(args.source)
+    print(f"Found {len(files)} STEP files in {args.source}")
+
+    previous, done = ([], set()) if args.no_resume else load_completed(args.output, fmt)
+    jobs = []
+    for path in files:
+        sha = file_sha256(path)
+        if sha in done:
+            continue
+        done.add(sha)  # identical copies are only classified once
+        jobs.append((path, sha))
+    print(f"Skipping {len(files) - len(jobs)} already classified files, processing {len(jobs)}")
+
+    # Keep previous successes, drop stale failures that are being retried
+    retrying = {sha for _, sha in jobs}
+    rows = [r for r in previous if r.get('sha256') not in retrying]
+    if fmt == 'jsonl':
+        with open(args.output, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row, default=float) + '\n')
+
+    counts = {'ok': 0, 'error': 0, 'timeout': 0}
+    start = time.perf_counter()
+    out = open(args.output, 'a') if fmt == 'jsonl' else None
+    try:
+        for i, row in enumerate(run_pool(jobs, max(1, args.workers), args.timeout, args.verbose), 1):
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+            print(f"[{i}/{len(jobs)}] {row['status']:7s} {row['total_seconds']:7.2f}s {os.path.basename(row['path'])}")
+            if out:
+                out.write(json.dumps(row, default=float) + '\n')
+                out.flush()
+            else:
+                rows.append(row)
+    finally:
+        if out:
+            out.close()
+        else:
+            write_parquet(rows, args.output)
+
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f}s: {counts['ok']} ok, {counts['error']} errors, {counts['timeout']} timeouts")
+    return 0 if not counts['error'] and not counts['timeout'] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
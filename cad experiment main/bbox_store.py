@@ -0,0 +1,150 @@
+# BoundingBoxStore: per-shape cache of face and shape bounding boxes
+# Built once per CADAnalyzer so classifiers never call brepbndlib twice for the same face
+import numpy as np
+from OCC.Core.BRepBndLib import brepbndlib
+from OCC.Core.Bnd import Bnd_Box, Bnd_OBB
+from OCC.Core.BRepIntCurveSurface import BRepIntCurveSurface_Inter
+from OCC.Core.gp import gp_Dir, gp_Lin, gp_Pnt
+from OCC.Core.TopAbs import TopAbs_FACE
+from OCC.Core.TopExp import topexp
+from OCC.Core.TopTools import TopTools_IndexedMapOfShape
+from aabb_tree import AABBTree
+
+# Column layout of every box row: xmin, ymin, zmin, xmax, ymax, zmax
+XMIN, YMIN, ZMIN, XMAX, YMAX, ZMAX = range(6)
+
+
+class BoundingBoxStore:
+    """
+    Face-indexed bounding box table for a single shape.
+
+    Faces are indexed through a TopTools_IndexedMapOfShape, so the same face
+    reached from different explorers (or from a cluster list) resolves to the
+    same row of `face_boxes`.
+    """
+
+    def __init__(self, shape, optimal=False, oriented=False):
+        """
+        Compute the bounding boxes of the shape and every one of its faces.
+
+        Args:
+            shape: The TopoDS_Shape to index
+            optimal (bool): Use brepbndlib.AddOptimal (tighter, slower) instead of brepbndlib.Add
+            oriented (bool): Also compute oriented boxes (Bnd_OBB) for every face
+        """
+        self.shape = shape
+        self.optimal = optimal
+        self.face_map = TopTools_IndexedMapOfShape()
+        topexp.MapShapes(shape, TopAbs_FACE, self.face_map)
+
+        count = self.face_map.Size()
+        self.faces = [self.face_map.FindKey(i + 1) for i in range(count)]
+        self.face_boxes = np.zeros((count, 6), dtype=float)
+        for i, face in enumerate(self.faces):
+            self.face_boxes[i] = self._compute_box(face)
+        self.shape_box = self._compute_box(shape)
+        self._tree = None
+
+        # Full OBB dimensions per face, sorted largest first (N, 3)
+        self.face_obb_extents = None
+        if oriented:
+            self.face_obb_extents = np.zeros((count, 3), dtype=float)
+            for i, face in enumerate(self.faces):
+                obb = Bnd_OBB()
+                brepbndlib.AddOBB(face, obb, True, self.optimal, False)
+                if not obb.IsVoid():
+                    half = sorted([obb.XHSize(), obb.YHSize(), obb.ZHSize()], reverse=True)
+                    self.face_obb_extents[i] = 2.0 * np.array(half)
+
+        print(f"Built bounding box store for {count} faces")
+
+    def _compute_box(self, shape):
+        """Return the axis-aligned box of a shape as a (6,) array."""
+        bbox = Bnd_Box()
+        if self.optimal:
+            brepbndlib.AddOptimal(shape, bbox, True, False)
+        else:
+            brepbndlib.Add(shape, bbox)
+        if bbox.IsVoid():
+            return np.zeros(6, dtype=float)
+        return np.array(bbox.Get(), dtype=float)
+
+    def __len__(self):
+        return len(self.faces)
+
+    def index_of(self, face):
+        """
+        Return the 0-based row of a face, or -1 if the face is not part of the shape.
+        """
+        return self.face_map.FindIndex(face) - 1
+
+    def indices_of(self, faces):
+        """Return the rows of several faces as an integer array."""
+        return np.array([self.index_of(f) for f in faces], dtype=int)
+
+    def face_box(self, face):
+        """
+        Return the (6,) box of a face: xmin, ymin, zmin, xmax, ymax, zmax.
+
+        Faces that are not in the store (e.g. built after the store) are boxed on demand.
+        """
+        index = self.index_of(face)
+        if index < 0:
+            return self._compute_box(face)
+        return self.face_boxes[index]
+
+    def face_extents(self, face):
+        """Return the (3,) X/Y/Z spans of a face."""
+        box = self.face_box(face)
+        return box[3:] - box[:3]
+
+    def shape_extents(self):
+        """Return the (3,) X/Y/Z spans of the whole shape."""
+        return self.shape_box[3:] - self.shape_box[:3]
+
+    @property
+    def tree(self):
+        """AABB tree over the face boxes, built on first spatial query."""
+        if self._tree is None:
+            self._tree = AABBTree(self.face_boxes)
+        return self._tree
+
+    def faces_overlapping(self, box, exclude=()):
+        """Return the rows of faces whose boxes overlap a (6,) query box."""
+        return [i for i in self.tree.query_box(box) if i not in exclude]
+
+    def ray_hits(self, origin, direction, exclude=(), t_max=np.inf, tolerance=1e-3):
+        """
+        Intersect a ray with the faces of the shape.
+
+        The AABB tree narrows the faces down to those whose boxes the ray
+        crosses; only those get an exact BRepIntCurveSurface test.
+
+        Args:
+            origin: (3,) ray origin
+            direction: (3,) ray direction
+            exclude: Face rows to ignore (e.g. the face being tested)
+            t_max (float): Ignore hits further than this distance
+            tolerance (float): Intersection tolerance
+
+        Returns:
+            list: (distance, face row) pairs sorted by distance
+        """
+        origin = np.asarray(origin, dtype=float)
+        direction = np.asarray(direction, dtype=float)
+        direction = direction / np.linalg.norm(direction)
+        candidates = self.tree.query_ray(origin, direction, t_max, padding=tolerance)
+        line = gp_Lin(gp_Pnt(*origin), gp_Dir(*direction))
+        hits = []
+        for i in candidates:
+            if i in exclude:
+                continue
+            intersector = BRepIntCurveSurface_Inter()
+            intersector.Init(self.faces[i], line, tolerance)
+            while intersector.More():
+                distance = intersector.W()
+                if 0.0 <= distance <= t_max:
+                    hits.append((distance, i))
+                intersector.Next()
+        hits.sort()
+        return hits
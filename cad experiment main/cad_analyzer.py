@@ -1,15 +1,13 @@
 import os
 import traceback
-import math
+import numpy as np
 from OCC.Core.STEPControl import STEPControl_Reader
 from OCC.Core.IFSelect import IFSelect_RetDone
-from OCC.Core.BRepBndLib import brepbndlib
 from OCC.Core.BRepGProp import brepgprop
-from OCC.Core.Bnd import Bnd_Box
-from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_EDGE, TopAbs_VERTEX
+from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_EDGE, TopAbs_VERTEX, TopAbs_REVERSED
 from OCC.Core.TopExp import TopExp_Explorer
 from OCC.Core.BRepAdaptor import BRepAdaptor_Surface, BRepAdaptor_Curve
-from OCC.Core.GeomAbs import GeomAbs_Plane, GeomAbs_Cylinder, GeomAbs_Cone, GeomAbs_Line
+from OCC.Core.GeomAbs import GeomAbs_Plane, GeomAbs_Cylinder, GeomAbs_Cone, GeomAbs_Line, GeomAbs_Sphere, GeomAbs_Torus
 from OCC.Core.StlAPI import StlAPI_Writer
 from OCC.Core.GProp import GProp_GProps
 from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
@@ -17,6 +15,50 @@ from OCC.Core.gp import gp_Pnt, gp_Vec, gp_Dir
 from OCC.Core.BRep import BRep_Tool
 from OCC.Core.BRepIntCurveSurface import BRepIntCurveSurface_Inter
 from OCC.Core.gp import gp_Lin
+from OCC.Core.TopLoc import TopLoc_Location
+from OCC.Core.TopoDS import topods
+from bbox_store import BoundingBoxStore
+from cad_faces import classify_faces
+
+# Linear deflection used for the STL mesh and the approximate mass properties
+MESH_DEFLECTION = 0.1
+
+
+def mesh_mass_properties(vertices, triangles):
+    """
+    Compute volume, surface area and centroid of a closed triangle mesh.
+
+    Uses signed tetrahedra against a reference point: each outward-facing
+    triangle (v0, v1, v2) contributes dot(v0, cross(v1, v2)) / 6 to the volume.
+
+    Args:
+        vertices (np.ndarray): (N, 3) vertex coordinates
+        triangles (np.ndarray): (M, 3) vertex indices, counter-clockwise seen from outside
+
+    Returns:
+        dict: volume, surface_area and centroid (x, y, z)
+    """
+    if len(triangles) == 0:
+        return {'volume': 0.0, 'surface_area': 0.0, 'centroid': {'x': 0.0, 'y': 0.0, 'z': 0.0}}
+    # Shift to the vertex mean to keep the signed sums well conditioned far from the origin
+    origin = vertices.mean(axis=0)
+    v0 = vertices[triangles[:, 0]] - origin
+    v1 = vertices[triangles[:, 1]] - origin
+    v2 = vertices[triangles[:, 2]] - origin
+
+    surface_area = 0.5 * np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1).sum()
+    signed = np.einsum('ij,ij->i', v0, np.cross(v1, v2)) / 6.0
+    volume = signed.sum()
+    if abs(volume) > 0:
+        centroid = (signed[:, None] * (v0 + v1 + v2)).sum(axis=0) / (4.0 * volume) + origin
+    else:
+        centroid = origin
+    return {
+        'volume': float(abs(volume)),
+        'surface_area': float(surface_area),
+        'centroid': {'x': float(centroid[0]), 'y': float(centroid[1]), 'z': float(centroid[2])}
+    }
+
 
 class CADAnalyzer:
     """
@@ -24,12 +66,14 @@ class CADAnalyzer:
     Provides comprehensive analysis of manufacturing features, tolerances, and geometric properties.
     """
     
-    def __init__(self, filepath):
+    def __init__(self, filepath, exact_mass_properties=False):
         """
         Initialize the CAD analyzer with a STEP file.
         
         Args:
             filepath (str): Path to the STEP file to analyze
+            exact_mass_properties (bool): Use exact brepgprop integration for volume and
+                area in the manufacturing analysis instead of the mesh approximation
             
         Raises:
             ValueError: If the file cannot be read or contains invalid data
@@ -54,6 +98,10 @@ class CADAnalyzer:
             if self.shape.IsNull():
                 raise ValueError("No valid shape found in STEP file")
             
+            self.exact_mass_properties = exact_mass_properties
+            self._bbox_store = None
+            self._mesh_deflection = None
+            self._mass_properties = None
             print("CADAnalyzer initialization successful")
         except Exception as e:
             print(f"Error in CADAnalyzer initialization: {str(e)}")
@@ -61,27 +109,38 @@ class CADAnalyzer:
             print(traceback.format_exc())
             raise
         
+    @property
+    def bbox_store(self):
+        """Face and shape bounding boxes, computed once on first access."""
+        if self._bbox_store is None:
+            self._bbox_store = BoundingBoxStore(self.shape)
+        return self._bbox_store
+
     def get_bounding_box(self):
-        bbox = Bnd_Box()
-        brepbndlib.Add(self.shape, bbox)
-        xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
+        xmin, ymin, zmin, xmax, ymax, zmax = self.bbox_store.shape_box
         return {
-            'x': xmax - xmin,
-            'y': ymax - ymin,
-            'z': zmax - zmin
+            'x': float(xmax - xmin),
+            'y': float(ymax - ymin),
+            'z': float(zmax - zmin)
         }
     
+    def _ensure_mesh(self, deflection=MESH_DEFLECTION):
+        """Triangulate the shape once; later calls with the same or a coarser deflection are free."""
+        if self._mesh_deflection is not None and self._mesh_deflection <= deflection:
+            return
+        print("Creating mesh from shape...")
+        mesh = BRepMesh_IncrementalMesh(self.shape, deflection)
+        mesh.Perform()
+        print("Mesh creation completed")
+        if not mesh.IsDone():
+            raise Exception("Failed to create mesh from shape")
+        self._mesh_deflection = deflection
+
     def export_stl(self, out_path):
         print(f"Exporting STL to: {out_path}")
         try:
-            # Create a mesh from the shape
-            print("Creating mesh from shape...")
-            mesh = BRepMesh_IncrementalMesh(self.shape, 0.1)  # 0.1 is the linear deflection
-            mesh.Perform()
-            print("Mesh creation completed")
-            
-            if not mesh.IsDone():
-                raise Exception("Failed to create mesh from shape")
+            # Create a mesh from the shape (reused if the mass properties already built it)
+            self._ensure_mesh()
             
             # Create a new writer
             writer = StlAPI_Writer()
@@ -249,14 +308,17 @@ class CADAnalyzer:
                 - tolerances: Recommended tolerances for features
                 - material_volume: Total volume of the part
                 - surface_area: Total surface area
+                - mass_properties: Volume, area, centroid and error bounds (see calculate_mass_properties)
                 - manufacturing_notes: List of manufacturing considerations
         """
+        mass_properties = self.calculate_mass_properties(exact=self.exact_mass_properties)
         manufacturing_analysis = {
             'wall_thickness': self.analyze_wall_thickness(),
             'surface_finish': self.analyze_surface_finish(),
             'tolerances': self.analyze_tolerances(),
-            'material_volume': self.calculate_volume(),
-            'surface_area': self.calculate_surface_area(),
+            'material_volume': mass_properties['volume'],
+            'surface_area': mass_properties['surface_area'],
+            'mass_properties': mass_properties,
             'manufacturing_notes': []
         }
         
@@ -286,9 +348,7 @@ class CADAnalyzer:
         """
         try:
             print("Starting wall thickness analysis...")
-            bbox = Bnd_Box()
-            brepbndlib.Add(self.shape, bbox)
-            xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
+            xmin, ymin, zmin, xmax, ymax, zmax = self.bbox_store.shape_box
             
             # Define sampling parameters - increased spacing for better performance
             sample_spacing = 10.0  # mm between sample points
@@ -521,10 +581,7 @@ class CADAnalyzer:
             explorer.Next()
         
         # Add general tolerance recommendations based on feature size
-        bbox = Bnd_Box()
-        brepbndlib.Add(self.shape, bbox)
-        xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
-        max_dimension = max(xmax - xmin, ymax - ymin, zmax - zmin)
+        max_dimension = float(self.bbox_store.shape_extents().max())
         
         # Recommend tolerance grades based on part size
         if max_dimension <= 50:
@@ -548,28 +605,151 @@ class CADAnalyzer:
         
         return tolerance_analysis
 
-    def calculate_volume(self):
+    def calculate_volume(self, exact=False):
         """
         Calculate the total volume of the part.
         
+        Args:
+            exact (bool): Integrate the B-rep with brepgprop instead of using the mesh approximation
+        
         Returns:
             float: Volume in cubic millimeters
         """
+        if not exact:
+            return self.calculate_mass_properties()['volume']
         props = GProp_GProps()
         brepgprop.VolumeProperties(self.shape, props)
         return props.Mass()  # Mass is equivalent to volume for uniform density
 
-    def calculate_surface_area(self):
+    def calculate_surface_area(self, exact=False):
         """
         Calculate the total surface area of the part.
         
+        Args:
+            exact (bool): Integrate the B-rep with brepgprop instead of using the mesh approximation
+        
         Returns:
             float: Surface area in square millimeters
         """
+        if not exact:
+            return self.calculate_mass_properties()['surface_area']
         props = GProp_GProps()
         brepgprop.SurfaceProperties(self.shape, props)
         return props.Mass()  # Mass is equivalent to area for surface properties
 
+    def calculate_mass_properties(self, exact=False, deflection=MESH_DEFLECTION):
+        """
+        Calculate volume, surface area and centroid of the part.
+        
+        The approximate path sums signed tetrahedra over the triangulation that
+        STL export uses, which is much cheaper than brepgprop on freeform parts.
+        
+        Args:
+            exact (bool): Use brepgprop integration (error bounds are then 0)
+            deflection (float): Linear mesh deflection for the approximate path
+        
+        Returns:
+            dict: Mass properties containing:
+                - volume: Volume in cubic millimeters
+                - surface_area: Surface area in square millimeters
+                - centroid: Centre of mass {'x', 'y', 'z'}
+                - volume_error_bound: Upper bound on |exact - approximate| volume
+                - area_error_estimate: First-order estimate of the area error
+                - method: 'exact' or 'mesh'
+        """
+        if exact:
+            props = GProp_GProps()
+            brepgprop.VolumeProperties(self.shape, props)
+            centre = props.CentreOfMass()
+            return {
+                'volume': props.Mass(),
+                'surface_area': self.calculate_surface_area(exact=True),
+                'centroid': {'x': centre.X(), 'y': centre.Y(), 'z': centre.Z()},
+                'volume_error_bound': 0.0,
+                'area_error_estimate': 0.0,
+                'method': 'exact'
+            }
+        
+        if self._mass_properties is not None and self._mass_properties['deflection'] == deflection:
+            return self._mass_properties
+        
+        self._ensure_mesh(deflection)
+        vertices, triangles, min_radius, missing = self._collect_triangulation()
+        if missing:
+            print(f"Warning: {missing} faces have no triangulation, mass properties are partial")
+        result = mesh_mass_properties(vertices, triangles)
+        
+        # Every mesh point lies within the deflection of the true surface, so the
+        # enclosed volume differs by at most deflection * area. For a curved face of
+        # radius R the chord sag d shrinks the area by roughly d / R.
+        result['volume_error_bound'] = deflection * result['surface_area']
+        result['area_error_estimate'] = result['surface_area'] * deflection / min_radius if min_radius else 0.0
+        result['deflection'] = deflection
+        result['method'] = 'mesh'
+        result['missing_faces'] = missing
+        self._mass_properties = result
+        return result
+
+    def _collect_triangulation(self):
+        """
+        Gather the per-face triangulations into one vertex and triangle array.
+        
+        Returns:
+            tuple: (vertices (N, 3), triangles (M, 3), smallest curvature radius or None, faces without a mesh)
+        """
+        vertex_blocks = []
+        triangle_blocks = []
+        offset = 0
+        missing = 0
+        min_radius = None
+        explorer = TopExp_Explorer(self.shape, TopAbs_FACE)
+        while explorer.More():
+            face = topods.Face(explorer.Current())
+            explorer.Next()
+            
+            radius = self._curvature_radius(face)
+            if radius and (min_radius is None or radius < min_radius):
+                min_radius = radius
+            
+            location = TopLoc_Location()
+            triangulation = BRep_Tool.Triangulation(face, location)
+            if triangulation is None or triangulation.NbTriangles() == 0:
+                missing += 1
+                continue
+            trsf = location.Transformation()
+            nodes = np.array([
+                triangulation.Node(i).Transformed(trsf).Coord()
+                for i in range(1, triangulation.NbNodes() + 1)
+            ], dtype=float)
+            triangles = np.array([
+                triangulation.Triangle(i).Get()
+                for i in range(1, triangulation.NbTriangles() + 1)
+            ], dtype=np.int64) - 1
+            # Reversed faces have inward-wound triangles
+            if face.Orientation() == TopAbs_REVERSED:
+                triangles = triangles[:, [0, 2, 1]]
+            vertex_blocks.append(nodes)
+            triangle_blocks.append(triangles + offset)
+            offset += len(nodes)
+        
+        if not vertex_blocks:
+            return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64), min_radius, missing
+        return np.vstack(vertex_blocks), np.vstack(triangle_blocks), min_radius, missing
+
+    def _curvature_radius(self, face):
+        """Return the smallest principal radius of an analytic curved face, or None."""
+        surface = BRepAdaptor_Surface(face)
+        surface_type = surface.GetType()
+        if surface_type == GeomAbs_Cylinder:
+            return surface.Cylinder().Radius()
+        if surface_type == GeomAbs_Sphere:
+            return surface.Sphere().Radius()
+        if surface_type == GeomAbs_Torus:
+            return surface.Torus().MinorRadius()
+        if surface_type == GeomAbs_Cone:
+            return surface.Cone().RefRadius() or None
+        return None
+
     def detect_features(self):
         """
         Detect and analyze all features in the CAD model.
@@ -580,50 +760,11 @@ class CADAnalyzer:
                 - analysis: Dictionary containing feature analysis and manufacturing recommendations
         """
         features = []
-        explorer = TopExp_Explorer(self.shape, TopAbs_FACE)
-        while explorer.More():
-            face = explorer.Current()
-            surface = BRepAdaptor_Surface(face)
-            surface_type = surface.GetType()
-            props = GProp_GProps()
-            brepgprop.SurfaceProperties(face, props)
-            pnt = props.CentreOfMass()
-            coords = {'x': pnt.X(), 'y': pnt.Y(), 'z': pnt.Z()}
-            
-            # Enhanced feature detection with detailed properties
-            if surface_type == GeomAbs_Cylinder:
-                cylinder = surface.Cylinder()
-                radius = cylinder.Radius()
-                features.append({
-                    'type': 'hole',
-                    'confidence': 0.8,
-                    'details': 'Cylindrical surface detected',
-                    'diameter': radius * 2,
-                    'is_through_hole': self._is_through_hole(face),
-                    'recommended_tolerance': 'H7' if radius * 2 <= 10 else 'H8',
-                    **coords
-                })
-            elif surface_type == GeomAbs_Plane:
-                normal = surface.Plane().Axis().Direction()
-                features.append({
-                    'type': 'planar_face',
-                    'confidence': 1.0,
-                    'details': 'Planar surface detected',
-                    'normal': {'x': normal.X(), 'y': normal.Y(), 'z': normal.Z()},
-                    'surface_area': props.Mass(),
-                    **coords
-                })
-            elif surface_type == GeomAbs_Cone:
-                cone = surface.Cone()
-                angle = math.degrees(cone.SemiAngle())
-                features.append({
-                    'type': 'chamfer',
-                    'confidence': 0.7,
-                    'details': 'Conical surface detected',
-                    'angle': angle,
-                    **coords
-                })
-            explorer.Next()
+        for face, feature in classify_faces(self.shape):
+            if feature['type'] == 'hole':
+                feature['is_through_hole'] = self._is_through_hole(face)
+                feature['recommended_tolerance'] = 'H7' if feature['diameter'] <= 10 else 'H8'
+            features.append(feature)
         
         # Post-process features and add manufacturing analysis
         cleaned_features, analysis = self.post_process_features(features)
@@ -636,9 +777,12 @@ class CADAnalyzer:
 
     def _is_through_hole(self, face):
         """
-        [TODO: PLACEHOLDER] Determine if a cylindrical face represents a through hole.
-        This is a simplified check - in practice, you'd want to analyze the topology
-        to determine if the hole goes through the part.
+        Determine if a cylindrical face represents a through hole.
+        
+        Casts a ray along the cylinder axis out of each end of the face. A blind
+        hole has a floor (or drill point) in the way on one side; a through hole
+        is open on both. Geometry elsewhere on the axis, beyond the hole, also
+        counts as blocking, so the check errs towards "blind".
         
         Args:
             face: The cylindrical face to analyze
@@ -646,4 +790,17 @@ class CADAnalyzer:
         Returns:
             bool: True if the hole appears to go through the part
         """
-        return True  # Placeholder implementation 
\ No newline at end of file
+        surface = BRepAdaptor_Surface(face)
+        if surface.GetType() != GeomAbs_Cylinder:
+            return False
+        axis = surface.Cylinder().Axis()
+        origin = np.array(axis.Location().Coord())
+        direction = np.array(axis.Direction().Coord())
+        v_first, v_last = surface.FirstVParameter(), surface.LastVParameter()
+        # Start just inside the face so a floor flush with the end is still hit
+        inset = max(1e-3, 1e-3 * abs(v_last - v_first))
+        own = {self.bbox_store.index_of(face)}
+        for start, sign in ((v_last - inset, 1.0), (v_first + inset, -1.0)):
+            if self.bbox_store.ray_hits(origin + start * direction, sign * direction, exclude=own):
+                return False
+        return True 
\ No newline at end of file
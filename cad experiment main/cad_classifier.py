@@ -2,15 +2,14 @@
 # Cleansed, commented, and ready for further extension
 import math
 import numpy as np
-from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_EDGE
+from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_EDGE, TopAbs_REVERSED
 from OCC.Core.TopExp import TopExp_Explorer
 from OCC.Core.BRepAdaptor import BRepAdaptor_Surface
 from OCC.Core.GeomAbs import GeomAbs_Plane, GeomAbs_Cylinder, GeomAbs_Cone, GeomAbs_Circle
-from OCC.Core.BRepBndLib import brepbndlib
-from OCC.Core.Bnd import Bnd_Box
 from OCC.Core.gp import gp_Pnt
 from OCC.Core.BRep import BRep_Tool
 from cad_analyzer import CADAnalyzer
+from bbox_store import XMIN, YMIN, ZMIN, XMAX, YMAX, ZMAX
 
 class CADClassifier:
     def __init__(self, file_path):
@@ -22,19 +21,17 @@ class CADClassifier:
         self.adjacency_graph = {}
         self.analyzer_features = None
         self.analyzer_analysis = None
+        self._pocket_depths = {}
         self._initialize_geometric_properties()
 
     def _initialize_geometric_properties(self):
         """Compute bounding box and set tolerance."""
-        bbox = Bnd_Box()
-        brepbndlib.Add(self.shape, bbox)
-        min_point = bbox.CornerMin()
-        max_point = bbox.CornerMax()
-        self.bbox = bbox
+        self.bbox_store = self.analyzer.bbox_store
+        dx, dy, dz = self.bbox_store.shape_extents()
         self.overall_dimensions = {
-            'x': float(max_point.X() - min_point.X()),
-            'y': float(max_point.Y() - min_point.Y()),
-            'z': float(max_point.Z() - min_point.Z())
+            'x': float(dx),
+            'y': float(dy),
+            'z': float(dz)
         }
         min_dim = min(self.overall_dimensions.values())
         self.tolerance = min_dim * 0.001  # 0.1% tolerance
@@ -137,17 +134,9 @@ class CADClassifier:
                 if not all_edges:
                     continue
                 diameter = 2.0 * avg_radius
-                min_z, max_z = None, None
-                for f in cluster:
-                    bbox = Bnd_Box()
-                    brepbndlib.Add(f, bbox)
-                    min_point = bbox.CornerMin()
-                    max_point = bbox.CornerMax()
-                    z0, z1 = float(min_point.Z()), float(max_point.Z())
-                    if min_z is None or z0 < min_z:
-                        min_z = z0
-                    if max_z is None or z1 > max_z:
-                        max_z = z1
+                boxes = np.array([self.bbox_store.face_box(f) for f in cluster])
+                min_z = float(boxes[:, ZMIN].min())
+                max_z = float(boxes[:, ZMAX].max())
                 depth = abs(max_z - min_z)
                 if diameter < self.tolerance or depth < max(self.tolerance, 0.1):
                     continue
@@ -173,12 +162,7 @@ class CADClassifier:
             try:
                 if not self._is_horizontal_face(face):
                     continue
-                bbox = Bnd_Box()
-                brepbndlib.Add(face, bbox)
-                min_point = bbox.CornerMin()
-                max_point = bbox.CornerMax()
-                width = float(max_point.X() - min_point.X())
-                length = float(max_point.Y() - min_point.Y())
+                width, length, _ = (float(v) for v in self.bbox_store.face_extents(face))
                 if width < self.tolerance or length < self.tolerance:
                     continue
                 if not self._is_enclosed(face):
@@ -223,11 +207,7 @@ class CADClassifier:
                 radius = cyl.Radius()
                 if abs(axis[2]) > 0.85:
                     continue
-                bbox = Bnd_Box()
-                brepbndlib.Add(face, bbox)
-                min_point = bbox.CornerMin()
-                max_point = bbox.CornerMax()
-                length = np.linalg.norm([max_point.X() - min_point.X(), max_point.Y() - min_point.Y(), max_point.Z() - min_point.Z()])
+                length = np.linalg.norm(self.bbox_store.face_extents(face))
                 if length < min_slot_length:
                     continue
                 aspect_ratio = length / (2 * radius)
@@ -251,7 +231,7 @@ class CADClassifier:
                 feature['manufacturing_notes'].append("Converted from pocket due to high aspect ratio")
 
     def _classify_bosses(self):
-        """Classify cylindrical bosses (vertical, convex, on top). TODO: Improve convexity/top checks."""
+        """Classify cylindrical bosses (vertical, convex, on top). TODO: Improve convexity check."""
         if GeomAbs_Cylinder not in self.face_types:
             return
         for face in self.face_types[GeomAbs_Cylinder]:
@@ -260,7 +240,7 @@ class CADClassifier:
                     continue
                 if not self._is_convex_face(face):  # TODO: Implement real convexity check
                     continue
-                if not self._is_top_face(face):  # TODO: Implement real top face check
+                if not self._is_top_face(face):
                     continue
                 diameter = self._get_face_diameter(face)
                 height = self._get_face_height(face)
@@ -289,12 +269,7 @@ class CADClassifier:
             try:
                 if not self._is_chamfer_face(face):  # TODO: Implement real chamfer detection
                     continue
-                bbox = Bnd_Box()
-                brepbndlib.Add(face, bbox)
-                min_point = bbox.CornerMin()
-                max_point = bbox.CornerMax()
-                width = float(max_point.X() - min_point.X())
-                length = float(max_point.Y() - min_point.Y())
+                width, length, _ = (float(v) for v in self.bbox_store.face_extents(face))
                 if width < self.tolerance or length < self.tolerance:
                     continue
                 feature = {
@@ -346,12 +321,9 @@ class CADClassifier:
         for face in self.face_types[GeomAbs_Plane]:
             try:
                 if self._is_vertical_face(face):
-                    bbox = Bnd_Box()
-                    brepbndlib.Add(face, bbox)
-                    min_point = bbox.CornerMin()
-                    max_point = bbox.CornerMax()
-                    width = float(max_point.X() - min_point.X())
-                    height = float(max_point.Z() - min_point.Z())
+                    box = self.bbox_store.face_box(face)
+                    width = float(box[XMAX] - box[XMIN])
+                    height = float(box[ZMAX] - box[ZMIN])
                     feature = {
                         'type': 'flat_face',
                         'width': width,
@@ -430,20 +402,46 @@ class CADClassifier:
             return False
 
     def _is_enclosed(self, face):
-        """Check if a face is fully enclosed by walls. TODO: Implement real enclosure check."""
-        return True  # TODO: Implement real enclosure check
+        """
+        Check if an upward-facing floor is fully enclosed by walls.
+
+        Casts rays in +X, -X, +Y and -Y just above the floor's bbox centre; every
+        ray must hit a face that rises above the floor. The lowest wall rise is
+        remembered as the pocket depth.
+        """
+        surf = BRepAdaptor_Surface(face)
+        normal_z = surf.Plane().Axis().Direction().Z()
+        if face.Orientation() == TopAbs_REVERSED:
+            normal_z = -normal_z
+        if normal_z <= 0:
+            return False  # Faces pointing down are part bottoms or ceilings, not floors
+        store = self.bbox_store
+        own = store.index_of(face)
+        box = store.face_box(face)
+        floor_z = float(box[ZMAX])
+        lift = max(self.tolerance, 1e-3)
+        origin = [(box[XMIN] + box[XMAX]) / 2, (box[YMIN] + box[YMAX]) / 2, floor_z + lift]
+        wall_rise = []
+        for direction in ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0)):
+            hits = store.ray_hits(origin, direction, exclude={own}, tolerance=lift)
+            rises = [float(store.face_boxes[i][ZMAX]) - floor_z for _, i in hits[:1]]
+            if not rises or rises[0] <= lift:
+                return False
+            wall_rise.append(rises[0])
+        self._pocket_depths[own] = min(wall_rise)
+        return True
 
     def _get_pocket_depth(self, face):
         """Get the depth of a pocket from its top surface."""
+        index = self.bbox_store.index_of(face)
+        if index in self._pocket_depths:
+            return self._pocket_depths[index]
         return self._get_face_depth(face)
 
     def _get_face_depth(self, face):
         """Get the depth (Z span) of a face."""
-        bbox = Bnd_Box()
-        brepbndlib.Add(face, bbox)
-        min_point = bbox.CornerMin()
-        max_point = bbox.CornerMax()
-        return float(max_point.Z() - min_point.Z())
+        box = self.bbox_store.face_box(face)
+        return float(box[ZMAX] - box[ZMIN])
 
     def _get_face_diameter(self, face):
         """Get the diameter of a cylindrical face."""
@@ -461,8 +459,12 @@ class CADClassifier:
         return True  # TODO: Implement real convexity check
 
     def _is_top_face(self, face):
-        """Check if a face is on the top of the part. TODO: Implement real top face check."""
-        return True  # TODO: Implement real top face check
+        """Check if a face is on the top of the part: nothing lies above its bbox centre."""
+        store = self.bbox_store
+        box = store.face_box(face)
+        lift = max(self.tolerance, 1e-3)
+        origin = [(box[XMIN] + box[XMAX]) / 2, (box[YMIN] + box[YMAX]) / 2, box[ZMAX] + lift]
+        return not store.ray_hits(origin, (0, 0, 1), exclude={store.index_of(face)}, tolerance=lift)
 
     def _is_chamfer_face(self, face):
         """Check if a face is a chamfer. TODO: Implement real chamfer detection."""
@@ -0,0 +1,87 @@
+# Face classification shared by CADAnalyzer.detect_features and the Neuramill API's CAD parser
+# (neurmill_poc_py/app/services/cad_parser.py imports this module from this directory, so keep it
+# free of Flask and of the other modules here)
+import math
+from OCC.Core.BRepAdaptor import BRepAdaptor_Surface
+from OCC.Core.BRepGProp import brepgprop
+from OCC.Core.GeomAbs import GeomAbs_Plane, GeomAbs_Cylinder, GeomAbs_Cone
+from OCC.Core.GProp import GProp_GProps
+from OCC.Core.TopAbs import TopAbs_FACE
+from OCC.Core.TopExp import TopExp_Explorer
+
+
+def classify_face(face):
+    """
+    Machining feature suggested by the surface type of one face.
+
+    - cylinder -> 'hole': diameter, depth (axial length of the face) and axis_point
+      (the middle of the face on the cylinder axis, shared by both halves of a split hole)
+    - plane -> 'planar_face': normal and surface_area
+    - cone -> 'chamfer': semi-angle in degrees
+
+    Args:
+        face: A TopoDS_Face
+
+    Returns:
+        dict: The feature, with the face centroid as x, y, z; None for any other surface
+    """
+    surface = BRepAdaptor_Surface(face)
+    surface_type = surface.GetType()
+    if surface_type not in (GeomAbs_Cylinder, GeomAbs_Plane, GeomAbs_Cone):
+        return None
+    props = GProp_GProps()
+    brepgprop.SurfaceProperties(face, props)
+    pnt = props.CentreOfMass()
+    coords = {'x': pnt.X(), 'y': pnt.Y(), 'z': pnt.Z()}
+
+    if surface_type == GeomAbs_Cylinder:
+        cylinder = surface.Cylinder()
+        v_first, v_last = surface.FirstVParameter(), surface.LastVParameter()
+        location, direction = cylinder.Axis().Location(), cylinder.Axis().Direction()
+        middle = (v_first + v_last) / 2
+        return {
+            'type': 'hole',
+            'confidence': 0.8,
+            'details': 'Cylindrical surface detected',
+            'diameter': cylinder.Radius() * 2,
+            'depth': abs(v_last - v_first),
+            'axis_point': {
+                'x': location.X() + middle * direction.X(),
+                'y': location.Y() + middle * direction.Y(),
+                'z': location.Z() + middle * direction.Z(),
+            },
+            **coords
+        }
+    if surface_type == GeomAbs_Plane:
+        normal = surface.Plane().Axis().Direction()
+        return {
+            'type': 'planar_face',
+            'confidence': 1.0,
+            'details': 'Planar surface detected',
+            'normal': {'x': normal.X(), 'y': normal.Y(), 'z': normal.Z()},
+            'surface_area': props.Mass(),
+            **coords
+        }
+    return {
+        'type': 'chamfer',
+        'confidence': 0.7,
+        'details': 'Conical surface detected',
+        'angle': math.degrees(surface.Cone().SemiAngle()),
+        **coords
+    }
+
+
+def classify_faces(shape):
+    """
+    Classify every face of a shape.
+
+    Yields:
+        tuple: (face, feature) for each face classify_face recognizes, in explorer order
+    """
+    explorer = TopExp_Explorer(shape, TopAbs_FACE)
+    while explorer.More():
+        face = explorer.Current()
+        explorer.Next()
+        feature = classify_face(face)
+        if feature is not None:
+            yield face, feature
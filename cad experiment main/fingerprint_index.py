@@ -0,0 +1,240 @@
+# FingerprintIndex: find previously analyzed parts that look like a new upload
+# A part is reduced to a short, scale-aware vector; nearest neighbours are found by brute force in NumPy
+import json
+import os
+import threading
+import numpy as np
+
+# Hole diameter bin edges in mm (last bin is open-ended)
+HOLE_DIAMETER_BINS = np.array([0, 3, 6, 10, 16, 25, 50, np.inf])
+
+# Relative weight of each fingerprint block in the distance
+BLOCK_WEIGHTS = {
+    'face_types': 1.0,
+    'holes': 1.0,
+    'bbox': 2.0,
+    'size': 1.0,
+}
+
+FINGERPRINT_SIZE = 4 + len(HOLE_DIAMETER_BINS) + 3 + 4
+
+# The append log is folded into a new snapshot once it holds this many entries
+# and at least as many as the snapshot, so compaction cost is amortized O(1) per add
+MIN_COMPACT_ENTRIES = 1000
+
+
+def compute_fingerprint(features, analysis, bounding_box):
+    """
+    Build a fixed-length fingerprint from CADAnalyzer output.
+
+    Blocks:
+        - face_types: fractions of planar / cylindrical / complex faces and log face count
+        - holes: hole diameter histogram (fractions) and log hole count
+        - bbox: sorted extent ratios (mid/long, short/long) and log of the longest extent
+        - size: log volume, log area, bbox fill ratio and area-to-volume compactness
+
+    Args:
+        features (list): Features returned by CADAnalyzer.detect_features
+        analysis (dict): Analysis returned by CADAnalyzer.detect_features
+        bounding_box (dict): Extents returned by CADAnalyzer.get_bounding_box
+
+    Returns:
+        np.ndarray: float32 vector of length FINGERPRINT_SIZE
+    """
+    manufacturing = analysis.get('manufacturing', {})
+    surfaces = manufacturing.get('surface_finish', {})
+    counts = np.array([
+        surfaces.get('planar_surfaces', 0),
+        surfaces.get('cylindrical_surfaces', 0),
+        surfaces.get('complex_surfaces', 0),
+    ], dtype=float)
+    total_faces = counts.sum()
+    face_block = np.append(counts / max(total_faces, 1.0), np.log1p(total_faces))
+
+    diameters = np.array([f['diameter'] for f in features if f.get('type') == 'hole'], dtype=float)
+    hole_hist, _ = np.histogram(diameters, bins=HOLE_DIAMETER_BINS)
+    hole_block = np.append(hole_hist / max(len(diameters), 1), np.log1p(len(diameters)))
+
+    extents = np.sort(np.abs([bounding_box['x'], bounding_box['y'], bounding_box['z']]))[::-1]
+    longest = max(extents[0], 1e-9)
+    bbox_block = np.array([extents[1] / longest, extents[2] / longest, np.log1p(longest)])
+
+    volume = abs(float(manufacturing.get('material_volume', 0.0)))
+    area = abs(float(manufacturing.get('surface_area', 0.0)))
+    bbox_volume = max(float(np.prod(extents)), 1e-9)
+    compactness = (area ** 1.5) / volume if volume > 0 else 0.0
+    size_block = np.array([
+        np.log1p(volume),
+        np.log1p(area),
+        min(volume / bbox_volume, 1.0),
+        np.log1p(compactness),
+    ])
+
+    return np.concatenate([
+        face_block * BLOCK_WEIGHTS['face_types'],
+        hole_block * BLOCK_WEIGHTS['holes'],
+        bbox_block * BLOCK_WEIGHTS['bbox'],
+        size_block * BLOCK_WEIGHTS['size'],
+    ]).astype(np.float32)
+
+
+class FingerprintIndex:
+    """
+    Nearest-neighbour index of part fingerprints, keyed by STEP content hash.
+
+    Vectors live in one contiguous float32 array (grown by doubling) so a query
+    is a single vectorized distance computation. Each entry also carries a JSON
+    payload (cached features, analysis, tool plans, ...) so close matches can
+    be reused.
+
+    On disk, adds go to an append-only log (fingerprints.log, one JSON line per
+    add), so an add writes only its own entry. Once the log is long enough it is
+    folded into a snapshot (fingerprints.npz, vectors and payloads together)
+    written to a temporary file and renamed over the old one, then the log is
+    truncated. Loading reads the snapshot and replays the log; replaying an
+    entry twice is harmless, and a line cut short by a crash is skipped.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): Directory to persist the index in (None keeps it in memory only)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, FINGERPRINT_SIZE), dtype=np.float32)
+        self.keys = []
+        self._rows = {}  # key -> row in the vector array
+        self.payloads = {}
+        self._log_entries = 0
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.payloads
+
+    @property
+    def vectors(self):
+        """(N, D) fingerprints, row i belonging to keys[i]."""
+        return self._vectors[:len(self.keys)]
+
+    def add(self, key, vector, payload=None):
+        """
+        Add or replace a part in the index.
+
+        Args:
+            key (str): Content hash of the STEP file
+            vector (np.ndarray): Fingerprint from compute_fingerprint
+            payload (dict): JSON-serializable data to return with matches
+        """
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        payload = payload or {}
+        with self._lock:
+            self._insert(key, vector, payload)
+            if self.path:
+                self._append_log(key, vector, payload)
+                if self._log_entries >= max(MIN_COMPACT_ENTRIES, len(self.keys)):
+                    self._save()
+
+    def get(self, key):
+        """Return the payload stored for a content hash, or None."""
+        return self.payloads.get(key)
+
+    def query(self, vector, k=5, exclude=None):
+        """
+        Find the k closest parts to a fingerprint.
+
+        Args:
+            vector (np.ndarray): Fingerprint to search for
+            k (int): Number of neighbours to return
+            exclude (str): Key to leave out of the results (e.g. the query part itself)
+
+        Returns:
+            list: [{'key', 'distance', 'payload'}] ordered by increasing distance
+        """
+        with self._lock:
+            vectors, keys = self.vectors, self.keys[:]
+            excluded = self._rows.get(exclude)
+        if not keys:
+            return []
+        distances = np.linalg.norm(vectors - np.asarray(vector, dtype=np.float32), axis=1)
+        if excluded is not None:
+            distances[excluded] = np.inf
+        k = min(k, len(keys))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [
+            {'key': keys[i], 'distance': float(distances[i]), 'payload': self.payloads[keys[i]]}
+            for i in nearest if np.isfinite(distances[i])
+        ]
+
+    def flush(self):
+        """Fold the append log into the snapshot now (e.g. on shutdown)."""
+        if self.path:
+            with self._lock:
+                if self._log_entries:
+                    self._save()
+
+    def load(self):
+        """Load the index from disk if it exists."""
+        snapshot_path = os.path.join(self.path, 'fingerprints.npz')
+        if os.path.exists(snapshot_path):
+            data = np.load(snapshot_path, allow_pickle=False)
+            if data['vectors'].shape[1] != FINGERPRINT_SIZE:
+                print(f"Ignoring fingerprint index with stale layout: {snapshot_path}")
+                return
+            payloads = json.loads(str(data['payloads']))
+            for key, vector in zip(data['keys'], data['vectors']):
+                self._insert(str(key), vector, payloads[str(key)])
+
+        log_path = os.path.join(self.path, 'fingerprints.log')
+        if os.path.exists(log_path):
+            with open(log_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # last line cut short by a crash
+                    self._insert(entry['key'], np.asarray(entry['vector'], dtype=np.float32), entry['payload'])
+                    self._log_entries += 1
+        if self.keys:
+            print(f"Loaded fingerprint index with {len(self.keys)} parts")
+
+    def _insert(self, key, vector, payload):
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self._vectors):
+                grown = np.zeros((max(2 * row, 64), FINGERPRINT_SIZE), dtype=np.float32)
+                grown[:row] = self._vectors[:row]
+                self._vectors = grown
+            self.keys.append(key)
+            self._rows[key] = row
+        self._vectors[row] = vector
+        self.payloads[key] = payload
+
+    def _append_log(self, key, vector, payload):
+        os.makedirs(self.path, exist_ok=True)
+        line = json.dumps({'key': key, 'vector': vector.tolist(), 'payload': payload}, default=float)
+        with open(os.path.join(self.path, 'fingerprints.log'), 'a') as f:
+            f.write(line + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_entries += 1
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        snapshot_path = os.path.join(self.path, 'fingerprints.npz')
+        tmp_path = snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, vectors=self.vectors, keys=np.array(self.keys),
+                     payloads=np.array(json.dumps(self.payloads, default=float)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path)
+        # The snapshot now holds every logged entry; a crash before truncating only replays them again
+        open(os.path.join(self.path, 'fingerprints.log'), 'w').close()
+        self._log_entries = 0
@@ -1,7 +1,11 @@
-from app.db.database import SessionLocal
+from app.db.database import SessionLocal, AsyncSessionLocal
 def get_db():
     db = SessionLocal()  # ← pulls from your engine/session config
     try:
         yield db          # ← allows FastAPI to inject this into route handlers
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:  # ← async session for `async def` routes
+        yield db
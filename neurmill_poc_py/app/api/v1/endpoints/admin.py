@@ -0,0 +1,55 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import JSONResponse
+from app.services.catalog_reload import SOURCES, catalog_reloader
+from app.services.llm_planner import planner
+from app.services.response_cache import catalog_version, response_cache
+from app.services.result_cache import result_cache
+from app.services.tool_catalog import catalog_status
+
+router = APIRouter()
+
+# Admin calls must send it in the X-Admin-Token header; unset, every admin call is refused
+ADMIN_TOKEN = os.getenv("NEURAMILL_ADMIN_TOKEN")
+
+
+def check_token(token: str | None):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled: set NEURAMILL_ADMIN_TOKEN to enable it")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/admin/catalog")
+async def get_catalog_status(x_admin_token: str | None = Header(None)):
+    check_token(x_admin_token)
+    return {"catalog": catalog_status(), "reloader": catalog_reloader.status()}
+
+
+@router.post("/admin/catalog/reload")
+async def reload_catalog(source: str = "db", x_admin_token: str | None = Header(None)):
+    """Build a new catalog version from `source` (db, csv or snapshot) in the background."""
+    check_token(x_admin_token)
+    if source not in SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(SOURCES)}")
+    if not await catalog_reloader.reload_in_background(source):
+        raise HTTPException(status_code=409, detail=f"A reload from {catalog_reloader.running} is already running")
+    return JSONResponse(status_code=202, content={"accepted": True, "source": source, "catalog": catalog_status()})
+
+
+@router.get("/admin/cache")
+async def get_cache_stats(x_admin_token: str | None = Header(None)):
+    """Hit/miss counters of the GET response cache, the recommendation result cache and the planner prompt cache."""
+    check_token(x_admin_token)
+    return {
+        "responses": {
+            "catalog_version": catalog_version(),
+            "hits": response_cache.hits,
+            "misses": response_cache.misses,
+            "not_modified": response_cache.not_modified,
+        },
+        "recommendations": result_cache.stats(),
+        "planner": planner.stats(),
+    }
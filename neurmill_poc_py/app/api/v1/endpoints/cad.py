@@ -1,21 +1,30 @@
 # app/api/v1/endpoints/cad.py
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.cad_parser import process_cad_file
+from app.services.cad_parser import CADBackendUnavailable, process_cad_file
+from app.services.offload import cpu_limiter
 
 router = APIRouter()
 
+async def extract(cad_bytes: bytes) -> list:
+    try:
+        return await cpu_limiter.run(process_cad_file, cad_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CADBackendUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 @router.post("/preview-features")
 async def preview_features(file: UploadFile = File(...)):
     cad_bytes = await file.read()
-    features = process_cad_file(cad_bytes)
+    features = await extract(cad_bytes)
     return {"features": features}
 
 @router.post("/upload")
 async def upload_cad(file: UploadFile = File(...)):
     try:
         file_bytes = await file.read()
-        raw_features = process_cad_file(file_bytes)
+        raw_features = await extract(file_bytes)
         normalized = [{
             "type": f.get("feature", "unknown"),
             "diameter": f.get("diameter"),
@@ -23,5 +32,7 @@ async def upload_cad(file: UploadFile = File(...)):
             "position": f.get("position")
         } for f in raw_features]
         return {"features": normalized}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to process CAD file")
@@ -1,28 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.api.v1.dependencies import get_db
-from app.db import crud
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.dependencies import get_async_db
+from app.db import async_crud
+from app.services.response_cache import cached_json
 
 router = APIRouter()
 
 @router.get("/machines")
-def get_all_machines(db: Session = Depends(get_db)):
-    return crud.get_all_machines(db)
+async def get_all_machines(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await cached_json(request, lambda: async_crud.get_all_machines(db))
+
+@router.get("/machines/fit")
+async def get_machines_fitting(
+    request: Request,
+    x: float = Query(..., gt=0, description="Part bounding box X extent (mm)"),
+    y: float = Query(..., gt=0, description="Part bounding box Y extent (mm)"),
+    z: float = Query(..., gt=0, description="Part bounding box Z extent (mm)"),
+    min_rpm: float | None = Query(None, ge=0),
+    taper: str | None = None,
+    allow_rotation: bool = True,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Machines whose X/Y/Z travels hold the part bbox, answered from the indexed capability columns."""
+    return await cached_json(
+        request, lambda: async_crud.get_machines_fitting(db, x, y, z, min_rpm, taper, allow_rotation)
+    )
 
 @router.get("/machines/{machine_id}")
-def get_machine_by_id(machine_id: int, db: Session = Depends(get_db)):
-    machine = crud.get_machine(db, machine_id)
-    if not machine:
-        raise HTTPException(status_code=404, detail="Machine not found")
-    return machine
+async def get_machine_by_id(machine_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        machine = await async_crud.get_machine(db, machine_id)
+        if not machine:
+            raise HTTPException(status_code=404, detail="Machine not found")
+        return machine
+    return await cached_json(request, load)
 
 @router.get("/machines/by-title/{title}")
-def get_machine_by_title(title: str, db: Session = Depends(get_db)):
-    machine = crud.get_machine_by_title(db, title)
-    if not machine:
-        raise HTTPException(status_code=404, detail="Machine not found")
-    return machine
+async def get_machine_by_title(title: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        machine = await async_crud.get_machine_by_title(db, title)
+        if not machine:
+            raise HTTPException(status_code=404, detail="Machine not found")
+        return machine
+    return await cached_json(request, load)
 
 @router.post("/machines")
-def create_machine(machine_data: dict, db: Session = Depends(get_db)):
-    return crud.create_machine(db, machine_data)
+async def create_machine(machine_data: dict, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_machine(db, machine_data)
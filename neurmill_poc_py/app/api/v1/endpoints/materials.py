@@ -1,23 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.api.v1.dependencies import get_db
-from app.db import crud
-from app.db.models import Tool, Material, Operation
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.dependencies import get_async_db
+from app.db import async_crud
+from app.services.response_cache import cached_json
 
 router = APIRouter()
 
 @router.get("/materials")
-def get_all_materials(db: Session = Depends(get_db)):
-    return db.query(Material).all()
+async def get_all_materials(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await cached_json(request, lambda: async_crud.get_all_materials(db))
 
 @router.get("/materials/{material_id}")
-def get_material_by_id(material_id: int, db: Session = Depends(get_db)):
-    material = crud.get_material(db, material_id)
-    if not material:
-        raise HTTPException(status_code=404, detail="Material not found")
-    return material
+async def get_material_by_id(material_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        material = await async_crud.get_material(db, material_id)
+        if not material:
+            raise HTTPException(status_code=404, detail="Material not found")
+        return material
+    return await cached_json(request, load)
 
 @router.post("/materials")
-def create_material(material_data: dict, db: Session = Depends(get_db)):
-    return crud.create_material(db, material_data)
+async def create_material(material_data: dict, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_material(db, material_data)
 
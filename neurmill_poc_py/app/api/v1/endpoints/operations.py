@@ -1,23 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.api.v1.dependencies import get_db
-from app.db import crud
-from app.db.models import Tool, Material, Operation
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.dependencies import get_async_db
+from app.db import async_crud
+from app.services.response_cache import cached_json
 
 router = APIRouter()
 # ----- OPERATION ROUTES -----
 
 @router.get("/operations/{operation_id}")
-def get_operation_by_id(operation_id: int, db: Session = Depends(get_db)):
-    operation = crud.get_operation(db, operation_id)
-    if not operation:
-        raise HTTPException(status_code=404, detail="Operation not found")
-    return operation
+async def get_operation_by_id(operation_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        operation = await async_crud.get_operation(db, operation_id)
+        if not operation:
+            raise HTTPException(status_code=404, detail="Operation not found")
+        return operation
+    return await cached_json(request, load)
 
 @router.get("/operations/by-name/{name}")
-def get_operation_by_name(name: str, db: Session = Depends(get_db)):
-    return crud.get_operation_by_name(db, name)
+async def get_operation_by_name(name: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await cached_json(request, lambda: async_crud.get_operation_by_name(db, name))
 
 @router.post("/operations")
-def create_operation(operation_data: dict, db: Session = Depends(get_db)):
-    return crud.create_operation(db, operation_data)
+async def create_operation(operation_data: dict, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_operation(db, operation_data)
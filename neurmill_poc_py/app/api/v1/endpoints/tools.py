@@ -1,15 +1,58 @@
 # app/api/v1/endpoints/tool.py
 
-from http.client import HTTPException
-from fastapi import APIRouter, Depends, UploadFile, File, Form
-from app.db import crud
+import base64
+import json
+from typing import List
+
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from app.db import async_crud
 from app.db.models import Tool
 from sqlalchemy.orm import Session
-from app.api.v1.dependencies import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.dependencies import get_db, get_async_db
+from app.services.cad_parser import CADBackendUnavailable
 from app.services.tool_selector import ToolRecommender
+from app.services.offload import AdmittedStreamingResponse, cpu_limiter
+from app.services.response_cache import cached_json
 
 router = APIRouter()
 
+# Columns returned by GET /tools when `fields` is not given: enough for a catalog listing
+DEFAULT_TOOL_FIELDS = [
+    "tool_id", "name", "type", "diameter", "flute_count", "coating",
+    "manufacturer", "max_depth_of_cut", "max_rpm", "price_usd",
+]
+TOOL_COLUMNS = [c.key for c in Tool.__table__.columns]
+MAX_PAGE_SIZE = 500
+MAX_BATCH_JOBS = 5000
+
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["diameter"], row["tool_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        diameter, tool_id = json.loads(raw)
+        return (float(diameter) if diameter is not None else None, int(tool_id))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return DEFAULT_TOOL_FIELDS
+    if fields.strip() == "*":
+        return TOOL_COLUMNS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in TOOL_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
 @router.post("/tools/recommend")
 async def recommend_tools(
     cad_file: UploadFile = File(...),
@@ -19,28 +62,146 @@ async def recommend_tools(
 ):
     cad_bytes = await cad_file.read()
     recommender = ToolRecommender(db=db)
-    result = recommender.recommend_tools(
-        cad_bytes=cad_bytes,
-        material=material,
-        machine_type=machine_type
-    )
-    return {"recommendations": result}
+    try:
+        pending = await cpu_limiter.run(
+            recommender.prepare_tools,
+            cad_bytes=cad_bytes,
+            material=material,
+            machine_type=machine_type
+        )
+    except ValueError as e:
+        # Unknown material, or a CAD file that can't be parsed
+        raise HTTPException(status_code=400, detail=str(e))
+    except CADBackendUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    # The planner only waits on the network: awaited here, after the CPU slot is released
+    return {"recommendations": await pending.plan()}
+
+def job_part(part, part_names: list[str]) -> str:
+    """A job's part: an uploaded file name, or the index of the file in the upload."""
+    # type() rather than isinstance: JSON true/false are bools, which are ints
+    if type(part) is int:
+        if not 0 <= part < len(part_names):
+            raise IndexError(part)
+        return part_names[part]
+    if type(part) is not str:
+        raise TypeError(part)
+    return part
+
+def parse_batch_jobs(part_names: list[str], jobs: str | None, materials: list[str] | None,
+                     machine_types: list[str] | None) -> list[dict]:
+    """
+    Jobs for /tools/recommend/batch: the `jobs` JSON list of {"part", "material", "machine_type"}
+    (part = uploaded file name or index), or else every part x material x machine type.
+    """
+    if jobs is None:
+        if not materials or not machine_types:
+            raise HTTPException(status_code=400, detail="Send jobs, or materials and machine_types")
+        return [{"part": part, "material": material, "machine_type": machine_type}
+                for part in part_names for material in materials for machine_type in machine_types]
+    try:
+        parsed = json.loads(jobs)
+        parsed = [{
+            "part": job_part(job["part"], part_names),
+            "material": str(job["material"]),
+            "machine_type": str(job["machine_type"]),
+        } for job in parsed]
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise HTTPException(status_code=400, detail="jobs must be a JSON list of {part, material, machine_type}")
+    return parsed
+
+@router.post("/tools/recommend/batch")
+async def recommend_tools_batch(
+    cad_files: List[UploadFile] = File(...),
+    jobs: str | None = Form(None),
+    materials: List[str] | None = Form(None),
+    machine_types: List[str] | None = Form(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Recommend tools for many (part, material, machine) combinations in one call.
+    One JSON object per job is streamed back as NDJSON, in job order, as soon as it is ready.
+    """
+    parts = {}
+    for index, cad_file in enumerate(cad_files):
+        name = cad_file.filename or f"part-{index}"
+        if name in parts:
+            raise HTTPException(status_code=400, detail=f"Duplicate part file name: {name}")
+        parts[name] = await cad_file.read()
+    batch = parse_batch_jobs(list(parts), jobs, materials, machine_types)
+    if len(batch) > MAX_BATCH_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_JOBS} jobs per batch")
+
+    results = ToolRecommender(db=db).recommend_batch(parts, batch)
+    # The batch holds one CPU slot for all its jobs, taken now: once the 200 has started, a 429 can't be sent
+    cpu_limiter.admit()
+
+    async def stream():
+        # Each job's CPU work runs on the CPU executor, one at a time, under the batch's slot;
+        # its planner call is awaited here, so no worker thread waits on the network
+        try:
+            while True:
+                result = await cpu_limiter.run_admitted(next, results, None)
+                if result is None:
+                    break
+                pending = result.pop("pending", None)
+                if pending is not None:
+                    result["recommendations"] = await pending.plan()
+                yield json.dumps(jsonable_encoder(result)) + "\n"
+        finally:
+            # Releases the catalog lease early on disconnect; a job still running in a worker
+            # thread can't be closed, and the generator is finalized once that job ends
+            if not results.gi_running:
+                results.close()
+
+    return AdmittedStreamingResponse(stream(), cpu_limiter, media_type="application/x-ndjson")
 
 @router.get("/tools/{tool_id}")
-def get_tool_by_id(tool_id: int, db: Session = Depends(get_db)):
-    tool = crud.get_tool(db, tool_id)
-    if not tool:
-        raise HTTPException(status_code=404, detail="Tool not found")
-    return tool
+async def get_tool_by_id(tool_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        tool = await async_crud.get_tool(db, tool_id)
+        if not tool:
+            raise HTTPException(status_code=404, detail="Tool not found")
+        return tool
+    return await cached_json(request, load)
 
 @router.get("/tools")
-def get_all_tools(db: Session = Depends(get_db)):
-    return db.query(Tool).all()
+async def get_all_tools(
+    request: Request,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    fields: str | None = Query(None, description="Comma-separated columns, or * for all"),
+    min_diameter: float | None = None,
+    max_diameter: float | None = None,
+    flute_count: int | None = None,
+    coating: str | None = None,
+    manufacturer: str | None = None,
+    material: str | None = Query(None, description="Workpiece material (any class containing it), e.g. Aluminum"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Browse the catalog a page at a time, smallest diameter first."""
+    selected = parse_fields(fields)
+    after = decode_cursor(cursor) if cursor else None
+
+    async def load():
+        # The cursor needs diameter and tool_id even when they are not requested
+        query_fields = list(dict.fromkeys(selected + ["diameter", "tool_id"]))
+        rows = await async_crud.list_tools(
+            db, query_fields, limit, after=after,
+            min_diameter=min_diameter, max_diameter=max_diameter, flute_count=flute_count,
+            coating=coating, manufacturer=manufacturer, material_class=material,
+        )
+        next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+        if len(query_fields) != len(selected):
+            rows = [{f: row[f] for f in selected} for row in rows]
+        return {"items": rows, "next_cursor": next_cursor}
+
+    return await cached_json(request, load)
 
-router.get("/tools/{material}")
-def get_tools_by_material(material: str, db: Session = Depends(get_db)):
-    return crud.get_tools_by_material(db, material)
+@router.get("/tools/material/{material}")
+async def get_tools_by_material(material: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await cached_json(request, lambda: async_crud.get_tools_by_material(db, material))
 
 @router.post("/tools")
-def create_tool(tool_data: dict, db: Session = Depends(get_db)):
-    return crud.create_tool(db, tool_data)
+async def create_tool(tool_data: dict, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_tool(db, tool_data)
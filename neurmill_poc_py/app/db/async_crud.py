@@ -0,0 +1,187 @@
+"""
+Async counterparts of the functions in crud.py, for `async def` endpoints.
+Same names and behaviour, but they take an AsyncSession and must be awaited.
+"""
+
+import json
+
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.crud import machines_fitting_filter, parse_workpiece_materials
+from app.db.models import (
+    Machine, Tool, Material, MaterialClass, Operation, matching_material_classes, normalize_key, tools_linked_to
+)
+from app.services.response_cache import bump_catalog_version
+from app.services.tool_catalog import catalog_machine_added, catalog_material_added, catalog_tool_added
+
+
+async def _first(db: AsyncSession, stmt):
+    result = await db.execute(stmt.limit(1))
+    return result.scalars().first()
+
+
+async def _all(db: AsyncSession, stmt) -> list:
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+
+async def _create(db: AsyncSession, obj, catalog_added=None):
+    """Insert `obj`, fold it into the tool catalog with catalog_added(obj), then bump the version (as crud does)."""
+    db.add(obj)
+    await db.commit()
+    await db.refresh(obj)
+    if catalog_added is not None:
+        catalog_added(obj)
+    bump_catalog_version()
+    return obj
+
+
+async def _tools_supporting(db: AsyncSession, material: str):
+    """SELECT of the ids of tools that can cut `material` (see crud.get_tools_by_material)."""
+    class_ids = (await db.execute(matching_material_classes(material))).scalars().all()
+    return tools_linked_to(class_ids)
+
+
+# ---------------------- TOOL CRUD ----------------------
+
+async def get_tool(db: AsyncSession, tool_id: int) -> Tool | None:
+    """Fetch a tool by its ID."""
+    return await _first(db, select(Tool).where(Tool.tool_id == tool_id))
+
+
+async def get_all_tools(db: AsyncSession) -> list[Tool]:
+    """Return every tool."""
+    return await _all(db, select(Tool))
+
+
+async def list_tools(
+    db: AsyncSession,
+    fields: list[str],
+    limit: int,
+    after: tuple | None = None,
+    min_diameter: float | None = None,
+    max_diameter: float | None = None,
+    flute_count: int | None = None,
+    coating: str | None = None,
+    manufacturer: str | None = None,
+    material_class: str | None = None,
+) -> list[dict]:
+    """
+    One page of tools as plain dicts with only `fields`, ordered by (diameter, tool_id).
+
+    `after` is the (diameter, tool_id) of the last row of the previous page (keyset
+    pagination, so deep pages cost the same as the first). All filters run in SQL.
+    """
+    columns = Tool.__table__.c
+    stmt = select(*[columns[f] for f in fields])
+    if after is not None:
+        diameter, tool_id = after
+        if diameter is None:
+            # NULL diameters sort first; continue within them, then every non-NULL row
+            stmt = stmt.where(or_(and_(columns.diameter.is_(None), columns.tool_id > tool_id),
+                                  columns.diameter.isnot(None)))
+        else:
+            stmt = stmt.where(tuple_(columns.diameter, columns.tool_id) > tuple_(diameter, tool_id))
+    if min_diameter is not None:
+        stmt = stmt.where(columns.diameter >= min_diameter)
+    if max_diameter is not None:
+        stmt = stmt.where(columns.diameter <= max_diameter)
+    if flute_count is not None:
+        stmt = stmt.where(columns.flute_count == flute_count)
+    if coating:
+        stmt = stmt.where(columns.coating == coating)
+    if manufacturer:
+        stmt = stmt.where(columns.manufacturer == manufacturer)
+    if material_class:
+        # Same rule as get_tools_by_material and the recommender: classes containing the material
+        stmt = stmt.where(columns.tool_id.in_(await _tools_supporting(db, material_class)))
+    stmt = stmt.order_by(columns.diameter, columns.tool_id).limit(limit)
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings()]
+
+
+async def get_tools_by_material(db: AsyncSession, material: str) -> list[Tool]:
+    """Return all tools that can cut a workpiece material, smallest diameter first."""
+    linked = await _tools_supporting(db, material)
+    return await _all(db, select(Tool).where(Tool.tool_id.in_(linked)).order_by(Tool.diameter, Tool.tool_id))
+
+
+async def get_or_create_material_classes(db: AsyncSession, names: list[str]) -> list[MaterialClass]:
+    """MaterialClass rows for normalized names, adding any that do not exist yet."""
+    existing = {m.name: m for m in await _all(db, select(MaterialClass).where(MaterialClass.name.in_(names)))}
+    for name in names:
+        if name not in existing:
+            existing[name] = MaterialClass(name=name)
+            db.add(existing[name])
+    return [existing[name] for name in names]
+
+
+async def create_tool(db: AsyncSession, tool_data: dict) -> Tool:
+    """Create a new tool entry from a dictionary of tool attributes."""
+    tool_data = dict(tool_data)
+    classes = parse_workpiece_materials(tool_data.get("workpiece_materials"))
+    if isinstance(tool_data.get("workpiece_materials"), list):
+        tool_data["workpiece_materials"] = json.dumps(tool_data["workpiece_materials"])
+    db_tool = Tool(**tool_data)
+    db_tool.material_classes = await get_or_create_material_classes(db, classes)
+    return await _create(db, db_tool, lambda tool: catalog_tool_added(tool, classes))
+
+
+# ---------------------- MATERIAL CRUD ----------------------
+
+async def get_material(db: AsyncSession, material_id: int) -> Material | None:
+    """Fetch a material by its ID."""
+    return await _first(db, select(Material).where(Material.id == material_id))
+
+
+async def get_all_materials(db: AsyncSession) -> list[Material]:
+    """Return every material."""
+    return await _all(db, select(Material))
+
+
+async def get_material_by_name(db: AsyncSession, name: str) -> Material | None:
+    """Fetch a material by name (case- and whitespace-insensitive, via the indexed name_key)."""
+    return await _first(db, select(Material).where(Material.name_key == normalize_key(name)))
+
+
+async def create_material(db: AsyncSession, material_data: dict) -> Material:
+    """Create a new material entry from a dictionary of material attributes."""
+    return await _create(db, Material(**material_data), catalog_material_added)
+
+
+# ---------------------- OPERATION CRUD ----------------------
+
+async def get_operation(db: AsyncSession, operation_id: int) -> Operation | None:
+    """Fetch an operation by its ID."""
+    return await _first(db, select(Operation).where(Operation.id == operation_id))
+
+
+async def get_operation_by_name(db: AsyncSession, name: str) -> Operation | None:
+    """Fetch an operation by name (case- and whitespace-insensitive, via the indexed name_key)."""
+    return await _first(db, select(Operation).where(Operation.name_key == normalize_key(name)))
+
+
+async def create_operation(db: AsyncSession, operation_data: dict) -> Operation:
+    """Create a new operation entry from a dictionary of operation attributes."""
+    return await _create(db, Operation(**operation_data))
+
+# ---------------------- MACHINE CRUD ----------------------
+async def get_machine(db: AsyncSession, machine_id: int) -> Machine | None:
+    return await _first(db, select(Machine).where(Machine.id == machine_id))
+
+async def get_machine_by_title(db: AsyncSession, title: str) -> Machine | None:
+    return await _first(db, select(Machine).where(Machine.title_key == normalize_key(title)))
+
+async def get_all_machines(db: AsyncSession) -> list[Machine]:
+    return await _all(db, select(Machine))
+
+async def get_machines_fitting(db: AsyncSession, x: float, y: float, z: float, min_rpm: float | None = None,
+                               taper: str | None = None, allow_rotation: bool = True) -> list[Machine]:
+    clauses = machines_fitting_filter(x, y, z, min_rpm, taper, allow_rotation)
+    return await _all(db, select(Machine).where(*clauses).order_by(Machine.x_travel, Machine.y_travel, Machine.id))
+
+async def create_machine(db: AsyncSession, machine_data: dict) -> Machine:
+    machine = Machine(**machine_data)
+    if machine.max_rpm is None:
+        machine.fill_specs()
+    return await _create(db, machine, catalog_machine_added)
@@ -1,25 +1,69 @@
+import json
+
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from app.db.models import Machine, Tool, Material, Operation
+from app.db.models import (
+    Machine, Tool, Material, MaterialClass, Operation, matching_material_classes, normalize_key,
+    normalize_material_class, tools_linked_to
+)
+from app.services.response_cache import bump_catalog_version
+from app.services.tool_catalog import catalog_machine_added, catalog_material_added, catalog_tool_added
+
+
+def parse_workpiece_materials(raw) -> list[str]:
+    """Normalized material class names from a workpiece_materials value (JSON string or list)."""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = [raw]
+    names = [normalize_material_class(m) for m in raw or [] if isinstance(m, str) and m.strip()]
+    return list(dict.fromkeys(names))
 
 
 # ---------------------- TOOL CRUD ----------------------
 
 def get_tool(db: Session, tool_id: int) -> Tool | None:
     """Fetch a tool by its ID."""
-    return db.query(Tool).filter(Tool.id == tool_id).first()
+    return db.query(Tool).filter(Tool.tool_id == tool_id).first()
 
 
 def get_tools_by_material(db: Session, material: str) -> list[Tool]:
-    """Return all tools compatible with a specific material."""
-    return db.query(Tool).filter(Tool.material == material).all()
+    """
+    Return all tools that can cut a workpiece material, smallest diameter first.
+
+    Same rule as the recommender: the tool supports a material class containing
+    `material` (case-insensitive). The few matching classes are resolved first, then
+    tools are found through the (material_class_id, tool_id) index of tool_material_classes.
+    """
+    class_ids = [class_id for class_id, in db.execute(matching_material_classes(material))]
+    linked = tools_linked_to(class_ids)
+    return db.query(Tool).filter(Tool.tool_id.in_(linked)).order_by(Tool.diameter, Tool.tool_id).all()
+
+
+def get_or_create_material_classes(db: Session, names: list[str]) -> list[MaterialClass]:
+    """MaterialClass rows for normalized names, adding any that do not exist yet."""
+    existing = {m.name: m for m in db.query(MaterialClass).filter(MaterialClass.name.in_(names))}
+    for name in names:
+        if name not in existing:
+            existing[name] = MaterialClass(name=name)
+            db.add(existing[name])
+    return [existing[name] for name in names]
 
 
 def create_tool(db: Session, tool_data: dict) -> Tool:
     """Create a new tool entry from a dictionary of tool attributes."""
+    tool_data = dict(tool_data)
+    classes = parse_workpiece_materials(tool_data.get("workpiece_materials"))
+    if isinstance(tool_data.get("workpiece_materials"), list):
+        tool_data["workpiece_materials"] = json.dumps(tool_data["workpiece_materials"])
     db_tool = Tool(**tool_data)
+    db_tool.material_classes = get_or_create_material_classes(db, classes)
     db.add(db_tool)
     db.commit()
     db.refresh(db_tool)
+    catalog_tool_added(db_tool, classes)
+    bump_catalog_version()
     return db_tool
 
 
@@ -31,8 +75,8 @@ def get_material(db: Session, material_id: int) -> Material | None:
 
 
 def get_material_by_name(db: Session, name: str) -> Material | None:
-    """Fetch a material by name (case-insensitive)."""
-    return db.query(Material).filter(Material.name.ilike(name)).first()
+    """Fetch a material by name (case- and whitespace-insensitive, via the indexed name_key)."""
+    return db.query(Material).filter(Material.name_key == normalize_key(name)).first()
 
 
 def create_material(db: Session, material_data: dict) -> Material:
@@ -41,6 +85,8 @@ def create_material(db: Session, material_data: dict) -> Material:
     db.add(db_material)
     db.commit()
     db.refresh(db_material)
+    catalog_material_added(db_material)
+    bump_catalog_version()
     return db_material
 
 
@@ -52,8 +98,8 @@ def get_operation(db: Session, operation_id: int) -> Operation | None:
 
 
 def get_operation_by_name(db: Session, name: str) -> Operation | None:
-    """Fetch an operation by name (case-insensitive)."""
-    return db.query(Operation).filter(Operation.name.ilike(name)).first()
+    """Fetch an operation by name (case- and whitespace-insensitive, via the indexed name_key)."""
+    return db.query(Operation).filter(Operation.name_key == normalize_key(name)).first()
 
 
 def create_operation(db: Session, operation_data: dict) -> Operation:
@@ -62,6 +108,7 @@ def create_operation(db: Session, operation_data: dict) -> Operation:
     db.add(db_operation)
     db.commit()
     db.refresh(db_operation)
+    bump_catalog_version()
     return db_operation
 
 # ---------------------- MACHINE CRUD ----------------------
@@ -69,14 +116,40 @@ def get_machine(db: Session, machine_id: int) -> Machine | None:
     return db.query(Machine).filter(Machine.id == machine_id).first()
 
 def get_machine_by_title(db: Session, title: str) -> Machine | None:
-    return db.query(Machine).filter(Machine.title.ilike(title)).first()
+    return db.query(Machine).filter(Machine.title_key == normalize_key(title)).first()
 
 def get_all_machines(db: Session) -> list[Machine]:
     return db.query(Machine).all()
 
+def machines_fitting_filter(x: float, y: float, z: float, min_rpm: float | None = None,
+                            taper: str | None = None, allow_rotation: bool = True) -> list:
+    """
+    WHERE clauses for machines whose X/Y/Z travels hold a part bbox of x * y * z mm.
+    With allow_rotation the part may also be turned 90° on the table (x and y swapped).
+    """
+    footprint = and_(Machine.x_travel >= x, Machine.y_travel >= y)
+    if allow_rotation:
+        footprint = or_(footprint, and_(Machine.x_travel >= y, Machine.y_travel >= x))
+    clauses = [footprint, Machine.z_travel >= z]
+    if min_rpm is not None:
+        clauses.append(Machine.max_rpm >= min_rpm)
+    if taper:
+        clauses.append(Machine.taper.contains(taper, autoescape=True))
+    return clauses
+
+def get_machines_fitting(db: Session, x: float, y: float, z: float, min_rpm: float | None = None,
+                         taper: str | None = None, allow_rotation: bool = True) -> list[Machine]:
+    """Machines whose work envelope fits the part, smallest X travel first."""
+    clauses = machines_fitting_filter(x, y, z, min_rpm, taper, allow_rotation)
+    return db.query(Machine).filter(*clauses).order_by(Machine.x_travel, Machine.y_travel, Machine.id).all()
+
 def create_machine(db: Session, machine_data: dict) -> Machine:
     db_machine = Machine(**machine_data)
+    if db_machine.max_rpm is None:
+        db_machine.fill_specs()
     db.add(db_machine)
     db.commit()
     db.refresh(db_machine)
+    catalog_machine_added(db_machine)
+    bump_catalog_version()
     return db_machine
\ No newline at end of file
@@ -1,7 +1,27 @@
+import os
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+DATABASE_PATH = os.getenv("NEURAMILL_DATABASE_PATH", "./neuramill.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./neuramill.db"  # or pull from env
+# Async connection pool, sized for concurrent API requests
+DB_POOL_SIZE = int(os.getenv("NEURAMILL_DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("NEURAMILL_DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("NEURAMILL_DB_POOL_TIMEOUT", 30))
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
@@ -7,23 +7,79 @@ This file defines the SQLAlchemy models that represent the core entities of the
 """
 
 from ast import List
-from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, create_engine
+import json
+import re
+
+from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, Table, Index, create_engine, event, inspect, select, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from app.db.database import engine
 from app.db.base import Base
+from app.utils.machine_specs import extract_machine_specs
 
 # Create base class for declarative models
 Base = declarative_base()
 
+
+def normalize_key(value: str) -> str:
+    """Case- and whitespace-insensitive lookup key: ' VF-2 SS ' -> 'vf-2 ss'."""
+    return " ".join(str(value).split()).lower()
+
+
+def normalize_material_class(name: str) -> str:
+    """Canonical form of a workpiece material class: 'Stainless Steel ' -> 'stainless steel'."""
+    return normalize_key(name)
+
+
+def _key_of(source: str):
+    """Column default that derives a *_key column from `source` on insert (ORM and Core)."""
+    def default(context):
+        value = context.get_current_parameters().get(source)
+        return normalize_key(value) if value is not None else None
+    return default
+
+
+# Many-to-many: which workpiece material classes a tool can cut.
+# The primary key indexes tool -> classes, ix_tool_material_classes_class indexes class -> tools.
+tool_material_classes = Table(
+    "tool_material_classes",
+    Base.metadata,
+    Column("tool_id", Integer, ForeignKey("tools.tool_id", ondelete="CASCADE"), primary_key=True),
+    Column("material_class_id", Integer, ForeignKey("material_classes.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_tool_material_classes_class", "material_class_id", "tool_id"),
+)
+
+
+class MaterialClass(Base):
+    """
+    A normalized workpiece material class from the tool catalog ("aluminum", "stainless steel", ...).
+    Tools reference these through `tool_material_classes` instead of a JSON string.
+    """
+    __tablename__ = "material_classes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False)  # normalize_material_class(...)
+
+    tools = relationship("Tool", secondary=tool_material_classes, back_populates="material_classes")
+
+
 class Tool(Base):
     """
     Represents a cutting tool in the system.
     Stores tool specifications and capabilities that affect cutting performance.
     """
     __tablename__ = "tools"
+    # Catalog browsing pages by (diameter, tool_id); each filter gets an index ending in that order
+    __table_args__ = (
+        Index("ix_tools_diameter_id", "diameter", "tool_id"),
+        Index("ix_tools_flutes_diameter_id", "flute_count", "diameter", "tool_id"),
+        Index("ix_tools_coating_diameter_id", "coating", "diameter", "tool_id"),
+        Index("ix_tools_manufacturer_diameter_id", "manufacturer", "diameter", "tool_id"),
+    )
 
     tool_id = Column(Integer, primary_key=True, index=True)
+    part_number = Column(String, unique=True, index=True)   # vendor part number, the CSV tool_id (e.g. 03-0073)
+    content_hash = Column(String)                           # seed.py change detection; NULL for rows not loaded from a CSV
     #material_id = Column(Integer)
     name = Column(String, index=True)
     type = Column(String)
@@ -37,7 +93,7 @@ class Tool(Base):
     cutting_length = Column(Float)
     overall_length = Column(Float)
     helix_angle = Column(Float)
-    workpiece_materials = Column(String)
+    workpiece_materials = Column(String)    # JSON list as in the source CSV; see material_classes
     center_cutting = Column(String)
     price_usd = Column(Float)
     manufacturer = Column(String)
@@ -47,6 +103,8 @@ class Tool(Base):
     product_link = Column(String)
     image_link = Column(String)
 
+    material_classes = relationship("MaterialClass", secondary=tool_material_classes, back_populates="tools")
+
 
 class Machine(Base):
     """
@@ -56,6 +114,7 @@ class Machine(Base):
     __tablename__ = "machines"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)                # VF-1
+    title_key = Column(String, index=True, default=_key_of("title"))  # normalize_key(title)
     description = Column(String)                      # Short description
     product_link = Column(String)                     # Link to product page
     price_json = Column(Text)                         # Price in currencies (stored as JSON string)
@@ -70,6 +129,24 @@ class Machine(Base):
     electrical_spec_json = Column(Text)               # Electrical requirements
     shipping_dims_json = Column(Text)                 # Shipping dimensions
     trunnion_json = Column(Text, nullable=True)       # (optional)
+    content_hash = Column(String)                     # seed.py change detection
+
+    # Typed capabilities extracted from the JSON specs (app.utils.machine_specs), for indexed filtering
+    max_rpm = Column(Float, index=True)               # rpm
+    x_travel = Column(Float, index=True)              # mm
+    y_travel = Column(Float, index=True)              # mm
+    z_travel = Column(Float, index=True)              # mm
+    table_length = Column(Float)                      # mm
+    table_width = Column(Float)                       # mm
+    max_rapid = Column(Float)                         # m/min, slowest axis
+    max_feed = Column(Float)                          # m/min, max cutting feed
+    taper = Column(String, index=True)                # e.g. "CT or BT 40"
+
+    def fill_specs(self):
+        """Set the typed capability columns from the JSON spec columns."""
+        specs = extract_machine_specs(self.travels_json, self.spindle_json, self.table_json, self.feedrates_json)
+        for key, value in specs.items():
+            setattr(self, key, value)
 
 class Material(Base):
     """
@@ -80,6 +157,7 @@ class Material(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True)
+    name_key = Column(String, index=True, default=_key_of("name"))  # normalize_key(name)
     hardness = Column(Float)
     machinability = Column(Float)  # placeholder
     yield_strength = Column(String)
@@ -89,19 +167,154 @@ class Material(Base):
     tensile_modulus = Column(String)
     flexural_strength = Column(String)
     flexural_modulus = Column(String)
+    content_hash = Column(String)  # seed.py change detection
 
 class Operation(Base):
     __tablename__ = "operations"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
+    name_key = Column(String, index=True, default=_key_of("name"))  # normalize_key(name)
     description = Column(String)
     recommended_speed = Column(Float)
     recommended_feed = Column(Float) 
 
 
+# Normalized lookup key column -> the column it is derived from
+LOOKUP_KEYS = [
+    (Material.__table__, "name_key", "name"),
+    (Machine.__table__, "title_key", "title"),
+    (Operation.__table__, "name_key", "name"),
+]
+
+
+
+def _sync_lookup_key(mapper, connection, target):
+    """Re-derive the lookup key when an ORM update changes its source column."""
+    for table, key, source in LOOKUP_KEYS:
+        if table is mapper.local_table and getattr(target, source) is not None:
+            setattr(target, key, normalize_key(getattr(target, source)))
+
+
+for model in (Material, Machine, Operation):
+    event.listen(model, "before_update", _sync_lookup_key)
+
+
+def matching_material_classes(material: str):
+    """
+    SELECT of the ids of the material classes a workpiece material matches: every class whose
+    name contains the normalized material, the recommender's rule (ToolCatalog.material_mask).
+    The LIKE scans material_classes, which holds a few dozen rows; run it first and filter
+    tool_material_classes by the resulting ids, which its (material_class_id, tool_id) index serves.
+    """
+    needle = normalize_material_class(material)
+    return select(MaterialClass.id).where(MaterialClass.name.contains(needle, autoescape=True))
+
+
+def tools_linked_to(class_ids: list[int]):
+    """SELECT of the ids of tools supporting any of the material classes `class_ids`."""
+    return select(tool_material_classes.c.tool_id).where(tool_material_classes.c.material_class_id.in_(class_ids))
+
+
+def write_material_class_links(conn, links) -> int:
+    """
+    Insert tool_material_classes rows for (tool_id, normalized material class name) pairs,
+    creating any material classes that do not exist yet. Returns the number of links written.
+    """
+    links = set(links)
+    classes_table = MaterialClass.__table__
+    classes = dict(conn.execute(select(classes_table.c.name, classes_table.c.id)).fetchall())
+    new_names = sorted({name for _, name in links} - set(classes))
+    if new_names:
+        conn.execute(classes_table.insert(), [{"name": name} for name in new_names])
+        classes = dict(conn.execute(select(classes_table.c.name, classes_table.c.id)).fetchall())
+    if links:
+        conn.execute(tool_material_classes.insert(), [
+            {"tool_id": tool_id, "material_class_id": classes[name]} for tool_id, name in links
+        ])
+    return len(links)
+
+
+def link_tool_material_classes(conn) -> int:
+    """Fill tool_material_classes from the tools' workpiece_materials JSON. Returns the number of links."""
+    links = []
+    for tool_id, raw in conn.execute(text("SELECT tool_id, workpiece_materials FROM tools")).fetchall():
+        try:
+            names = json.loads(raw or "[]")
+        except (TypeError, ValueError):
+            continue
+        for name in names if isinstance(names, list) else []:
+            if isinstance(name, str) and name.strip():
+                links.append((tool_id, normalize_material_class(name)))
+    return write_material_class_links(conn, links)
+
+
+_PART_NUMBER_IN_LINK = re.compile(r"/([^/]+)\.html$")
+
+
+def upgrade_schema(bind=engine):
+    """
+    Bring a database created by an older version of these models up to date:
+    add missing (nullable) columns and their indexes, then fill the typed machine
+    columns and the normalized lookup keys for rows that predate them.
+
+    Not run at import, so importing the models never writes to a database: the
+    app runs it on startup, and so do the seed and `python -m app.db.models`.
+    """
+    inspector = inspect(bind)
+    added = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                    added.append(f"{table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+        rows = conn.execute(text(
+            "SELECT id, travels_json, spindle_json, table_json, feedrates_json FROM machines "
+            "WHERE max_rpm IS NULL OR (max_feed IS NULL AND feedrates_json LIKE '%Max Cutting%')"
+        )).fetchall()
+        for machine_id, *specs in rows:
+            values = extract_machine_specs(*specs)
+            if any(v is not None for v in values.values()):
+                conn.execute(Machine.__table__.update().where(Machine.id == machine_id).values(**values))
+
+        for table, key, source in LOOKUP_KEYS:
+            rows = conn.execute(text(
+                f"SELECT id, {source} FROM {table.name} WHERE {key} IS NULL AND {source} IS NOT NULL"
+            )).fetchall()
+            for row_id, value in rows:
+                conn.execute(table.update().where(table.c.id == row_id).values({key: normalize_key(value)}))
+
+        # Tools seeded before part_number existed: recover it from the vendor product link (.../03-0073.html)
+        rows = conn.execute(text(
+            "SELECT tool_id, product_link FROM tools WHERE part_number IS NULL AND product_link IS NOT NULL"
+        )).fetchall()
+        taken = set(conn.execute(text("SELECT part_number FROM tools WHERE part_number IS NOT NULL")).scalars())
+        for tool_id, link in rows:
+            match = _PART_NUMBER_IN_LINK.search(link)
+            if match and match.group(1) not in taken:
+                taken.add(match.group(1))
+                conn.execute(Tool.__table__.update().where(Tool.tool_id == tool_id).values(part_number=match.group(1)))
+
+        # Databases seeded before tool_material_classes existed have tools but no links yet
+        if not conn.execute(text("SELECT 1 FROM tool_material_classes LIMIT 1")).first():
+            linked = link_tool_material_classes(conn)
+            if linked:
+                print(f"🛠️ Linked {linked} tool material classes")
+    if added:
+        print(f"🛠️ Added columns: {', '.join(added)}")
+
+
 Base.metadata.create_all(bind=engine)
 
 if __name__ == "__main__":
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
     print("✅ Tables created.")
@@ -1,14 +1,24 @@
-import pandas as pd
-import json
-from database import SessionLocal # importing a sesson factory
-from models import Machine
-import models
 import ast
-import re
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, func, select
+
+from app.db import models
+from app.db.database import engine
+from app.utils.machine_specs import extract_machine_specs
+
+# Loaders transform a whole CSV with pandas, then upsert it with Core executemany
+# statements inside a single transaction (no ORM objects, no per-row queries).
+# Rows are matched on a natural key and carry a content hash, so a refresh only
+# writes what changed and existing ids stay stable.
+# Run from neurmill_poc_py/:  python -m app.db.seed
+
+# Rows per executemany call; all batches share one transaction
+INSERT_BATCH = 50_000
 
-# tool = Tool(...)  # Create tool objects
-# db.add(tool)      # Add them to session
-# db.commit()       # Write to DB
 
 def parse_diameter(raw_val, name):
     """
@@ -30,161 +40,359 @@ def parse_diameter(raw_val, name):
         return val / 25.4  # fix mm-to-mm error
 
 
+def parse_lengths(values: pd.Series, names: pd.Series) -> pd.Series:
+    """Vectorized parse_diameter over a whole column."""
+    if values.dtype.kind in "if":
+        numeric = values.astype(float)
+    else:
+        cleaned = values.astype(str).str.replace('"', '', regex=False).str.replace('mm', '', regex=False).str.strip()
+        numeric = pd.to_numeric(cleaned, errors="coerce")
+    inch = names.fillna("").astype(str).str.contains('"', regex=False)
+    return numeric.where(inch, numeric / 25.4).fillna(0.0)
+
+
 def safe_eval(field_val, field_name, title):
-    try:
-        if isinstance(field_val, dict):
-            return field_val
-        elif isinstance(field_val, str):
-            return eval(field_val)
-    except Exception as e:
-        print(f"❌ Failed to parse {field_name} for {title}: {e}")
+    """Parse a dict/list literal from the CSV (JSON or Python repr) without eval."""
+    if isinstance(field_val, (dict, list)):
+        return field_val
+    if isinstance(field_val, str):
+        try:
+            return json.loads(field_val)
+        except ValueError:
+            pass
+        try:
+            return ast.literal_eval(field_val)
+        except (ValueError, SyntaxError) as e:
+            print(f"❌ Failed to parse {field_name} for {title}: {e}")
     return {}
 
-def load_tools(csv_path):
-    db = SessionLocal()
-    df = pd.read_csv(csv_path)
 
-    # 💥 Optional: clear existing tools to avoid duplicates
-    db.query(models.Tool).delete()
-
-    for _, row in df.iterrows():
-        # Clean diameter values
-        diameter=parse_diameter(row.get('diameter', 0.0), row.get('name', ''))
-        shank_diameter = parse_diameter(row.get('shank_diameter', 0.0), row.get('name', ''))
-        cutting_length = parse_diameter(row.get('cutting_length', 0.0), row.get('name', ''))
-        overall_length = parse_diameter(row.get('overall_length', 0.0), row.get('name', ''))
-        max_depth_of_cut = parse_diameter(row.get('max_depth_of_cut', 0.0), row.get('name', ''))
-
-        tool = models.Tool(
-            name=row.get('name'),
-            type=row.get('type'),
-            diameter=diameter,
-            shank_diameter=shank_diameter,
-            flute_count=row.get('flute_count', 0),
-            material=row.get('material'),
-            coating=row.get('coating'),
-            max_speed=row.get('max_speed', 0.0),
-            max_feed=row.get('max_feed', 0.0),
-            cutting_length=cutting_length,
-            overall_length=overall_length,
-            helix_angle=row.get('helix_angle', 0.0),
-            workpiece_materials=json.dumps(ast.literal_eval(row.get('workpiece_materials', '[]'))),
-            center_cutting=row.get('center_cutting'),
-            price_usd=row.get('price_usd', 0.0),
-            manufacturer=row.get('manufacturer'),
-            max_depth_of_cut=max_depth_of_cut,
-            max_rpm=row.get('max_rpm', 0.0),
-            speed_feed_link=row.get('speed_feed_link'),
-            product_link=row.get('product_link'),
-            image_link=row.get('image_link')
-        )
-        db.add(tool)
-
-    db.commit()
-    db.close()
-    print("✅ Tools loaded successfully.")
+def parse_literal_column(values: pd.Series, field_name: str, titles: pd.Series, default) -> pd.Series:
+    """safe_eval over a column, parsing each distinct string once."""
+    parsed = {}
+    for value, title in zip(values, titles):
+        if isinstance(value, str) and value not in parsed:
+            parsed[value] = safe_eval(value, field_name, title)
+    return values.map(lambda v: parsed.get(v, default) if isinstance(v, str) else default)
 
 
-#  Load CNC machine data (like specs and configs) into the Machine table
-def load_machines(csv_path):
-    db = SessionLocal()
-    
-    # 💥 Step 1: Clear old records
-    db.query(Machine).delete()
+def records(df: pd.DataFrame) -> list[dict]:
+    """DataFrame -> list of dicts with plain Python values and None for missing."""
+    # Column-wise tolist() is several times faster than DataFrame.to_dict("records")
+    columns = [
+        df[name].tolist() if not df[name].isna().any() else df[name].astype(object).where(df[name].notna(), None).tolist()
+        for name in df.columns
+    ]
+    keys = list(df.columns)
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def insert_rows(conn, table, rows: list[dict]):
+    for start in range(0, len(rows), INSERT_BATCH):
+        conn.execute(table.insert(), rows[start:start + INSERT_BATCH])
+
+
+def row_hashes(frame: pd.DataFrame) -> pd.Series:
+    """Per-row content hash over every column of `frame` (hex strings)."""
+    return pd.util.hash_pandas_object(frame, index=False).map("{:016x}".format)
+
+
+def upsert_rows(conn, table, key: str, frame: pd.DataFrame, delete_missing: bool = True) -> dict:
+    """
+    Make `table` match `frame` for the rows keyed by `key`, writing only differences.
+
+    - Rows whose key is new are inserted; ids continue after the current max id.
+    - Rows whose content hash changed are updated in place (same id).
+    - With delete_missing, rows that were loaded from a CSV earlier (content_hash set)
+      but are no longer in `frame` are deleted. Rows created through the API have no
+      content hash and are never deleted.
+    - The key must be unique in `frame`, but need not be in the table (titles and names
+      are not unique columns): a frame row is matched to the CSV-loaded row with its key
+      if there is one, else to the oldest. Other rows with that key are left alone,
+      except extra CSV-loaded ones, which are deleted with delete_missing.
+
+    Returns:
+        dict: inserted / updated / deleted / unchanged counts, plus `ids` (the id of every
+        frame row, aligned with `frame`), `written` (mask of inserted or updated rows)
+        and `deleted_ids`.
+    """
+    duplicated = frame[key].duplicated()
+    if duplicated.any():
+        raise ValueError(f"Duplicate {table.name}.{key} in the loaded rows: {frame[key][duplicated].head(5).tolist()}")
+    frame = frame.reset_index(drop=True).copy()
+    frame["content_hash"] = row_hashes(frame)
+    pk = list(table.primary_key.columns)[0]
+
+    existing = pd.DataFrame(
+        conn.execute(select(pk, table.c[key], table.c.content_hash).where(table.c[key].isnot(None))).fetchall(),
+        columns=["_id", key, "_old_hash"],
+    )
+    # One row per key to match against: CSV-loaded first, then oldest
+    matchable = (
+        existing.assign(_api=existing["_old_hash"].isna())
+        .sort_values(["_api", "_id"])
+        .drop_duplicates(key)
+        .drop(columns="_api")
+    )
+    merged = frame[[key, "content_hash"]].merge(matchable, on=key, how="left", validate="one_to_one")
+    is_new = merged["_id"].isna().to_numpy()
+    changed = ~is_new & (merged["_old_hash"] != merged["content_hash"]).to_numpy()
+
+    ids = merged["_id"].to_numpy(dtype=float, copy=True)
+    next_id = (conn.execute(select(func.max(pk))).scalar() or 0) + 1
+    ids[is_new] = np.arange(next_id, next_id + is_new.sum())
+    ids = ids.astype(np.int64)
+
+    if is_new.any():
+        insert_rows(conn, table, records(frame[is_new].assign(**{pk.name: ids[is_new]})))
+    if changed.any():
+        statement = table.update().where(pk == bindparam("_id"))
+        rows = records(frame[changed].assign(_id=ids[changed]))
+        for start in range(0, len(rows), INSERT_BATCH):
+            conn.execute(statement, rows[start:start + INSERT_BATCH])
+
+    deleted_ids = []
+    if delete_missing:
+        gone = existing[~existing["_id"].isin(ids) & existing["_old_hash"].notna()]
+        deleted_ids = gone["_id"].astype(int).tolist()
+        for start in range(0, len(deleted_ids), INSERT_BATCH):
+            conn.execute(table.delete().where(pk.in_(deleted_ids[start:start + INSERT_BATCH])))
+
+    return {
+        "inserted": int(is_new.sum()),
+        "updated": int(changed.sum()),
+        "deleted": len(deleted_ids),
+        "unchanged": int(len(frame) - is_new.sum() - changed.sum()),
+        "ids": ids,
+        "written": is_new | changed,
+        "deleted_ids": deleted_ids,
+    }
+
+
+def report(label: str, result: dict):
+    print(f"✅ {label}: {result['inserted']} inserted, {result['updated']} updated, "
+          f"{result['deleted']} deleted, {result['unchanged']} unchanged.")
+
+
+def column(df: pd.DataFrame, name: str, default=None) -> pd.Series:
+    """A CSV column, or a column of `default` if the CSV does not have it."""
+    if name in df:
+        return df[name]
+    return pd.Series(default, index=df.index, dtype=object if default is None else None)
 
+
+def prepare_tools(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Transform a tool CSV into Tool rows and (row position, material class) links.
+
+    Returns:
+        (tools, links): `tools` has the Tool columns; `links` has `position` (index into
+        `tools`) and `material_class` (normalized name) for the association table.
+    """
+    names = column(df, "name")
+    tools = pd.DataFrame({
+        "part_number": column(df, "tool_id").astype("string").str.strip().astype(object),
+        "name": names,
+        "type": column(df, "type"),
+        "diameter": parse_lengths(column(df, "diameter", 0.0), names),
+        "shank_diameter": parse_lengths(column(df, "shank_diameter", 0.0), names),
+        "flute_count": column(df, "flute_count", 0),
+        "material": column(df, "material"),
+        "coating": column(df, "coating"),
+        "max_speed": column(df, "max_speed", 0.0),
+        "max_feed": column(df, "max_feed", 0.0),
+        "cutting_length": parse_lengths(column(df, "cutting_length", 0.0), names),
+        "overall_length": parse_lengths(column(df, "overall_length", 0.0), names),
+        "helix_angle": column(df, "helix_angle", 0.0),
+        "center_cutting": column(df, "center_cutting"),
+        "price_usd": column(df, "price_usd", 0.0),
+        "manufacturer": column(df, "manufacturer"),
+        "max_depth_of_cut": parse_lengths(column(df, "max_depth_of_cut", 0.0), names),
+        "max_rpm": column(df, "max_rpm", 0.0),
+        "speed_feed_link": column(df, "speed_feed_link"),
+        "product_link": column(df, "product_link"),
+        "image_link": column(df, "image_link"),
+    }).reset_index(drop=True)
+
+    materials = parse_literal_column(column(df, "workpiece_materials", "[]").reset_index(drop=True),
+                                     "workpiece_materials", tools["name"], [])
+    materials = materials.map(lambda m: m if isinstance(m, list) else [])
+    tools["workpiece_materials"] = materials.map(json.dumps)
+
+    links = materials.explode().dropna()
+    links = links[links.map(lambda m: isinstance(m, str))]
+    links = links.str.split().str.join(" ").str.lower()
+    links = (
+        pd.DataFrame({"position": links.index, "material_class": links.values})
+        .loc[lambda d: d["material_class"] != ""]
+        .drop_duplicates()
+    )
+    return tools, links
+
+
+def load_tools_frame(df: pd.DataFrame, bind=engine) -> dict:
+    """
+    Upsert a tool DataFrame into the catalog, keyed on the vendor part number.
+    Returns the upsert_rows counts.
+    """
+    tools, links = prepare_tools(df)
+    tools = tools[tools["part_number"].notna()].drop_duplicates("part_number", keep="last")
+    links = links[links["position"].isin(tools.index)]
+    links = links.assign(position=tools.index.get_indexer(links["position"]))
+    tools = tools.reset_index(drop=True)
+
+    tool_table = models.Tool.__table__
+    link_table = models.tool_material_classes
+    with bind.begin() as conn:
+        # Into an empty catalog, secondary indexes are rebuilt once after the load instead of updated per row
+        fresh = conn.execute(select(tool_table.c.tool_id).limit(1)).first() is None
+        indexes = list(tool_table.indexes) + list(link_table.indexes) if fresh else []
+        for index in indexes:
+            index.drop(bind=conn, checkfirst=True)
+
+        result = upsert_rows(conn, tool_table, "part_number", tools)
+
+        # Re-link only inserted/updated tools; drop links of deleted ones
+        stale = result["ids"][result["written"]].tolist() + result["deleted_ids"]
+        for start in range(0, len(stale), INSERT_BATCH):
+            conn.execute(link_table.delete().where(link_table.c.tool_id.in_(stale[start:start + INSERT_BATCH])))
+        written_links = links[result["written"][links["position"].to_numpy()]]
+        models.write_material_class_links(conn, zip(
+            result["ids"][written_links["position"].to_numpy()].tolist(), written_links["material_class"]
+        ))
+
+        for index in indexes:
+            index.create(bind=conn)
+    return result
+
+
+def load_tools(csv_path, bind=engine):
+    report("Tools", load_tools_frame(pd.read_csv(csv_path), bind))
+
+
+# Rebuild the association for a database seeded before tool_material_classes existed
+# Spec columns scraped as dict literals, and the Machine column each one is stored in
+MACHINE_SPEC_COLUMNS = {
+    "price": "price_json",
+    "Travels": "travels_json",
+    "Spindle": "spindle_json",
+    "Table": "table_json",
+    "Feedrates": "feedrates_json",
+    "Axis Motors": "axis_motors_json",
+    "Tool Changer": "tool_changer_json",
+    "General": "general_json",
+    "Air Requirements": "air_requirements_json",
+    "Electrical Specification": "electrical_spec_json",
+    "Dimensions - Shipping": "shipping_dims_json",
+}
+
+
+#  Load CNC machine data (like specs and configs) into the Machine table
+def load_machines(csv_path, bind=engine):
     df = pd.read_csv(csv_path)
+    titles = column(df, "title").fillna("Unknown")
+    machines = pd.DataFrame({
+        "title": titles,
+        "description": column(df, "description"),
+        "product_link": column(df, "product_link"),
+    })
+
+    parsed = {}
+    for source, target in MACHINE_SPEC_COLUMNS.items():
+        parsed[target] = parse_literal_column(column(df, source), source, titles, {})
+        machines[target] = parsed[target].map(json.dumps)
+    trunnion = column(df, "Trunnion")
+    machines["trunnion_json"] = parse_literal_column(trunnion, "Trunnion", titles, {}).map(json.dumps).where(trunnion.notna(), None)
+
+    # Typed max_rpm / travels / table / rapid / taper columns for indexed queries
+    specs = pd.DataFrame([
+        extract_machine_specs(*spec)
+        for spec in zip(parsed["travels_json"], parsed["spindle_json"], parsed["table_json"], parsed["feedrates_json"])
+    ], index=machines.index)
+    machines = pd.concat([machines, specs], axis=1)
+
+    machines = machines.drop_duplicates("title", keep="last")
+
+    with bind.begin() as conn:
+        result = upsert_rows(conn, models.Machine.__table__, "title", machines)
+    report("Machines", result)
+
+
+def parse_hardness(values: pd.Series) -> pd.Series:
+    """'45 – 105' -> 75.0 (mean of a range), '130' -> 130.0, unparseable -> 0.0."""
+    parts = values.astype(str).str.replace("–", "-", regex=False).str.split("-", n=1, expand=True)
+    low = pd.to_numeric(parts[0].str.strip(), errors="coerce")
+    if parts.shape[1] > 1:
+        high = pd.to_numeric(parts[1].str.strip(), errors="coerce")
+        low = low.where(parts[1].isna(), (low + high) / 2)
+    return low.fillna(0.0)
+
+
+def text_column(df: pd.DataFrame, name: str) -> pd.Series:
+    return column(df, name).astype("string").str.strip().astype(object)
 
-    for _, row in df.iterrows():
-        title = row.get('title', 'Unknown')
-        machine = Machine(
-            title=title,
-            description=row.get('description'),
-            product_link=row.get('product_link'),
-
-            price_json=json.dumps(safe_eval(row.get('price'), 'price', title)),
-            travels_json=json.dumps(safe_eval(row.get('Travels'), 'Travels', title)),
-            spindle_json=json.dumps(safe_eval(row.get('Spindle'), 'Spindle', title)),
-            table_json=json.dumps(safe_eval(row.get('Table'), 'Table', title)),
-            feedrates_json=json.dumps(safe_eval(row.get('Feedrates'), 'Feedrates', title)),
-            axis_motors_json=json.dumps(safe_eval(row.get('Axis Motors'), 'Axis Motors', title)),
-            tool_changer_json=json.dumps(safe_eval(row.get('Tool Changer'), 'Tool Changer', title)),
-            general_json=json.dumps(safe_eval(row.get('General'), 'General', title)),
-            air_requirements_json=json.dumps(safe_eval(row.get('Air Requirements'), 'Air Requirements', title)),
-            electrical_spec_json=json.dumps(safe_eval(row.get('Electrical Specification'), 'Electrical Specification', title)),
-            shipping_dims_json=json.dumps(safe_eval(row.get('Dimensions - Shipping'), 'Dimensions - Shipping', title)),
-            trunnion_json=json.dumps(safe_eval(row.get('Trunnion'), 'Trunnion', title)) if pd.notna(row.get('Trunnion')) else None
-        )
-
-        db.add(machine)
-
-    db.commit()
-    db.close()
-    print("✅ Machines loaded successfully.")
 
 # Populate the Material table with material properties (steel, aluminum, etc.)
-def load_materials(csv_path):
-    db = SessionLocal()
+def load_materials(csv_path, bind=engine):
     df = pd.read_csv(csv_path)
+    names = column(df, "Material").astype("string").str.split("/").str[0].str.strip()
+    materials = pd.DataFrame({
+        "name": names.astype(object),
+        "hardness": parse_hardness(column(df, "Hardness", "")),
+        "machinability": 50.0,  # Placeholder or calculated value
+        "yield_strength": text_column(df, "Yield strength (MPa)"),
+        "tensile_strength": text_column(df, "Tensile strength (MPa)"),
+        "elongation": text_column(df, "Elongation at break (%)"),
+        "modulus_elasticity": text_column(df, "Modulus of elasticity (GPa)"),
+        "tensile_modulus": text_column(df, "Tensile modulus (MPa)"),
+        "flexural_strength": text_column(df, "Flexural strength (MPa)"),
+        "flexural_modulus": text_column(df, "Flexural modulus (GPa)"),
+    })
+    materials = materials[materials["name"].notna()].drop_duplicates("name")
 
-    for _, row in df.iterrows():
-        name = row.get("Material")
-        hardness_raw = row.get("Hardness", "")
-        
-        if isinstance(name, str):
-            name = name.split("/")[0].strip()
+    # Several material CSVs are loaded into the same table, so names missing from this one are kept
+    with bind.begin() as conn:
+        result = upsert_rows(conn, models.Material.__table__, "name", materials, delete_missing=False)
+    report("Materials", result)
 
-        # Parse hardness
-        try:
-            if "-" in str(hardness_raw):
-                parts = hardness_raw.replace("–", "-").split("-")
-                hardness = (float(parts[0].strip()) + float(parts[1].strip())) / 2
-            else:
-                hardness = float(hardness_raw)
-        except:
-            hardness = 0.0
-
-        # Skip if already exists
-        existing = db.query(models.Material).filter_by(name=name).first()
-        if existing:
-            continue
-
-        material = models.Material(
-            name=name,
-            hardness=hardness,
-            machinability=50.0,  # Placeholder or calculated value
-            yield_strength=str(row.get("Yield strength (MPa)", "")).strip(),
-            tensile_strength=str(row.get("Tensile strength (MPa)", "")).strip(),
-            elongation=str(row.get("Elongation at break (%)", "")).strip(),
-            modulus_elasticity=str(row.get("Modulus of elasticity (GPa)", "")).strip(),
-            tensile_modulus = str(row.get("Tensile modulus (MPa)", "")).strip(),
-            flexural_strength=str(row.get("Flexural strength (MPa)", "")).strip(),
-            flexural_modulus=str(row.get("Flexural modulus (GPa)", "")).strip()
-        )
-
-        db.add(material)
-
-    db.commit()
-    db.close()
-    print("✅ Materials loaded successfully.")
 
 # Load operations (like description, speed rate, feed rate) into the Operation table
-def load_operations(csv_path):
-    db = SessionLocal()
+def load_operations(csv_path, bind=engine):
     df = pd.read_csv(csv_path)
-    for _, row in df.iterrows():
-        operation = models.Operation(
-            name=row.get('name'),
-            description=row.get('description'),
-            recommended_speed=row.get('recommended_speed', 0.0),
-            recommended_feed=row.get('recommended_feed', 0.0)
-        )
-        db.add(operation)
-    db.commit()
-    db.close()
+    operations = pd.DataFrame({
+        "name": column(df, "name"),
+        "description": column(df, "description"),
+        "recommended_speed": column(df, "recommended_speed", 0.0),
+        "recommended_feed": column(df, "recommended_feed", 0.0),
+    })
+    with bind.begin() as conn:
+        insert_rows(conn, models.Operation.__table__, records(operations))
     print("✅ Operations loaded successfully.")
 
+# Dataset CSVs under datasets/ and the loader for each, in load order
+DATASET_LOADERS = {
+    "end_mills_cleaned.csv": load_tools,
+    "vf-series-ds.csv": load_machines,
+    "all_materials_cleaned.csv": load_materials,
+}
+
+
+def load_datasets(directory, bind=engine) -> list[str]:
+    """Upsert every known dataset CSV found in `directory`; returns the files loaded."""
+    models.upgrade_schema(bind)
+    loaded = []
+    for file_name, loader in DATASET_LOADERS.items():
+        csv_path = os.path.join(directory, file_name)
+        if os.path.exists(csv_path):
+            loader(csv_path, bind)
+            loaded.append(file_name)
+    return loaded
+
+
 # change this to where your csv's are located
 if __name__ == "__main__":
+    models.upgrade_schema(engine)
+
     # load_tools("/Users/nkhormaei/Projects/poc_v1/end_mills_cleaned.csv")
     # load_machines("/Users/nkhormaei/Projects/poc_v1/vf-series-ds.csv")
     # load_materials("/Users/nkhormaei/Projects/poc_v1/all_materials_cleaned.csv")
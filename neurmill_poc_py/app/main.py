@@ -1,8 +1,16 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from app.api.v1.endpoints import tools, health, cad, materials, operations, machines
+from app.api.v1.endpoints import tools, health, cad, materials, operations, machines, admin
+from app.services.cad_parser import cad_backend_problem
+from app.services.catalog_reload import WATCH_INTERVAL, catalog_reloader
+from app.services.llm_planner import planner
+from app.services.offload import cad_pool, cpu_limiter
+from app.db.database import async_engine, engine
+from app.db.models import upgrade_schema
 
 app = FastAPI(
     title="Neuramill POC",
@@ -19,6 +27,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_watcher: asyncio.Task | None = None
+
+@app.on_event("startup")
+def upgrade_database():
+    upgrade_schema(engine)
+
+@app.on_event("startup")
+async def start_catalog_watcher():
+    global _watcher
+    problem = cad_backend_problem()
+    if problem:
+        print(f"⚠️ {problem}")
+    if WATCH_INTERVAL > 0:
+        _watcher = asyncio.create_task(catalog_reloader.watch())
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    if _watcher is not None:
+        _watcher.cancel()
+    cpu_limiter.shutdown()
+    cad_pool.shutdown()
+    planner.shutdown()
+    await async_engine.dispose()
+
 # Mount frontend
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
@@ -28,3 +60,5 @@ app.include_router(cad.router, prefix="/api/v1", tags=["CAD"])
 app.include_router(health.router, prefix="/api/v1", tags=["Health"])
 app.include_router(materials.router, prefix="/api/v1", tags=["Materials"])
 app.include_router(machines.router, prefix="/api/v1", tags=["Machines"])
+app.include_router(operations.router, prefix="/api/v1", tags=["Operations"])
+app.include_router(admin.router, prefix="/api/v1", tags=["Admin"])
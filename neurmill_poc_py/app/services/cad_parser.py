@@ -1,45 +1,178 @@
-from typing import List, Dict
-
-# def process_cad_file(cad_bytes: bytes) -> List[Dict]:
-#     """
-#     Stub function to simulate CAD parsing.
-#     Returns dummy feature data extracted from CAD input.
-
-#     Args:
-#         cad_bytes (bytes): Raw binary CAD file input
-
-#     Returns:
-#         List[Dict]: Dummy feature list
-#     """
-#     # In a real implementation, you'd parse STEP/IGES/etc.
-#     print("📦 Received CAD file of size:", len(cad_bytes))
-
-#     # Dummy features
-#     return [
-#         {
-#             "id": "feature_1",
-#             "type": "hole",
-#             "diameter_mm": 5.0,
-#             "depth_mm": 20.0
-#         },
-#         {
-#             "id": "feature_2",
-#             "type": "pocket",
-#             "width_mm": 10.0,
-#             "length_mm": 15.0,
-#             "depth_mm": 5.0
-#         }
-#     ]
-
-
-
-def process_cad_file(file_bytes) -> List[Dict]:
+"""
+CAD feature extraction for the tool recommender.
+
+STEP bytes are parsed in memory with OpenCascade (pythonocc-core) and every face
+is classified by the CAD analyzer app's classifier (cad_faces.classify_faces,
+which CADAnalyzer.detect_features uses too), mapped to the recommender's features:
+
+- cylinder -> "hole":    diameter, depth (axial length of the face), axis midpoint
+- cone     -> "chamfer": semi-angle in degrees, no diameter (any tool may cut it)
+- plane    -> "face":    area and normal, no diameter (any tool may face it)
+
+"cad experiment main/" is not a package (its name has spaces and its modules
+import each other as top-level modules), so cad_faces is imported from
+NEURAMILL_CAD_ANALYZER_DIR, which defaults to that directory of this repository.
+
+Features of the same type and size at the same position (within 1 µm) are
+reported once, so a hole split into two half-cylinder faces is one hole.
+Positions, diameters and depths are in the STEP file's units (mm).
+
+Parsing runs in the CAD process pool (app.services.offload.cad_pool), so the
+OpenCascade work neither blocks the event loop nor holds the API's GIL, and a
+file that crashes the parser only takes down one pool process.
+
+pythonocc-core is installed with conda (conda install -c conda-forge pythonocc-core).
+Without it, CAD uploads answer 503 unless NEURAMILL_SIMULATED_CAD=1 is set, which
+returns fixed demo features instead.
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from app.services.offload import cad_pool
+
+SIMULATED_CAD = os.getenv("NEURAMILL_SIMULATED_CAD", "0") == "1"
+CAD_ANALYZER_DIR = os.getenv(
+    "NEURAMILL_CAD_ANALYZER_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "cad experiment main"),
+)
+POSITION_DECIMALS = 3  # mm -> 1 µm
+
+# Returned for every file with NEURAMILL_SIMULATED_CAD=1
+SIMULATED_FEATURES = [
+    {"feature": "pocket", "diameter": 12.0, "position": [10.0, 20.0]},
+    {"feature": "hole", "diameter": .25, "position": [30.5, 45.2]},
+    {"feature": "slot", "diameter": 8.0, "position": [60.0, 10.0]},
+]
+
+
+class CADBackendUnavailable(RuntimeError):
+    """pythonocc-core is not installed in the process that parses CAD files."""
+
+
+@contextmanager
+def _in_memory_path(data: bytes) -> Iterator[str]:
     """
-    Simulates parsing a CAD file and extracting machining features.
+    A path that reads back `data` without touching the disk: an anonymous memfd on
+    Linux. pythonocc does not wrap std::istream, so STEPControl_Reader.ReadStream
+    cannot be fed from Python; ReadFile on the memfd is the in-memory equivalent.
+    Elsewhere, falls back to a temporary file.
+    """
+    if hasattr(os, "memfd_create"):
+        fd = os.memfd_create("neuramill-cad")
+        try:
+            with open(fd, "wb", closefd=False) as f:
+                f.write(data)
+            yield f"/proc/self/fd/{fd}"
+        finally:
+            os.close(fd)
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".step") as f:
+            f.write(data)
+            f.flush()
+            yield f.name
+
+
+def cad_backend_problem() -> str | None:
+    """Why real CAD parsing would fail in this environment, or None if it can run (or is simulated)."""
+    if SIMULATED_CAD:
+        return None
+    if importlib.util.find_spec("OCC") is None:
+        return ("pythonocc-core is not installed: CAD uploads will answer 503 "
+                "(conda install -c conda-forge pythonocc-core, or set NEURAMILL_SIMULATED_CAD=1)")
+    if not os.path.isfile(os.path.join(CAD_ANALYZER_DIR, "cad_faces.py")):
+        return f"cad_faces.py not found in NEURAMILL_CAD_ANALYZER_DIR ({CAD_ANALYZER_DIR})"
+    return None
+
+
+def _position(point) -> tuple:
+    # + 0.0 turns -0.0 into 0.0, so mirrored rounding never splits a feature
+    return tuple(round(c, POSITION_DECIMALS) + 0.0 for c in point)
+
+
+def extract_features(cad_bytes: bytes) -> List[Dict]:
+    """
+    Parse STEP bytes and return their machining features. Runs in the calling
+    process; use process_cad_file to run it in the CAD process pool.
+
+    Raises:
+        ValueError: If the bytes are not a readable STEP model
+        CADBackendUnavailable: If pythonocc-core is not installed
+    """
+    if SIMULATED_CAD:
+        return [dict(f) for f in SIMULATED_FEATURES]
+    if CAD_ANALYZER_DIR not in sys.path:
+        sys.path.append(CAD_ANALYZER_DIR)
+    try:
+        from OCC.Core.IFSelect import IFSelect_RetDone
+        from OCC.Core.STEPControl import STEPControl_Reader
+        from cad_faces import classify_faces
+    except ImportError as e:
+        if e.name == "cad_faces":
+            raise CADBackendUnavailable(
+                f"cad_faces.py not found in NEURAMILL_CAD_ANALYZER_DIR ({CAD_ANALYZER_DIR})"
+            )
+        raise CADBackendUnavailable(
+            "CAD parsing needs pythonocc-core (conda install -c conda-forge pythonocc-core); "
+            "set NEURAMILL_SIMULATED_CAD=1 to use demo features instead"
+        )
+
+    if not cad_bytes:
+        raise ValueError("Empty CAD file")
+    reader = STEPControl_Reader()
+    with _in_memory_path(cad_bytes) as path:
+        if reader.ReadFile(path) != IFSelect_RetDone:
+            raise ValueError("Failed to read STEP file - file may be corrupted or not a STEP model")
+    if reader.TransferRoots() != IFSelect_RetDone:
+        raise ValueError("Failed to transfer STEP file contents")
+    shape = reader.OneShape()
+    if shape.IsNull():
+        raise ValueError("No valid shape found in STEP file")
+
+    features, seen = [], set()
+    for _, face_feature in classify_faces(shape):
+        if face_feature["type"] == "hole":
+            # Axis midpoint rather than the face centroid: both halves of a split hole map to the same point
+            axis_point = face_feature["axis_point"]
+            feature = {
+                "feature": "hole",
+                "diameter": round(face_feature["diameter"], 4),
+                "depth": round(face_feature["depth"], 4),
+                "position": _position((axis_point["x"], axis_point["y"], axis_point["z"])),
+            }
+        else:
+            position = _position((face_feature["x"], face_feature["y"], face_feature["z"]))
+            if face_feature["type"] == "chamfer":
+                feature = {"feature": "chamfer", "angle": round(face_feature["angle"], 3), "position": position}
+            else:
+                normal = face_feature["normal"]
+                feature = {"feature": "face", "area": round(face_feature["surface_area"], 4),
+                           "normal": [round(normal["x"], 6), round(normal["y"], 6), round(normal["z"], 6)],
+                           "position": position}
+
+        key = (feature["feature"], feature["position"], feature.get("diameter"), feature.get("depth"))
+        if key not in seen:
+            seen.add(key)
+            features.append({**feature, "position": list(feature["position"])})
+    return features
+
+
+def process_cad_file(cad_bytes: bytes) -> List[Dict]:
+    """
+    Machining features of a STEP part, extracted in the CAD process pool.
+
+    Blocks the calling thread until the pool is done: call it from work running
+    on the CPU executor (cpu_limiter), never directly on the event loop.
     """
-    print("🔍 Simulating CAD feature extraction...")
-    return [
-        {"feature": "pocket", "diameter": 12.0, "position": [10.0, 20.0]},
-        {"feature": "hole", "diameter": .25, "position": [30.5, 45.2]},
-        {"feature": "slot", "diameter": 8.0, "position": [60.0, 10.0]},
-    ]
+    print(f"🔍 Extracting CAD features from {len(cad_bytes)} bytes...")
+    try:
+        features = cad_pool.run(extract_features, cad_bytes)
+    except BrokenProcessPool:
+        raise ValueError("The CAD parser crashed on this file")
+    print(f"📐 {len(features)} CAD features extracted")
+    return features
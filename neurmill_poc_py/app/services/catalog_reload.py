@@ -0,0 +1,139 @@
+"""
+Hot reload of the tool catalog without restarting the API.
+
+A reload builds a new catalog version off the request path and installs it with
+tool_catalog.install_catalog; requests that already hold the previous version
+(catalog_lease) finish against it. Sources:
+
+- "db":       rebuild from the current DB contents
+- "csv":      upsert datasets/*.csv into the DB with app.db.seed first, then rebuild
+- "snapshot": only re-map the NEURAMILL_CATALOG_SNAPSHOT file
+
+When a snapshot file is configured, "db" and "csv" also compact the new catalog
+into it, and every other worker picks the new file up through its watcher.
+
+Triggered by POST /api/v1/admin/catalog/reload, or by the watcher task started
+with the app, which polls the snapshot file (and, with NEURAMILL_WATCH_DATASETS=1,
+the dataset CSVs) for changes. Enable dataset watching in one process only: each
+watching process upserts the CSVs into the shared DB.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from app.db import seed
+from app.db.database import SessionLocal
+from app.services.response_cache import bump_catalog_version
+from app.services.tool_catalog import ToolCatalog, compact_catalog, install_catalog, snapshot_path
+
+DATASETS_DIR = os.getenv(
+    "NEURAMILL_DATASETS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "datasets"),
+)
+WATCH_INTERVAL = float(os.getenv("NEURAMILL_CATALOG_WATCH_INTERVAL", 5))
+WATCH_DATASETS = os.getenv("NEURAMILL_WATCH_DATASETS", "0") == "1"
+
+SOURCES = ("db", "csv", "snapshot")
+
+
+def _mtimes(paths) -> dict:
+    return {path: os.stat(path).st_mtime_ns for path in paths if os.path.exists(path)}
+
+
+class CatalogReloader:
+    """Runs one catalog reload at a time and remembers how the last one went."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running: str | None = None
+        self.reloads = 0
+        self.last: dict | None = None
+        self._seen: dict = {}  # path -> mtime already reflected in the installed catalog
+
+    def reload(self, source: str = "db") -> dict:
+        """Build and install a new catalog version from `source`. Blocking; run it off the event loop."""
+        if source not in SOURCES:
+            raise ValueError(f"Unknown catalog source {source!r}, expected one of {SOURCES}")
+        start = time.perf_counter()
+        try:
+            path = snapshot_path()
+            if source == "snapshot":
+                if not path:
+                    raise ValueError("No catalog snapshot configured")
+                catalog = ToolCatalog.from_snapshot(path)
+            else:
+                if source == "csv":
+                    loaded = seed.load_datasets(DATASETS_DIR)
+                    print(f"📥 Datasets upserted: {', '.join(loaded) or 'none found'}")
+                db = SessionLocal()
+                try:
+                    catalog = compact_catalog(db, path) if path else ToolCatalog.from_db(db)
+                finally:
+                    db.close()
+                if path:
+                    catalog = ToolCatalog.from_snapshot(path)
+            version = install_catalog(catalog)
+            # The DB may have changed under the other catalog endpoints too
+            bump_catalog_version()
+            self._seen.update(self._watched_mtimes())
+            self.last = {"source": source, "version": version, "tools": len(catalog),
+                         "seconds": round(time.perf_counter() - start, 3), "error": None}
+            self.reloads += 1
+        except Exception as e:
+            print(f"❌ Catalog reload from {source} failed: {e}")
+            self.last = {"source": source, "version": None, "tools": None,
+                         "seconds": round(time.perf_counter() - start, 3), "error": str(e)}
+        finally:
+            self.running = None
+        return self.last
+
+    def try_start(self, source: str) -> bool:
+        """Claim the reloader for `source`; False if a reload is already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.running = source
+            return True
+
+    async def reload_in_background(self, source: str = "db") -> bool:
+        """Start a reload in a worker thread; returns False if one is already running."""
+        if source not in SOURCES:
+            raise ValueError(f"Unknown catalog source {source!r}, expected one of {SOURCES}")
+        if not self.try_start(source):
+            return False
+        asyncio.get_running_loop().run_in_executor(None, self.reload, source)
+        return True
+
+    def _watched_mtimes(self) -> dict:
+        paths = [snapshot_path()] if snapshot_path() else []
+        if WATCH_DATASETS:
+            paths += [os.path.join(DATASETS_DIR, name) for name in seed.DATASET_LOADERS]
+        return _mtimes(paths)
+
+    def changed_source(self) -> str | None:
+        """The source to reload from if a watched file changed since the last reload."""
+        changed = [path for path, mtime in self._watched_mtimes().items() if self._seen.get(path) != mtime]
+        if not changed:
+            return None
+        if WATCH_DATASETS and any(path.endswith(".csv") for path in changed):
+            return "csv"
+        return "snapshot"
+
+    async def watch(self, interval: float = WATCH_INTERVAL):
+        """Poll the watched files and reload when one changes. Runs until cancelled."""
+        self._seen = self._watched_mtimes()
+        while True:
+            await asyncio.sleep(interval)
+            source = self.changed_source()
+            if source:
+                print(f"👀 Catalog files changed, reloading from {source}")
+                await self.reload_in_background(source)
+
+    def status(self) -> dict:
+        return {"running": self.running, "reloads": self.reloads, "last": self.last,
+                "watching": sorted(self._watched_mtimes())}
+
+
+catalog_reloader = CatalogReloader()
@@ -0,0 +1,185 @@
+"""
+Immutable, memory-mapped catalog snapshot files.
+
+A snapshot is one file of NumPy column blocks:
+
+    MAGIC (8 bytes) | header length (uint64, little endian) | JSON header | column blocks
+
+The header lists every column's dtype, shape and byte offset (blocks are 64-byte
+aligned) plus free-form metadata. `open_snapshot` maps the file read-only with
+np.memmap, so every API worker process that opens the same snapshot shares the
+OS page cache for it instead of holding its own copy of the catalog. Snapshots
+are never modified in place: `write_snapshot` writes a temp file and renames it
+over the target, and processes that still map the old file keep reading it.
+
+Text and JSON rows are packed back to back in a uint8 column with an int64
+column of end offsets (PackedStrings / PackedJson), and are only decoded for the
+rows that are actually read.
+"""
+
+import json
+import os
+import tempfile
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"NMSNAP01"
+ALIGNMENT = 64
+
+
+class PackedStrings(Sequence):
+    """UTF-8 strings stored back to back in one uint8 buffer, with int64 end offsets."""
+
+    def __init__(self, data: np.ndarray, ends: np.ndarray):
+        self.data = data
+        self.ends = ends
+
+    @classmethod
+    def pack(cls, values: Iterable[str]) -> "PackedStrings":
+        encoded = [v.encode() for v in values]
+        ends = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, ends)
+
+    def __len__(self):
+        return len(self.ends)
+
+    def raw(self, i: int) -> bytes:
+        start = int(self.ends[i - 1]) if i else 0
+        return self.data[start:int(self.ends[i])].tobytes()
+
+    def __getitem__(self, i: int) -> str:
+        return self.raw(i).decode()
+
+    def insert(self, i: int, value: str) -> "PackedStrings":
+        """A copy with `value` inserted before position i."""
+        encoded = np.frombuffer(value.encode(), dtype=np.uint8)
+        start = int(self.ends[i - 1]) if i else 0
+        data = np.concatenate([self.data[:start], encoded, self.data[start:]])
+        ends = np.insert(self.ends, i, start)
+        ends[i:] += len(encoded)
+        return type(self)(data, ends)
+
+    def columns(self, name: str) -> Dict[str, np.ndarray]:
+        return {f"{name}.data": self.data, f"{name}.ends": self.ends}
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], name: str):
+        return cls(columns[f"{name}.data"], columns[f"{name}.ends"])
+
+
+class PackedJson(PackedStrings):
+    """PackedStrings of JSON documents; indexing returns the decoded value."""
+
+    @classmethod
+    def pack(cls, values: Iterable) -> "PackedJson":
+        packed = PackedStrings.pack(json.dumps(v) for v in values)
+        return cls(packed.data, packed.ends)
+
+    def __getitem__(self, i: int):
+        return json.loads(self.raw(i))
+
+    def insert(self, i: int, value) -> "PackedJson":
+        return super().insert(i, json.dumps(value))
+
+
+class KeyedRows:
+    """JSON rows looked up by a normalized key, with the keys kept sorted for a bisect."""
+
+    def __init__(self, keys: PackedStrings, rows: PackedJson):
+        self.keys = keys
+        self.rows = rows
+
+    @classmethod
+    def pack(cls, keyed: Dict[str, dict]) -> "KeyedRows":
+        ordered = sorted(keyed)
+        return cls(PackedStrings.pack(ordered), PackedJson.pack(keyed[k] for k in ordered))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def index(self, key: str) -> Optional[int]:
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return None
+
+    def get(self, key: str) -> dict | None:
+        i = self.index(key)
+        return self.rows[i] if i is not None else None
+
+    def insert(self, key: str, row: dict) -> Tuple["KeyedRows", Optional[int]]:
+        """A copy with `row` added under `key`, and its position; (self, None) if the key exists."""
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self, None
+        return KeyedRows(self.keys.insert(i, key), self.rows.insert(i, row)), i
+
+    def columns(self, name: str) -> Dict[str, np.ndarray]:
+        return {**self.keys.columns(f"{name}.keys"), **self.rows.columns(f"{name}.rows")}
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], name: str) -> "KeyedRows":
+        return cls(
+            PackedStrings.from_columns(columns, f"{name}.keys"),
+            PackedJson.from_columns(columns, f"{name}.rows"),
+        )
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(path: str, columns: Dict[str, np.ndarray], meta: dict) -> str:
+    """Write `columns` and `meta` to `path` atomically (temp file + rename)."""
+    columns = {name: np.ascontiguousarray(array) for name, array in columns.items()}
+
+    # Offsets are relative to the end of the header, which is padded to ALIGNMENT
+    layout, offset = {}, 0
+    for name, array in columns.items():
+        offset = _aligned(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({"columns": layout, "meta": meta}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for name, array in columns.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+
+def open_snapshot(path: str) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Map a snapshot read-only. Returns ({column name: read-only array view}, meta)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length))
+    data_start = _aligned(len(MAGIC) + 8 + header_length)
+
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    columns = {}
+    for name, spec in header["columns"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = data_start + spec["offset"]
+        columns[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+    return columns, header["meta"]
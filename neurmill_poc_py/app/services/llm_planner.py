@@ -1,19 +1,318 @@
-from typing import List, Dict
+"""
+Machining strategy planning for the tool recommender.
+
+plan_tool_strategy assigns features to the fewest tools that cover them
+(app.services.tool_assignment), then asks a planner backend
+(app.services.planner_backends) for a strategy per feature, one prompt per
+picked tool:
+
+- Prompts for all tools of a part go out concurrently, at most
+  NEURAMILL_PLANNER_CONCURRENCY at a time across all requests, each limited to
+  NEURAMILL_PLANNER_TIMEOUT seconds including the wait for a free slot. A
+  prompt that times out or fails gets the rule-of-thumb strategies instead
+  (planner "rules"), which are not cached.
+- A prompt only holds what the strategy depends on: material, machine limits,
+  tool, and the distinct (type, diameter, depth) of its features, in a fixed
+  order; positions and repeats are left out. Equal prompts are answered from an
+  LRU of NEURAMILL_PROMPT_CACHE_SIZE entries, or share the call already in flight.
+
+Backend calls run on one event loop in a background thread, so every caller
+shares the same concurrency limit, cache and calls: worker threads block in
+StrategyPlanner.plan, while the API awaits StrategyPlanner.plan_async on its
+own event loop after the CPU work is done, so a slow model call holds neither
+a worker thread nor a cpu_limiter slot.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
 
 from app.services.cad_parser import process_cad_file
+from app.services.planner_backends import PlannerBackend, load_backend, rule_strategy
+from app.services.tool_assignment import assign_features
+
+PLANNER_TIMEOUT = float(os.getenv("NEURAMILL_PLANNER_TIMEOUT", 10))  # seconds per backend call
+PLANNER_CONCURRENCY = int(os.getenv("NEURAMILL_PLANNER_CONCURRENCY", 8))  # backend calls in flight
+PROMPT_CACHE_SIZE = int(os.getenv("NEURAMILL_PROMPT_CACHE_SIZE", 4096))  # 0 disables the prompt cache
+PLAN_GRACE = 1.0  # seconds plan() waits past PLANNER_TIMEOUT before falling back to rules for the whole part
+
+# Tool fields a prompt carries; the rest of the catalog row does not change the strategy
+PROMPT_TOOL_FIELDS = ("tool_id", "name", "type", "diameter", "flute_count", "max_depth_of_cut", "operation_type",
+                      "speeds_feeds")
+
+
+def _signature(feature: Dict) -> Tuple:
+    return ((feature.get("feature") or "").lower(), feature.get("diameter"), feature.get("depth"))
+
+
+def _signature_order(signature: Tuple) -> Tuple:
+    # None (no diameter / depth) sorts first instead of failing to compare with floats
+    kind, diameter, depth = signature
+    return (kind, diameter is not None, diameter or 0.0, depth is not None, depth or 0.0)
+
+
+def planner_prompt(tool: Dict, features: List[Dict], material: str, machine: Dict) -> Tuple[str, Dict, List[int]]:
+    """
+    (cache key, prompt, index of each feature's entry in prompt["features"]) for
+    the features cut with `tool`. Features differing only by position share an entry.
+    """
+    signatures = [_signature(f) for f in features]
+    distinct = sorted(set(signatures), key=_signature_order)
+    slot = {signature: i for i, signature in enumerate(distinct)}
+    prompt = {
+        "material": material,
+        "machine": {"max_rpm": machine.get("max_rpm"), "max_feed": machine.get("max_feed")},
+        "tool": {field: tool.get(field) for field in PROMPT_TOOL_FIELDS},
+        "features": [
+            {name: value for name, value in zip(("feature", "diameter", "depth"), signature) if value is not None}
+            for signature in distinct
+        ],
+    }
+    key = hashlib.sha1(json.dumps(prompt, sort_keys=True, default=str).encode()).hexdigest()
+    return key, prompt, [slot[signature] for signature in signatures]
+
+
+class PromptCache:
+    """LRU of planner answers by prompt key. Only touched on the planner's event loop thread."""
+
+    def __init__(self, max_entries: int = PROMPT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[List[str], str]]:
+        answer = self._entries.get(key)
+        if answer is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return answer
+
+    def put(self, key: str, answer: Tuple[List[str], str]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = answer
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "entries": len(self._entries),
+        }
+
+
+class StrategyPlanner:
+    """
+    Sends planner prompts to a backend (load_backend() on first use unless one
+    is given) from an event loop thread of its own, started on first use.
+    """
+
+    def __init__(self, backend: Optional[PlannerBackend] = None, timeout: float = PLANNER_TIMEOUT,
+                 concurrency: int = PLANNER_CONCURRENCY, cache_size: int = PROMPT_CACHE_SIZE):
+        self._backend = backend
+        self.timeout = timeout
+        self.cache = PromptCache(cache_size)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def backend(self) -> PlannerBackend:
+        """The backend, loaded with load_backend() on first use (raises if it cannot be built)."""
+        with self._lock:
+            if self._backend is None:
+                self._backend = load_backend()
+            return self._backend
+
+    def backend_id(self) -> str:
+        """
+        Identity of the backend (name and model). Part of every result cache key,
+        so strategies planned by one backend are not served once another is configured.
+        """
+        try:
+            return self.backend().identity
+        except Exception:
+            # Every call falls back to rule strategies, and those results are not cached
+            return "unavailable"
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="neuramill-planner", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _plan_with_slot(self, backend: PlannerBackend, prompt: Dict) -> List[str]:
+        # Under _call's timeout, so waiting for a free slot counts against it
+        async with self._semaphore:
+            return await backend.plan(prompt)
+
+    async def _call(self, prompt: Dict) -> Tuple[List[str], str]:
+        self.calls += 1
+        try:
+            backend = self.backend()
+            strategies = await asyncio.wait_for(self._plan_with_slot(backend, prompt), self.timeout)
+            if len(strategies) != len(prompt["features"]):
+                raise ValueError(f"{len(strategies)} strategies for {len(prompt['features'])} features")
+            return list(strategies), backend.name
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            print(f"⏱️ Planner backend timed out after {self.timeout}s, using rule strategies")
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Planner backend failed ({e}), using rule strategies")
+        return [rule_strategy(feature, prompt["tool"]) for feature in prompt["features"]], "rules"
+
+    async def _ask(self, key: str, prompt: Dict) -> Tuple[List[str], str]:
+        answer = self.cache.get(key)
+        if answer is not None:
+            return answer
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.shared += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            answer = await self._call(prompt)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+        if answer[1] != "rules":
+            self.cache.put(key, answer)
+        future.set_result(answer)
+        return answer
+
+    async def _plan(self, tools: List[Dict], features: List[Dict], assigned: np.ndarray, material: str,
+                    machine: Dict) -> List[Tuple[str, str] | None]:
+        groups, requests = [], []
+        for tool in dict.fromkeys(assigned[assigned >= 0].tolist()):
+            members = np.flatnonzero(assigned == tool).tolist()
+            key, prompt, slots = planner_prompt(tools[tool], [features[i] for i in members], material, machine)
+            groups.append((members, slots))
+            requests.append(self._ask(key, prompt))
+        answers = await asyncio.gather(*requests)
+
+        planned: List[Tuple[str, str] | None] = [None] * len(features)
+        for (members, slots), (strategies, planner) in zip(groups, answers):
+            for member, slot in zip(members, slots):
+                planned[member] = (strategies[slot], planner)
+        return planned
+
+    def plan(self, tools: List[Dict], features: List[Dict], assigned: np.ndarray, material: str,
+             machine: Dict) -> List[Tuple[str, str] | None]:
+        """
+        (strategy, planner) per feature, None where assigned is -1. Blocks the
+        calling thread for at most timeout + PLAN_GRACE seconds: call it from a
+        worker thread, never on an event loop.
+        """
+        coroutine = self._plan(tools, features, assigned, material, machine)
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._event_loop())
+        try:
+            # Every backend call already gives up after self.timeout; this only
+            # bounds the worker thread if the planner's event loop itself is stuck
+            return future.result(timeout=self.timeout + PLAN_GRACE)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return self._stuck(tools, features, assigned)
+
+    async def plan_async(self, tools: List[Dict], features: List[Dict], assigned: np.ndarray, material: str,
+                         machine: Dict) -> List[Tuple[str, str] | None]:
+        """plan() for a caller on another event loop: waits without holding a thread."""
+        coroutine = self._plan(tools, features, assigned, material, machine)
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._event_loop())
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout + PLAN_GRACE)
+        except asyncio.TimeoutError:
+            future.cancel()
+            return self._stuck(tools, features, assigned)
+
+    def _stuck(self, tools: List[Dict], features: List[Dict], assigned: np.ndarray) -> List[Tuple[str, str] | None]:
+        self.timeouts += 1
+        print(f"⏱️ Planner did not answer within {self.timeout + PLAN_GRACE}s, using rule strategies")
+        return [(rule_strategy(feature, tools[tool]), "rules") if tool >= 0 else None
+                for feature, tool in zip(features, assigned.tolist())]
+
+    def stats(self) -> dict:
+        return {
+            "backend": self._backend.name if self._backend else None,
+            "calls": self.calls,
+            "shared": self.shared,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "prompts": self.cache.stats(),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop.close()
+                self._loop = self._thread = None
+
+
+planner = StrategyPlanner()
+
 
 def plan_tool_strategy(valid_tools: List[Dict], features: List[Dict], material: str, machine: Dict) -> List[Dict]:
-    # Placeholder logic
+    """
+    One recommendation per feature, in feature order. Features share the fewest
+    tools that cover them all (see app.services.tool_assignment); `valid_tools`
+    are in order of preference. A feature no tool fits gets tool None.
+    "planner" names the backend that chose the strategy, or "rules" when it
+    timed out or failed. Blocks until the backend answers (see StrategyPlanner.plan).
+    """
+    assigned = assign_tools(valid_tools, features)
+    planned = planner.plan(valid_tools, features, assigned, material, machine)
+    return plan_recommendations(valid_tools, features, assigned, planned)
+
+
+def assign_tools(valid_tools: List[Dict], features: List[Dict]) -> np.ndarray:
+    """Index into `valid_tools` of the tool for each feature, -1 where none fits (see assign_features)."""
+    picked, assigned = assign_features(valid_tools, features)
+    print(f"🧩 {len(features)} features covered by {len(picked)} tools")
+    return assigned
+
+
+def plan_recommendations(valid_tools: List[Dict], features: List[Dict], assigned: np.ndarray,
+                         planned: List[Tuple[str, str] | None]) -> List[Dict]:
+    """plan_tool_strategy's recommendations from StrategyPlanner's (strategy, planner) per feature."""
     recommendations = []
-    for i, feature in enumerate(features):
-        if i < len(valid_tools):
-            recommendations.append({
-                "feature": feature,
-                "tool": valid_tools[i],
-                "strategy": "roughing + finishing"
-            })
+    for feature, tool, plan in zip(features, assigned.tolist(), planned):
+        strategy, planned_by = plan if plan else ("no fitting tool", None)
+        recommendations.append({
+            "feature": feature,
+            "tool": valid_tools[tool] if tool >= 0 else None,
+            "strategy": strategy,
+            "planner": planned_by,
+        })
     return recommendations
 
+
 def recommend_from_cad(cad_bytes: bytes, material: str, machine_type: str, db) -> List[Dict]:
     """
     Recommends cutting tools based on CAD geometry, selected material, and machine capabilities.
@@ -0,0 +1,139 @@
+import asyncio
+import functools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+# Worker threads for blocking CAD/DB work, and how many extra requests may wait for one
+CPU_WORKERS = int(os.getenv("NEURAMILL_CPU_WORKERS", os.cpu_count() or 4))
+MAX_QUEUE_DEPTH = int(os.getenv("NEURAMILL_MAX_QUEUE_DEPTH", CPU_WORKERS * 2))
+# Processes for CAD parsing (OpenCascade work holds the GIL, and a bad file can crash the parser)
+CAD_WORKERS = int(os.getenv("NEURAMILL_CAD_WORKERS", CPU_WORKERS))
+
+
+class AdmissionLimiter:
+    """
+    Runs blocking work on a bounded executor so async endpoints never block the event loop.
+
+    At most `max_workers` calls run at once and at most `max_queue` more wait for a
+    worker. Anything beyond that is rejected immediately with 429 and a Retry-After
+    estimated from recent call durations, instead of piling up behind slow requests.
+    """
+
+    def __init__(self, max_workers: int = CPU_WORKERS, max_queue: int = MAX_QUEUE_DEPTH):
+        self.max_workers = max_workers
+        self.max_in_flight = max_workers + max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="neuramill-worker")
+        self.in_flight = 0
+        self.rejected = 0
+        self._avg_seconds = 1.0  # EWMA of call duration, seeds the Retry-After estimate
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up."""
+        waves = math.ceil(self.in_flight / self.max_workers)
+        return max(1, math.ceil(waves * self._avg_seconds))
+
+    def admit(self) -> None:
+        """Take a slot, or raise 429 if none is free. Give it back with release()."""
+        # in_flight is only touched on the event loop thread, so no lock is needed
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Server is busy, please retry later",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        self.admit()
+        try:
+            return await self.run_admitted(fn, *args, **kwargs)
+        finally:
+            self.release()
+
+    async def run_admitted(self, fn, *args, **kwargs):
+        """Run fn on the executor under a slot the caller already took with admit()."""
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - start)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+cpu_limiter = AdmissionLimiter()
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    A streaming response whose body runs under one limiter slot, taken with
+    admit() before the response is built, so a busy server still answers 429
+    instead of failing after the 200 has started. The slot is released when
+    the response ends, however it ends (even if the body never started).
+    """
+
+    def __init__(self, content, limiter: AdmissionLimiter, **kwargs):
+        super().__init__(content, **kwargs)
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+
+class ProcessPool:
+    """
+    A process pool for CPU-heavy work, started on first use so importing the app
+    (or a worker that never needs it) spawns nothing. Callers block their own
+    thread, so call it from work already running on cpu_limiter, never on the
+    event loop. If a child process dies, the pool is replaced for the next call.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: never fork the API process with its threads and open DB connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def run(self, fn, *args, **kwargs):
+        executor = self._pool()
+        try:
+            return executor.submit(fn, *args, **kwargs).result()
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+cad_pool = ProcessPool(CAD_WORKERS)
@@ -0,0 +1,130 @@
+"""
+Backends that choose machining strategies for app.services.llm_planner.
+
+A backend gets one prompt per tool: the material, the machine limits, the tool
+(with its speeds and feeds) and the distinct features that tool cuts, and
+returns one strategy per feature. NEURAMILL_PLANNER_BACKEND selects it:
+
+- "fake" (default): a deterministic local stand-in. Strategies come from
+  rule_strategy after a simulated model latency (NEURAMILL_FAKE_LLM_LATENCY
+  seconds, 0 by default), so planner latency and cache hit rates can be
+  measured offline.
+- "openai": a chat model (NEURAMILL_LLM_MODEL) through the openai package,
+  authenticated by OPENAI_API_KEY.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+PLANNER_BACKEND = os.getenv("NEURAMILL_PLANNER_BACKEND", "fake")
+FAKE_LATENCY = float(os.getenv("NEURAMILL_FAKE_LLM_LATENCY", 0))
+LLM_MODEL = os.getenv("NEURAMILL_LLM_MODEL", "gpt-4o-mini")
+
+SYSTEM_PROMPT = (
+    "You are a CNC machining planner. You get a workpiece material, machine limits, one cutting tool "
+    "with its speeds and feeds, and the features that tool will cut. Reply with a JSON object "
+    '{"strategies": [...]} holding one short machining strategy per feature, in the given order, '
+    'e.g. "peck drilling", "helical interpolation", "adaptive roughing + finishing".'
+)
+
+
+def rule_strategy(feature: Dict, tool: Dict) -> str:
+    """Rule-of-thumb strategy for a feature cut with a tool; the fake backend and the fallback use it."""
+    kind = (feature.get("feature") or "").lower()
+    diameter, depth = feature.get("diameter"), feature.get("depth")
+    tool_diameter = tool.get("diameter") or 0.0
+    if kind == "hole":
+        if tool.get("operation_type") == "drilling":
+            return "peck drilling" if diameter and depth and depth > 4 * diameter else "drilling"
+        if diameter and tool_diameter and diameter > tool_diameter * 1.05:
+            return "helical interpolation"
+        return "plunge + finishing pass"
+    if kind == "pocket":
+        return "adaptive roughing + finishing"
+    if kind == "slot":
+        if diameter and tool_diameter and diameter > tool_diameter * 1.1:
+            return "trochoidal slotting"
+        return "full-width slotting + finishing pass"
+    if kind == "face":
+        return "face milling"
+    if kind == "chamfer":
+        return "chamfer milling"
+    return "roughing + finishing"
+
+
+class PlannerBackend:
+    name = "base"
+    model: str | None = None
+
+    @property
+    def identity(self) -> str:
+        """Backend name, and model if it has one: e.g. "fake", "openai:gpt-4o-mini"."""
+        return f"{self.name}:{self.model}" if self.model else self.name
+
+    async def plan(self, prompt: Dict) -> List[str]:
+        """One strategy per entry of prompt["features"], in order."""
+        raise NotImplementedError
+
+
+class FakePlannerBackend(PlannerBackend):
+    """
+    Deterministic local stand-in for a model: rule_strategy after `latency`
+    seconds, varied by up to ±jitter/2 with a hash of the prompt (the same
+    prompt always takes the same time). No network access.
+    """
+    name = "fake"
+
+    def __init__(self, latency: float = FAKE_LATENCY, jitter: float = 0.5):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    async def plan(self, prompt: Dict) -> List[str]:
+        self.calls += 1
+        if self.latency > 0:
+            digest = hashlib.sha1(json.dumps(prompt, sort_keys=True).encode()).digest()
+            spread = int.from_bytes(digest[:4], "little") / 2 ** 32 - 0.5
+            await asyncio.sleep(self.latency * (1 + self.jitter * spread))
+        return [rule_strategy(feature, prompt["tool"]) for feature in prompt["features"]]
+
+
+class OpenAIPlannerBackend(PlannerBackend):
+    name = "openai"
+
+    def __init__(self, model: str = LLM_MODEL):
+        try:
+            from openai import AsyncOpenAI
+        except ImportError:
+            raise RuntimeError("NEURAMILL_PLANNER_BACKEND=openai needs the openai package (pip install openai)")
+        self.model = model
+        self.client = AsyncOpenAI()
+        self.calls = 0
+
+    async def plan(self, prompt: Dict) -> List[str]:
+        self.calls += 1
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            temperature=0,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": json.dumps(prompt)},
+            ],
+        )
+        strategies = json.loads(response.choices[0].message.content).get("strategies")
+        if (not isinstance(strategies, list) or len(strategies) != len(prompt["features"])
+                or not all(isinstance(s, str) for s in strategies)):
+            raise ValueError("Planner model returned a malformed strategies list")
+        return strategies
+
+
+BACKENDS = {"fake": FakePlannerBackend, "openai": OpenAIPlannerBackend}
+
+
+def load_backend(name: str = PLANNER_BACKEND) -> PlannerBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown planner backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Serialized responses kept per process (one entry per distinct URL)
+MAX_CACHED_RESPONSES = 1024
+
+_catalog_version = 0
+# Part of every ETag, so tags from before a restart (possibly older data) never match
+_BOOT_ID = uuid.uuid4().hex[:8]
+_version_lock = threading.Lock()
+
+
+def catalog_version() -> int:
+    return _catalog_version
+
+
+def bump_catalog_version() -> int:
+    """Mark all cached catalog responses stale. Called by every crud create_*."""
+    global _catalog_version
+    with _version_lock:
+        _catalog_version += 1
+        response_cache.clear()
+        return _catalog_version
+
+
+class ResponseCache:
+    """
+    LRU of serialized JSON bodies for the reference-data endpoints, keyed by URL.
+
+    Entries carry the catalog version they were built at, and the ETag is derived
+    from that version, so a write anywhere in the catalog changes every ETag.
+    The counter lives in this process: writes made by another worker process or
+    by seed.py are only seen after the next catalog reload (catalog_reload.py).
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_RESPONSES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str, version: int) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, version: int, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _etag(key: str, version: int) -> str:
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return f'"{_BOOT_ID}-v{version}-{digest}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def cached_json(request: Request, build: Callable[[], Awaitable]) -> Response:
+    """
+    Serve a catalog GET from the response cache.
+
+    - If-None-Match with the current ETag -> 304, no DB work.
+    - Cached body at the current version -> the cached bytes.
+    - Otherwise await `build()`, serialize it once and cache the bytes.
+    """
+    key = str(request.url)
+    version = catalog_version()
+    etag = _etag(key, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key, version)
+    if body is None:
+        response_cache.misses += 1
+        body = JSONResponse(jsonable_encoder(await build())).body
+        # Don't cache data read while a write was bumping the version
+        if catalog_version() == version:
+            response_cache.put(key, version, body)
+    else:
+        response_cache.hits += 1
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.db.models import normalize_key
+
+# Results kept in memory per process, and on disk (shared by all workers)
+MAX_MEMORY_RESULTS = int(os.getenv("NEURAMILL_RESULT_CACHE_SIZE", 2048))
+MAX_DISK_RESULTS = int(os.getenv("NEURAMILL_RESULT_CACHE_DISK_SIZE", 100_000))
+# "" disables the on-disk tier
+RESULT_CACHE_PATH = os.getenv("NEURAMILL_RESULT_CACHE_DB", "recommendation_cache.db")
+
+
+def part_hash(cad_bytes: bytes) -> str:
+    return hashlib.sha256(cad_bytes).hexdigest()
+
+
+def result_key(part: str, material: str, machine_type: str, planner_id: str, catalog_fingerprint: str) -> str:
+    """
+    Cache key: CAD content hash, normalized material and machine title, planner
+    backend and model (StrategyPlanner.backend_id), catalog content fingerprint.
+    """
+    return "|".join((part, normalize_key(material), normalize_key(machine_type), planner_id, catalog_fingerprint))
+
+
+class ResultCache:
+    """
+    Two-tier cache of ToolRecommender results: an LRU in this process in front
+    of a SQLite table shared by every worker and kept across restarts.
+
+    Keys end with the fingerprint of the catalog the result was computed from
+    (ToolCatalog.fingerprint, a hash of its contents), so a result is never
+    served once the catalog changes, whichever process changed it. They also
+    name the planner backend and model, so switching backends (e.g. from "fake"
+    to "openai") does not keep serving the old backend's strategies. Entries of
+    older catalogs are pruned from disk when a new fingerprint is first written.
+    Values are stored as JSON text; every hit returns a fresh copy.
+    """
+
+    def __init__(self, path: str | None = RESULT_CACHE_PATH, max_memory: int = MAX_MEMORY_RESULTS,
+                 max_disk: int = MAX_DISK_RESULTS):
+        self.path = path or None
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._fingerprint = None  # last catalog fingerprint written to disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _disk(self):
+        # Opened on first use so importing the module never creates the file
+        if self._conn is None and self.path:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_results_fingerprint ON results (fingerprint)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_results_created ON results (created)")
+        return self._conn
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(value)
+            conn = self._disk()
+            row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone() if conn else None
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, row[0])
+            return json.loads(row[0])
+
+    def put(self, key: str, fingerprint: str, result) -> None:
+        value = json.dumps(result)
+        with self._lock:
+            self._remember(key, value)
+            self.writes += 1
+            conn = self._disk()
+            if conn is None:
+                return
+            with conn:
+                if fingerprint != self._fingerprint:
+                    # First write against this catalog: results of every other catalog are dead
+                    conn.execute("DELETE FROM results WHERE fingerprint != ?", (fingerprint,))
+                    self._fingerprint = fingerprint
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, fingerprint, value, created) VALUES (?, ?, ?, ?)",
+                    (key, fingerprint, value, time.time()),
+                )
+                if self.writes % 1000 == 0:
+                    conn.execute(
+                        "DELETE FROM results WHERE key IN "
+                        "(SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk,),
+                    )
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+            "memory_entries": len(self._memory),
+            "disk_path": self.path,
+        }
+
+
+result_cache = ResultCache()
@@ -1,10 +1,213 @@
+"""
+Speed and feed engine.
 
-from typing import List, Dict, Optional
+Cutting data is computed with NumPy for whole arrays of tools x materials x
+operations at once, in the usual shop-floor chain:
+
+    SFM (material family, hardness, coating, tool material, operation)
+      -> RPM = SFM * 12 / (pi * D[in]), clamped to the machine and tool max RPM
+      -> chip load (IPT) = chip load ratio * D[in], scaled per operation
+      -> feed (IPM) = RPM * flutes * IPT, clamped to the machine's max cutting feed
+
+plus axial/radial engagement and the metal removal rate used to rank tools.
+Tool diameters and depths are mm (as stored in the tools table); machine feeds
+are m/min (as extracted into machines.max_feed).
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
 from sqlalchemy.orm import Session
-from models import Tool, Machine, Material
-from dummy_ai import recommend_from_cad
+
+from app.db.models import Machine, Material, Tool
+
+MM_PER_INCH = 25.4
+
+# Carbide cutting data per material family: (surface speed SFM, chip load per inch of diameter,
+# reference Brinell hardness). Ordered: the first family whose keyword is in the material name wins.
+MATERIAL_FAMILIES = [
+    ("stainless", ("stainless",), 300.0, 0.005, 200.0),
+    ("titanium", ("titan",), 150.0, 0.004, 250.0),
+    ("cast iron", ("cast iron", "grey iron"), 350.0, 0.006, 200.0),
+    ("aluminum", ("alumin",), 1000.0, 0.010, 100.0),
+    ("plastic", ("abs", "acrylic", "polycarbonate", "peek", "polypropylene", "pom", "ptfe", "pvdf",
+                 "uhmw", "nylon"), 800.0, 0.012, 0.0),
+    ("steel", ("steel",), 400.0, 0.006, 200.0),
+]
+DEFAULT_FAMILY = ("other", (), 300.0, 0.005, 0.0)
+
+# Surface speed factors for the tool coating and tool material (substring match, lower case)
+COATING_SPEED = {"altin": 1.25, "tialn": 1.2, "alcrn": 1.2, "dlc": 1.15, "ticn": 1.1, "tin": 1.05}
+TOOL_MATERIAL_SPEED = {"carbide": 1.0, "cobalt": 0.45, "hss": 0.35}
+
+# Per operation: (surface speed multiplier, chip load multiplier, axial depth x D, radial width x D)
+OPERATIONS = {
+    "roughing": (0.8, 1.0, 1.0, 0.4),
+    "semi-finishing": (1.0, 0.8, 1.0, 0.2),
+    "finishing": (1.2, 0.6, 1.5, 0.05),
+    "drilling": (0.7, 0.7, 3.0, 1.0),
+    "general": (1.0, 0.8, 1.0, 0.3),
+}
+DEFAULT_OPERATION = "general"
+
+
+def material_family(name: str) -> tuple:
+    lowered = (name or "").lower()
+    for family in MATERIAL_FAMILIES:
+        if any(keyword in lowered for keyword in family[1]):
+            return family
+    return DEFAULT_FAMILY
+
+
+def material_arrays(materials: Sequence[Dict]) -> Dict[str, np.ndarray]:
+    """Per-material base SFM and chip load ratio, from the family and hardness of material rows."""
+    families = [material_family(m.get("name")) for m in materials]
+    sfm = np.array([f[2] for f in families], dtype=np.float64)
+    chip_ratio = np.array([f[3] for f in families], dtype=np.float64)
+    reference = np.array([f[4] for f in families], dtype=np.float64)
+    hardness = np.array([m.get("hardness") or 0.0 for m in materials], dtype=np.float64)
+    # Harder than the family reference -> slower, softer -> faster; unknown hardness (0) -> unchanged
+    known = (hardness > 0) & (reference > 0)
+    factor = np.ones_like(hardness)
+    factor[known] = np.clip(np.sqrt(reference[known] / hardness[known]), 0.6, 1.3)
+    return {"sfm": sfm * factor, "chip_ratio": chip_ratio}
+
+
+def tool_speed_factor(coating: Optional[str], tool_material: Optional[str]) -> float:
+    """Surface speed factor of a tool's coating and substrate."""
+    coating = (coating or "").lower()
+    tool_material = (tool_material or "").lower()
+    coating_factor = next((f for key, f in COATING_SPEED.items() if key in coating), 1.0)
+    material_factor = next((f for key, f in TOOL_MATERIAL_SPEED.items() if key in tool_material), 1.0)
+    return coating_factor * material_factor
+
+
+def operation_arrays(operations: Sequence[str]) -> Dict[str, np.ndarray]:
+    values = np.array([OPERATIONS.get(op, OPERATIONS[DEFAULT_OPERATION]) for op in operations], dtype=np.float64)
+    values = values.reshape(len(operations), 4)
+    return {"speed": values[:, 0], "chip": values[:, 1], "axial": values[:, 2], "radial": values[:, 3]}
+
+
+@dataclass
+class CuttingData:
+    """Cutting parameters, each an array broadcast to (tools, materials, operations)."""
+    sfm: np.ndarray
+    rpm: np.ndarray
+    chip_load: np.ndarray        # in/tooth, after the feed clamp
+    feed_ipm: np.ndarray
+    depth_of_cut: np.ndarray     # mm
+    width_of_cut: np.ndarray     # mm
+    mrr: np.ndarray              # cm^3/min
+
+    def at(self, index) -> Dict:
+        """Plain floats for one (tool, material, operation) cell."""
+        return self.records(tuple(np.atleast_1d(i) for i in index))[0]
+
+    def records(self, index) -> List[Dict]:
+        """Plain floats for many cells; `index` is a tuple of (tool, material, operation) index arrays."""
+        columns = {
+            "sfm": np.round(self.sfm[index], 1).tolist(),
+            "rpm": np.rint(self.rpm[index]).astype(np.int64).tolist(),
+            "chip_load": np.round(self.chip_load[index], 5).tolist(),
+            "feed_ipm": np.round(self.feed_ipm[index], 2).tolist(),
+            "feed_mm_min": np.round(self.feed_ipm[index] * MM_PER_INCH, 1).tolist(),
+            "depth_of_cut": np.round(self.depth_of_cut[index], 3).tolist(),
+            "width_of_cut": np.round(self.width_of_cut[index], 3).tolist(),
+            "mrr": np.round(self.mrr[index], 3).tolist(),
+        }
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def spindle_data(diameter, tool_max_rpm, tool_speed, material_sfm, material_chip, operation_speed,
+                 operation_chip) -> tuple:
+    """
+    The machine-independent start of the chain: (SFM, RPM clamped to the tool's
+    max RPM, chip load per tooth before any feed clamp). Arguments broadcast together.
+    """
+    d_in = diameter / MM_PER_INCH
+    sfm = tool_speed * material_sfm * operation_speed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rpm = np.where(d_in > 0, sfm * 12.0 / (math.pi * d_in), 0.0)
+    rpm = np.where(tool_max_rpm > 0, np.minimum(rpm, tool_max_rpm), rpm)
+    chip_load = material_chip * operation_chip * d_in
+    return sfm, rpm, chip_load
+
+
+def machine_data(sfm, rpm, chip_load, diameter, flutes, tool_max_depth, operation_axial, operation_radial,
+                 machine_max_rpm: Optional[float] = None, machine_max_feed: Optional[float] = None) -> CuttingData:
+    """The rest of the chain from spindle_data: machine clamps, feed, engagement and MRR."""
+    z = np.maximum(flutes, 1.0)
+    if machine_max_rpm:
+        rpm = np.minimum(rpm, machine_max_rpm)
+
+    feed = rpm * z * chip_load
+    if machine_max_feed:
+        feed = np.minimum(feed, machine_max_feed * 1000.0 / MM_PER_INCH)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chip_load = np.where(rpm > 0, feed / (rpm * z), 0.0)
+
+    depth = np.minimum(diameter * operation_axial, tool_max_depth)
+    width = diameter * operation_radial
+    mrr = depth * width * feed * MM_PER_INCH / 1000.0  # mm * mm * mm/min -> cm^3/min
+
+    shape = np.broadcast_shapes(np.shape(sfm), rpm.shape, feed.shape, depth.shape)
+    return CuttingData(*(np.broadcast_to(a, shape) for a in (sfm, rpm, chip_load, feed, depth, width, mrr)))
+
+
+def compute_cutting_data(
+    diameter: np.ndarray,
+    flutes: np.ndarray,
+    tool_max_rpm: np.ndarray,
+    tool_max_depth: np.ndarray,
+    tool_speed: np.ndarray,
+    materials: Dict[str, np.ndarray],
+    operations: Dict[str, np.ndarray],
+    machine_max_rpm: Optional[float] = None,
+    machine_max_feed: Optional[float] = None,
+) -> CuttingData:
+    """
+    Cutting data for every tool x material x operation in one broadcast pass.
+
+    Tool arrays are (T,) in mm (max_rpm 0 = unrated, max_depth inf = unknown);
+    `materials` comes from material_arrays (M,), `operations` from operation_arrays (O,).
+    machine_max_feed is m/min. Zero-diameter tools get zero speeds and feeds.
+    """
+    def tools(values):
+        return np.asarray(values, dtype=np.float64)[:, None, None]
+
+    d_mm = tools(diameter)
+    sfm, rpm, chip_load = spindle_data(
+        d_mm, tools(tool_max_rpm), tools(tool_speed),
+        materials["sfm"][None, :, None], materials["chip_ratio"][None, :, None],
+        operations["speed"][None, None, :], operations["chip"][None, None, :],
+    )
+    return machine_data(
+        sfm, rpm, chip_load, d_mm, tools(flutes), tools(tool_max_depth),
+        operations["axial"][None, None, :], operations["radial"][None, None, :],
+        machine_max_rpm, machine_max_feed,
+    )
+
+
+def spindle_table(diameter: np.ndarray, tool_max_rpm: np.ndarray, tool_speed: np.ndarray,
+                  operations: Dict[str, np.ndarray], materials: Dict[str, np.ndarray]) -> tuple:
+    """
+    spindle_data for every material x tool, each tool at its own operation:
+    (T,) tool arrays, `operations` from operation_arrays indexed per tool (T,),
+    `materials` from material_arrays (M,). Returns three (M, T) arrays.
+    """
+    return spindle_data(
+        diameter[None, :], tool_max_rpm[None, :], tool_speed[None, :],
+        materials["sfm"][:, None], materials["chip_ratio"][:, None],
+        operations["speed"][None, :], operations["chip"][None, :],
+    )
+
 
 class SpeedFeed:
+    def __init__(self, db: Session):
+        self.db = db
+
     def calculate_speeds_feeds(
             self,
             tool_id: int,
@@ -14,94 +217,32 @@ class SpeedFeed:
         ) -> Dict:
             """
             Calculate optimal cutting parameters for a given tool and material combination.
-            
+
             Args:
                 tool_id (int): ID of the selected cutting tool
                 material_id (int): ID of the workpiece material
                 operation_type (str): Type of machining operation
                 machine_id (Optional[int]): ID of the target machine
-                
+
             Returns:
-                Dict: Dictionary containing recommended cutting parameters
+                Dict: sfm, rpm, chip_load (IPT), feed_ipm, feed_mm_min, depth_of_cut and
+                width_of_cut (mm) and mrr (cm^3/min)
             """
-            tool = self.db.query(Tool).get(tool_id)
-            material = self.db.query(Material).get(material_id)
-            
+            tool = self.db.get(Tool, tool_id)
+            material = self.db.get(Material, material_id)
             if not tool or not material:
                 raise ValueError("Invalid tool or material ID")
-            
-            # Calculate base cutting speed based on material and tool properties
-            base_speed = self._calculate_base_cutting_speed(tool, material)
-            
-            # Adjust speed based on operation type
-            speed_multiplier = self._get_operation_speed_multiplier(operation_type)
-            recommended_speed = base_speed * speed_multiplier
-            
-            # Calculate feed rate based on speed and tool specifications
-            recommended_feed = self._calculate_feed_rate(tool, recommended_speed)
-            
-            # Apply machine constraints if machine_id is provided
-            if machine_id:
-                machine = self.db.query(Machine).get(machine_id)
-                if machine:
-                    recommended_speed = min(recommended_speed, machine.max_rpm)
-            
-            return {
-                "speed": recommended_speed,
-                "feed": recommended_feed,
-                "depth_of_cut": self._calculate_depth_of_cut(tool, operation_type),
-                "width_of_cut": self._calculate_width_of_cut(tool, operation_type)
-            }
-
-    def _calculate_base_cutting_speed(
-            self,
-            tool: Tool,
-            material: Material
-        ) -> float:
-            """
-            Calculate the base cutting speed based on tool and material properties.
-            
-            Args:
-                tool (Tool): The cutting tool
-                material (Material): The workpiece material
-                
-            Returns:
-                float: Base cutting speed in surface feet per minute (SFM)
-            """
-            # Implementation of cutting speed calculation
-            # This would use material properties and tool specifications
-            # to determine the optimal cutting speed
-            pass
-
-    def _get_operation_speed_multiplier(self, operation_type: str) -> float:
-        """
-        Get the speed adjustment multiplier for different operation types.
-        
-        Args:
-            operation_type (str): Type of machining operation
-            
-        Returns:
-            float: Speed adjustment multiplier
-        """
-        multipliers = {
-            "roughing": 0.8,
-            "finishing": 1.2,
-            "semi-finishing": 1.0
-        }
-        return multipliers.get(operation_type, 1.0)
-
-    def _calculate_feed_rate(self, tool: Tool, speed: float) -> float:
-        """
-        Calculate the feed rate based on tool specifications and cutting speed.
-        
-        Args:
-            tool (Tool): The cutting tool
-            speed (float): Cutting speed in RPM
-            
-        Returns:
-            float: Feed rate in inches per minute (IPM)
-        """
-        # Implementation of feed rate calculation
-        # This would use tool specifications and cutting speed
-        # to determine the optimal feed rate
-        pass
+            machine = self.db.get(Machine, machine_id) if machine_id else None
+
+            data = compute_cutting_data(
+                np.array([tool.diameter or 0.0]),
+                np.array([tool.flute_count or 0]),
+                np.array([tool.max_rpm or 0.0]),
+                np.array([tool.max_depth_of_cut or np.inf]),
+                np.array([tool_speed_factor(tool.coating, tool.material)]),
+                material_arrays([{"name": material.name, "hardness": material.hardness}]),
+                operation_arrays([operation_type]),
+                machine_max_rpm=machine.max_rpm if machine else None,
+                machine_max_feed=machine.max_feed if machine else None,
+            )
+            return data.at((0, 0, 0))
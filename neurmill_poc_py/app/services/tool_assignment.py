@@ -0,0 +1,82 @@
+"""
+Assign machining features to the smallest set of tools that covers them.
+
+A tool fits a feature when it is no wider than the feature and its max depth of
+cut reaches the feature depth (ToolCatalog.compatibility_matrix). Because fit is
+this two-way dominance, the set cover does not need the tools x features matrix:
+
+1. Only the Pareto front of tools matters for covering: a tool that is both
+   wider and shorter-reaching than another covers a subset of its features.
+   Sorted by diameter, the front's reach is strictly increasing.
+2. The front tools fitting a feature are then one contiguous range: from the
+   first that reaches deep enough to the last that is narrow enough.
+3. Picking the fewest tools that hit every range is interval stabbing, solved
+   exactly by taking range ends in order. Fewest tools = fewest tool changes.
+4. Each picked tool is finally swapped for the best-ranked tool (earliest in the
+   input, i.e. highest metal removal rate from ToolRecommender) that still fits
+   every feature assigned to it, so the tool count stays minimal.
+
+O((T + F) log T + k * T) for T tools, F features and k tools picked.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services.tool_catalog import ToolCatalog
+
+
+def tool_arrays(tools: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Tool diameters and reaches; a missing max depth of cut never limits the tool (inf)."""
+    diameters = np.array([t.get("diameter") or 0.0 for t in tools], dtype=np.float64)
+    reaches = np.array([t.get("max_depth_of_cut") or np.inf for t in tools], dtype=np.float64)
+    return diameters, reaches
+
+
+def pareto_front(diameters: np.ndarray, reaches: np.ndarray) -> np.ndarray:
+    """Indices of tools no other tool dominates, by increasing diameter (and strictly increasing reach)."""
+    order = np.lexsort((-reaches, diameters))
+    sorted_reaches = reaches[order]
+    reach_before = np.concatenate(([-np.inf], np.maximum.accumulate(sorted_reaches)[:-1]))
+    return order[sorted_reaches > reach_before]
+
+
+def assign_features(tools: List[Dict], features: List[Dict]) -> Tuple[List[int], np.ndarray]:
+    """
+    Minimal tool set covering every feature that any tool fits.
+
+    `tools` are in order of preference. Returns (indices into `tools` of the
+    picked tools, in the order they are first needed by `features`; index into
+    `tools` of each feature's tool, -1 when no tool fits it).
+    """
+    assigned = np.full(len(features), -1, dtype=np.int64)
+    if not tools or not features:
+        return [], assigned
+    diameters, reaches = tool_arrays(tools)
+    feature_diameters, feature_depths = ToolCatalog.feature_arrays(features)
+
+    front = pareto_front(diameters, reaches)
+    # Range of front tools fitting each feature: [first reaching deep enough, last narrow enough]
+    first = np.searchsorted(reaches[front], feature_depths, side="left")
+    last = np.searchsorted(diameters[front], feature_diameters, side="right") - 1
+    covered = np.flatnonzero(first <= last)
+
+    # Interval stabbing: ranges by end; a range not hit yet is hit by its own end
+    points = []
+    for feature in covered[np.argsort(last[covered], kind="stable")]:
+        if not points or first[feature] > points[-1]:
+            points.append(int(last[feature]))
+    points = np.array(points, dtype=np.int64)
+    # The first picked point at or after a range's start lies inside the range
+    group = np.searchsorted(points, first[covered], side="left")
+
+    picked = np.empty(len(points), dtype=np.int64)
+    for i in range(len(points)):
+        members = covered[group == i]
+        # Best-ranked tool fitting the whole group: the front tool itself always qualifies
+        fits = (diameters <= feature_diameters[members].min()) & (reaches >= feature_depths[members].max())
+        picked[i] = int(np.argmax(fits))
+    assigned[covered] = picked[group]
+
+    order = list(dict.fromkeys(assigned[covered].tolist()))
+    return order, assigned
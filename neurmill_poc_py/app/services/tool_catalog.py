@@ -0,0 +1,581 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.models import (
+    Machine, Material, MaterialClass, Tool, normalize_key, normalize_material_class, tool_material_classes
+)
+from app.services.catalog_snapshot import KeyedRows, PackedJson, open_snapshot, write_snapshot
+from app.services.speed_feed import (
+    CuttingData, machine_data, material_arrays, operation_arrays, spindle_data, spindle_table, tool_speed_factor
+)
+
+
+@dataclass(frozen=True)
+class CatalogTool:
+    """A tool row with its JSON/text fields parsed once, at snapshot time."""
+    tool_id: int
+    name: str
+    type: str
+    diameter: float
+    max_depth_of_cut: Optional[float]
+    max_rpm: Optional[float]
+    flute_count: Optional[int]
+    workpiece_materials: tuple          # lower-cased material classes, e.g. ("aluminum",)
+    row: Dict = field(repr=False)       # all Tool columns, for API responses
+
+    @classmethod
+    def from_row(cls, row: Dict, materials: Optional[List[str]]) -> "CatalogTool":
+        """A tools table row and the names of its linked material classes (None: not linked)."""
+        if materials is None:
+            # Not linked yet (database seeded before tool_material_classes): fall back to the JSON column
+            try:
+                materials = json.loads(row["workpiece_materials"] or "[]")
+            except (TypeError, ValueError):
+                materials = []
+        return cls(
+            tool_id=row["tool_id"],
+            name=row["name"] or "",
+            type=row["type"] or "",
+            diameter=row["diameter"] or 0.0,
+            max_depth_of_cut=row["max_depth_of_cut"],
+            max_rpm=row["max_rpm"],
+            flute_count=row["flute_count"],
+            workpiece_materials=tuple(dict.fromkeys(normalize_material_class(m) for m in materials if isinstance(m, str))),
+            row=row,
+        )
+
+
+def classify_operation(tool_type: str, flute_count: Optional[int]) -> str:
+    """Map a tool to the operation it is best suited for."""
+    t = (tool_type or "").lower()
+    if "drill" in t or "tap" in t:
+        return "drilling"
+    if flute_count and flute_count <= 3:
+        return "roughing"
+    if flute_count and flute_count >= 4:
+        return "finishing"
+    return "general"
+
+
+# Operation types as stored in ToolCatalog.operation_col (uint8 codes)
+OPERATION_TYPES = ("drilling", "roughing", "finishing", "general")
+OPERATION_DATA = operation_arrays(OPERATION_TYPES)
+
+# Environment variable naming a snapshot file written by `python -m app.services.tool_catalog`
+SNAPSHOT_ENV = "NEURAMILL_CATALOG_SNAPSHOT"
+# Columns a snapshot must have; one written before they existed is rejected and has to be compacted again
+SNAPSHOT_COLUMNS = ("tools.speed_factor", "speeds.sfm", "speeds.rpm", "speeds.chip_load")
+
+
+def _stale_snapshot(path: str, missing: List[str]) -> ValueError:
+    return ValueError(f"Catalog snapshot {path} has no {', '.join(missing)}: compact it again "
+                      f"(python -m app.services.tool_catalog {path})")
+
+
+class ToolCatalog:
+    """
+    Immutable, process-level snapshot of the tool catalog, stored as columns.
+
+    - The NumPy columns (`id_col`, `diameter_col`, `max_depth_col`, `max_rpm_col`,
+      `flute_col`, `operation_col`, `speed_factor_col`, `material_bits`) hold every tool sorted by
+      (diameter, tool_id), for vectorized filtering. Missing values are normalised
+      so that they never constrain: max_depth_of_cut -> inf, max_rpm -> 0 (no limit).
+    - `rows` holds the full tool rows (for API responses) as packed JSON in the
+      same order, decoded only for the rows a request returns.
+    - `materials` / `machines` are the reference tables, keyed by normalize_key of
+      the material name / machine title.
+
+    - `speed_table` holds the machine-independent speeds and feeds (SFM, RPM, chip
+      load) of every material x tool, each tool at its own operation type, as
+      (materials, tools) arrays in material key / row order, so one material's
+      values are contiguous. Machines only clamp them (cutting_data), so a request
+      looks its values up instead of computing them.
+
+    The columns are either built in memory (`from_db`) or mapped read-only from a
+    snapshot file (`from_snapshot`), in which case worker processes share them.
+    A catalog is never modified; `with_tool` / `with_material` / `with_machine`
+    return a new one with a row added, computing only that row's speeds and feeds.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], material_classes: List[str], source: str = "db",
+                 fingerprint: Optional[str] = None):
+        self.columns = columns
+        self.source = source
+        self._fingerprint = fingerprint
+        self.id_col = columns["tools.id"]
+        self.diameter_col = columns["tools.diameter"]
+        self.max_depth_col = columns["tools.max_depth"]
+        self.max_rpm_col = columns["tools.max_rpm"]
+        self.flute_col = columns["tools.flutes"]
+        self.operation_col = columns["tools.operation"]
+        self.speed_factor_col = columns["tools.speed_factor"]
+        self.speed_table = tuple(columns[f"speeds.{name}"] for name in ("sfm", "rpm", "chip_load"))
+        self.rows = PackedJson.from_columns(columns, "tools.rows")
+        self.materials = KeyedRows.from_columns(columns, "materials")
+        self.machines = KeyedRows.from_columns(columns, "machines")
+
+        # One bit per material class, packed into as many uint64 words as needed
+        self.material_classes = list(material_classes)
+        self.material_bit = {name: i for i, name in enumerate(self.material_classes)}
+        self.material_bits = columns["tools.material_bits"]
+
+    def __len__(self):
+        return len(self.id_col)
+
+    @classmethod
+    def from_tools(cls, tools: List[CatalogTool], materials: Dict[str, dict] = None,
+                   machines: Dict[str, dict] = None) -> "ToolCatalog":
+        ordered = sorted(tools, key=lambda t: (t.diameter, t.tool_id))
+        material_classes = sorted({m for t in ordered for m in t.workpiece_materials})
+        material_bit = {name: i for i, name in enumerate(material_classes)}
+        words = max(1, (len(material_classes) + 63) // 64)
+        materials = materials or {}
+        columns = {
+            **_tool_columns(ordered, material_bit, words),
+            **PackedJson.pack(t.row for t in ordered).columns("tools.rows"),
+            **KeyedRows.pack(materials).columns("materials"),
+            **KeyedRows.pack(machines or {}).columns("machines"),
+        }
+        columns.update(_speed_columns(columns, [materials[key] for key in sorted(materials)]))
+        return cls(columns, material_classes)
+
+    @classmethod
+    def from_db(cls, db: Session) -> "ToolCatalog":
+        # Material classes come from the association table in one join
+        linked: Dict[int, List[str]] = {}
+        links = (
+            db.query(tool_material_classes.c.tool_id, MaterialClass.name)
+            .join(MaterialClass, MaterialClass.id == tool_material_classes.c.material_class_id)
+        )
+        for tool_id, class_name in links:
+            linked.setdefault(tool_id, []).append(class_name)
+
+        # Plain Core rows: no ORM identity map to build and throw away
+        tools = [
+            CatalogTool.from_row(dict(row), linked.get(row["tool_id"]))
+            for row in db.execute(select(Tool.__table__)).mappings()
+        ]
+
+        materials = {}
+        for row in db.execute(select(Material.__table__).order_by(Material.id)).mappings():
+            materials.setdefault(material_key(row), dict(row))
+        machines = {}
+        for row in db.execute(select(Machine.__table__).order_by(Machine.id)).mappings():
+            machines.setdefault(machine_key(row), dict(row))
+        return cls.from_tools(tools, materials, machines)
+
+    def with_tool(self, tool: CatalogTool) -> Optional["ToolCatalog"]:
+        """
+        A copy with `tool` inserted in (diameter, tool_id) order and its speed
+        table row computed, or None when the tool needs a full rebuild (a material
+        class the catalog has no bit for yet, or a tool_id it already holds).
+        """
+        if any(m not in self.material_bit for m in tool.workpiece_materials) or (self.id_col == tool.tool_id).any():
+            return None
+        # Position among equal diameters is by tool_id, as in from_tools
+        low = int(np.searchsorted(self.diameter_col, tool.diameter, side="left"))
+        high = int(np.searchsorted(self.diameter_col, tool.diameter, side="right"))
+        position = low + int(np.searchsorted(self.id_col[low:high], tool.tool_id))
+
+        added = _tool_columns([tool], self.material_bit, self.material_bits.shape[1])
+        added.update(_speed_columns(added, self.material_rows()))
+        columns = dict(self.columns)
+        for name, values in added.items():
+            if name.startswith("speeds."):
+                columns[name] = np.insert(self.columns[name], position, values[:, 0], axis=1)
+            else:
+                columns[name] = np.insert(self.columns[name], position, values, axis=0)
+        columns.update(self.rows.insert(position, tool.row).columns("tools.rows"))
+        return ToolCatalog(columns, self.material_classes)
+
+    def with_material(self, row: dict) -> "ToolCatalog":
+        """A copy with a materials row added and its speed table column computed for every tool."""
+        materials, index = self.materials.insert(material_key(row), row)
+        if index is None:
+            return self  # same key as an older row, which from_db keeps too
+        columns = {**self.columns, **materials.columns("materials")}
+        for name, values in _speed_columns(self.columns, [row]).items():
+            columns[name] = np.insert(self.columns[name], index, values[0], axis=0)
+        return ToolCatalog(columns, self.material_classes)
+
+    def with_machine(self, row: dict) -> "ToolCatalog":
+        """A copy with a machines row added (machines only clamp speeds and feeds at lookup)."""
+        machines, index = self.machines.insert(machine_key(row), row)
+        if index is None:
+            return self
+        return ToolCatalog({**self.columns, **machines.columns("machines")}, self.material_classes)
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Hash of the catalog contents: equal for equal catalogs in any process or
+        after a restart, different after any tool, material or machine change.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha1(json.dumps(self.material_classes).encode())
+            for name in sorted(self.columns):
+                digest.update(name.encode())
+                digest.update(memoryview(np.ascontiguousarray(self.columns[name])).cast("B"))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def to_snapshot(self, path: str) -> str:
+        """Write this catalog as an immutable snapshot file (see app.services.catalog_snapshot)."""
+        meta = {"material_classes": self.material_classes, "tools": len(self), "created": time.time(),
+                "fingerprint": self.fingerprint}
+        return write_snapshot(path, self.columns, meta)
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "ToolCatalog":
+        """Map a snapshot file read-only; the columns are shared with every other process mapping it."""
+        columns, meta = open_snapshot(path)
+        missing = [name for name in SNAPSHOT_COLUMNS if name not in columns]
+        if missing:
+            raise _stale_snapshot(path, missing)
+        catalog = cls(columns, meta["material_classes"], source=path, fingerprint=meta.get("fingerprint"))
+        if len(catalog.machines) and "max_feed" not in catalog.machines.rows[0]:
+            raise _stale_snapshot(path, ["machines.max_feed"])
+        return catalog
+
+    def material_rows(self) -> List[dict]:
+        return [self.materials.rows[i] for i in range(len(self.materials))]
+
+    def material(self, name: str) -> dict | None:
+        """Material row by name (case- and whitespace-insensitive, like crud.get_material_by_name)."""
+        return self.materials.get(normalize_key(name))
+
+    def machine(self, title: str) -> dict | None:
+        """Machine row by title (case- and whitespace-insensitive, like crud.get_machine_by_title)."""
+        return self.machines.get(normalize_key(title))
+
+    def operation_type(self, row: int) -> str:
+        return OPERATION_TYPES[self.operation_col[row]]
+
+    def material_mask(self, material_name: str) -> np.ndarray:
+        """Boolean column: tools supporting any material class that contains `material_name`."""
+        needle = normalize_material_class(material_name)
+        query = np.zeros(self.material_bits.shape[1], dtype=np.uint64)
+        for material_class, bit in self.material_bit.items():
+            if needle in material_class:
+                query[bit // 64] |= np.uint64(1 << (bit % 64))
+        return (self.material_bits & query).any(axis=1)
+
+    @staticmethod
+    def feature_arrays(features: List[Dict]) -> tuple:
+        """
+        Feature diameters and depths as arrays. A missing (or zero) diameter
+        accepts any tool (inf); a missing depth needs no reach (-inf).
+        """
+        diameters = np.array([f.get("diameter") or np.inf for f in features], dtype=np.float64)
+        depths = np.array([f.get("depth") or -np.inf for f in features], dtype=np.float64)
+        return diameters, depths
+
+    def compatibility_matrix(self, rows: np.ndarray, features: List[Dict]) -> np.ndarray:
+        """
+        (len(rows), len(features)) boolean matrix: tool row fits feature.
+
+        A tool fits a feature when it is no wider than the feature and its max
+        depth of cut reaches the feature depth. Computed by broadcasting; use it
+        for per-pair decisions on an already filtered set of rows.
+        """
+        feature_diameters, feature_depths = self.feature_arrays(features)
+        return (
+            (self.diameter_col[rows, None] <= feature_diameters[None, :])
+            & (self.max_depth_col[rows, None] >= feature_depths[None, :])
+        )
+
+    def fits_any_feature(self, rows: np.ndarray, features: List[Dict]) -> np.ndarray:
+        """
+        Boolean column over `rows`: the tool fits at least one feature.
+
+        Same answer as compatibility_matrix(rows, features).any(axis=1) without
+        materialising the matrix: features are sorted by diameter and, for each
+        tool, the shallowest feature it is narrow enough for is found with a
+        searchsorted over a suffix minimum of depths. O((T + F) log F).
+        """
+        if not features:
+            return np.zeros(len(rows), dtype=bool)
+        feature_diameters, feature_depths = self.feature_arrays(features)
+        order = np.argsort(feature_diameters, kind="stable")
+        sorted_diameters = feature_diameters[order]
+        shallowest_from = np.minimum.accumulate(feature_depths[order][::-1])[::-1]
+        shallowest_from = np.append(shallowest_from, np.inf)  # tools wider than every feature
+        first_fitting = np.searchsorted(sorted_diameters, self.diameter_col[rows], side="left")
+        return shallowest_from[first_fitting] <= self.max_depth_col[rows]
+
+    def cutting_data(self, rows: np.ndarray, material_name: str, material_hardness: Optional[float],
+                     max_rpm: Optional[float] = None, max_feed: Optional[float] = None) -> CuttingData:
+        """
+        Speeds and feeds for `rows`, each at its own operation type, on a machine
+        limited to max_rpm / max_feed (m/min). 1-D CuttingData over rows.
+
+        Catalog materials are looked up in the speed table, so only the machine
+        clamps are computed per request; any other material is computed in full.
+        """
+        codes = self.operation_col[rows]
+        operations = {name: values[codes] for name, values in OPERATION_DATA.items()}
+        index = self.materials.index(normalize_key(material_name))
+        if index is not None and self.materials.rows[index]["hardness"] == material_hardness:
+            sfm, rpm, chip_load = (column[index].take(rows) for column in self.speed_table)
+        else:
+            material = material_arrays([{"name": material_name, "hardness": material_hardness}])
+            sfm, rpm, chip_load = spindle_data(
+                self.diameter_col[rows], self.max_rpm_col[rows], self.speed_factor_col[rows],
+                material["sfm"], material["chip_ratio"], operations["speed"], operations["chip"],
+            )
+        return machine_data(
+            sfm, rpm, chip_load, self.diameter_col[rows], self.flute_col[rows].astype(np.float64),
+            self.max_depth_col[rows], operations["axial"], operations["radial"], max_rpm, max_feed,
+        )
+
+    def candidate_rows(self, material_name: str, max_rpm: float) -> np.ndarray:
+        """Rows (in diameter order) of tools that support the material and spin to max_rpm."""
+        mask = self.material_mask(material_name)
+        # A tool rated below the machine's spindle speed is rejected (0 = unrated, kept)
+        mask &= ~((self.max_rpm_col > 0) & (self.max_rpm_col < max_rpm))
+        return np.flatnonzero(mask)
+
+    def filter_rows(self, material_name: str, max_rpm: float, features: List[Dict]) -> np.ndarray:
+        """Rows (in diameter order) of tools that support the material, spin to max_rpm and fit a feature."""
+        rows = self.candidate_rows(material_name, max_rpm)
+        return rows[self.fits_any_feature(rows, features)]
+
+
+def material_key(row: dict) -> str:
+    return row["name_key"] or normalize_key(row["name"] or "")
+
+
+def machine_key(row: dict) -> str:
+    return row["title_key"] or normalize_key(row["title"] or "")
+
+
+def _tool_columns(tools: List[CatalogTool], material_bit: Dict[str, int], words: int) -> Dict[str, np.ndarray]:
+    """The numeric tools.* columns for `tools`, in the given order."""
+    material_bits = np.zeros((len(tools), words), dtype=np.uint64)
+    for row, tool in enumerate(tools):
+        for material_class in tool.workpiece_materials:
+            bit = material_bit[material_class]
+            material_bits[row, bit // 64] |= np.uint64(1 << (bit % 64))
+
+    operation_code = {name: i for i, name in enumerate(OPERATION_TYPES)}
+    return {
+        "tools.id": np.array([t.tool_id for t in tools], dtype=np.int64),
+        "tools.diameter": np.array([t.diameter for t in tools], dtype=np.float64),
+        "tools.max_depth": np.array([t.max_depth_of_cut or np.inf for t in tools], dtype=np.float64),
+        "tools.max_rpm": np.array([t.max_rpm or 0.0 for t in tools], dtype=np.float64),
+        "tools.flutes": np.array([t.flute_count or 0 for t in tools], dtype=np.int64),
+        "tools.operation": np.array(
+            [operation_code[classify_operation(t.type, t.flute_count)] for t in tools], dtype=np.uint8
+        ),
+        "tools.speed_factor": np.array(
+            [tool_speed_factor(t.row.get("coating"), t.row.get("material")) for t in tools], dtype=np.float64
+        ),
+        "tools.material_bits": material_bits,
+    }
+
+
+def _speed_columns(columns: Dict[str, np.ndarray], materials: List[dict]) -> Dict[str, np.ndarray]:
+    """The speeds.* table for the tools in `columns` x `materials` (see ToolCatalog.speed_table)."""
+    codes = columns["tools.operation"]
+    sfm, rpm, chip_load = spindle_table(
+        columns["tools.diameter"], columns["tools.max_rpm"], columns["tools.speed_factor"],
+        {name: values[codes] for name, values in OPERATION_DATA.items()}, material_arrays(materials),
+    )
+    shape = (len(materials), len(codes))
+    return {f"speeds.{name}": np.ascontiguousarray(np.broadcast_to(values, shape))
+            for name, values in (("sfm", sfm), ("rpm", rpm), ("chip_load", chip_load))}
+
+
+class CatalogHandle:
+    """One installed catalog version and the number of requests currently holding it."""
+
+    def __init__(self, catalog: ToolCatalog, version: int):
+        self.catalog = catalog
+        self.version = version
+        self.leases = 0
+        self.retired = False
+
+
+_current: Optional[CatalogHandle] = None
+_draining: Dict[int, CatalogHandle] = {}  # retired versions that still have leases
+_last_version = 0
+_catalog_lock = threading.Lock()
+
+
+def snapshot_path() -> str | None:
+    """The configured snapshot file, if NEURAMILL_CATALOG_SNAPSHOT points at an existing one."""
+    path = os.getenv(SNAPSHOT_ENV)
+    return path if path and os.path.exists(path) else None
+
+
+def load_catalog(db: Session) -> ToolCatalog:
+    """
+    Load a catalog: mapped from the NEURAMILL_CATALOG_SNAPSHOT file when one is
+    configured (`db` is not used), otherwise built from the DB.
+    """
+    path = snapshot_path()
+    if path:
+        catalog = ToolCatalog.from_snapshot(path)
+        print(f"📚 Tool catalog mapped from {path}: {len(catalog)} tools")
+    else:
+        catalog = ToolCatalog.from_db(db)
+        print(f"📚 Tool catalog snapshot built: {len(catalog)} tools")
+    return catalog
+
+
+def _release(handle: CatalogHandle) -> None:
+    # Dropping the last reference unmaps a snapshot file that has since been replaced
+    handle.catalog = None
+    _draining.pop(handle.version, None)
+    print(f"🗑️ Tool catalog v{handle.version} released")
+
+
+def _retire(handle: CatalogHandle) -> None:
+    handle.retired = True
+    if handle.leases:
+        _draining[handle.version] = handle
+    else:
+        _release(handle)
+
+
+def _install(catalog: ToolCatalog) -> CatalogHandle:
+    global _current, _last_version
+    _last_version += 1
+    previous, _current = _current, CatalogHandle(catalog, _last_version)
+    if previous is not None:
+        _retire(previous)
+    return _current
+
+
+def install_catalog(catalog: ToolCatalog) -> int:
+    """
+    Atomically make `catalog` the current version and return its version number.
+    Requests already holding the previous version keep it until their lease ends.
+    """
+    with _catalog_lock:
+        version = _install(catalog).version
+    print(f"🔄 Tool catalog v{version} installed: {len(catalog)} tools")
+    return version
+
+
+@contextmanager
+def catalog_lease(db: Session) -> Iterator[ToolCatalog]:
+    """
+    Hold the current catalog version for the duration of a request.
+
+    A reload that installs a new version meanwhile does not affect the caller;
+    the old version is released when its last lease ends.
+    """
+    with _catalog_lock:
+        handle = _current
+        if handle is not None:
+            handle.leases += 1
+    if handle is None:
+        # Built outside the lock, so a full load does not hold up other leases;
+        # if another request installed a version meanwhile, that one is used
+        catalog = load_catalog(db)
+        with _catalog_lock:
+            handle = _current if _current is not None else _install(catalog)
+            handle.leases += 1
+    try:
+        yield handle.catalog
+    finally:
+        with _catalog_lock:
+            handle.leases -= 1
+            if handle.retired and not handle.leases:
+                _release(handle)
+
+
+def _table_row(obj) -> dict:
+    """An ORM object as the plain row from_db reads for it."""
+    return {column.name: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def _update_catalog(update: Callable[[ToolCatalog], Optional[ToolCatalog]], added: str) -> None:
+    """
+    Install update(current catalog) as the next version, so a write does not cost
+    a full rebuild. Otherwise retires the current version, so the next lease
+    reloads it in full: when there is nothing to update, the catalog is mapped
+    from a snapshot, `update` returns None, or another write installed a version
+    meanwhile. With NEURAMILL_CATALOG_SNAPSHOT set, writes only show up once the
+    snapshot is compacted again (POST /admin/catalog/reload or
+    `python -m app.services.tool_catalog`).
+    """
+    global _current
+    with _catalog_lock:
+        handle = _current
+        catalog = handle.catalog if handle is not None else None
+    # Built outside the lock: leases keep being served from the current version meanwhile
+    updated = update(catalog) if catalog is not None and catalog.source == "db" else None
+    with _catalog_lock:
+        if updated is not None and _current is handle:
+            version = _install(updated).version
+        else:
+            version = None
+            if _current is not None:
+                _retire(_current)
+                _current = None
+    if version is not None:
+        print(f"🔄 Tool catalog v{version} installed: {added} added, {len(updated)} tools")
+
+
+def catalog_tool_added(tool: Tool, material_classes: List[str]) -> None:
+    """Fold a tool just created (with its linked material class names) into the catalog."""
+    row = _table_row(tool)
+    _update_catalog(lambda catalog: catalog.with_tool(CatalogTool.from_row(row, material_classes)), "tool")
+
+
+def catalog_material_added(material: Material) -> None:
+    """Fold a material just created into the catalog, with its speeds and feeds for every tool."""
+    row = _table_row(material)
+    _update_catalog(lambda catalog: catalog.with_material(row), "material")
+
+
+def catalog_machine_added(machine: Machine) -> None:
+    row = _table_row(machine)
+    _update_catalog(lambda catalog: catalog.with_machine(row), "machine")
+
+
+def catalog_status() -> dict:
+    with _catalog_lock:
+        handle = _current
+        return {
+            "version": handle.version if handle else None,
+            "tools": len(handle.catalog) if handle else None,
+            "source": handle.catalog.source if handle else None,
+            "leases": handle.leases if handle else 0,
+            "draining": {version: h.leases for version, h in _draining.items()},
+        }
+
+
+def compact_catalog(db: Session, path: str) -> ToolCatalog:
+    """Export the tools, materials and machines tables to the snapshot file at `path`."""
+    start = time.perf_counter()
+    catalog = ToolCatalog.from_db(db)
+    catalog.to_snapshot(path)
+    print(f"📦 Catalog snapshot written to {path}: {len(catalog)} tools, {len(catalog.materials)} materials, "
+          f"{len(catalog.machines)} machines, {os.path.getsize(path) / 1e6:.1f} MB "
+          f"in {time.perf_counter() - start:.1f}s")
+    return catalog
+
+
+if __name__ == "__main__":
+    # python -m app.services.tool_catalog [path]   (defaults to $NEURAMILL_CATALOG_SNAPSHOT or ./catalog.snapshot)
+    import sys
+    from app.db.database import SessionLocal
+
+    target = sys.argv[1] if len(sys.argv) > 1 else os.getenv(SNAPSHOT_ENV, "catalog.snapshot")
+    session = SessionLocal()
+    try:
+        compact_catalog(session, target)
+    finally:
+        session.close()
@@ -1,101 +1,240 @@
-from typing import List, Dict, Optional
+import asyncio
+from typing import List, Dict, Iterator, Optional
+
+import numpy as np
 from sqlalchemy.orm import Session
-from app.db.models import Tool, Machine, Material
-from app.services.cad_parser import process_cad_file
-from app.services.llm_planner import plan_tool_strategy
-import json
+from app.services.cad_parser import CADBackendUnavailable, process_cad_file
+from app.services.llm_planner import assign_tools, plan_recommendations, planner
+from app.services.result_cache import part_hash, result_cache, result_key
+from app.services.tool_catalog import OPERATION_TYPES, ToolCatalog, catalog_lease
+
+# Spindle speed assumed when the machine is unknown or has no max_rpm
+DEFAULT_MAX_RPM = 10000
+
+
+class PendingRecommendation:
+    """
+    A recommendation whose CPU work is done (features parsed, tools filtered,
+    ranked and assigned) and that only waits for the planner. `recommendations`
+    is already set when the result came from the result cache.
+    """
+
+    def __init__(self, key: str, fingerprint: str, recommendations: Optional[List[Dict]] = None,
+                 valid_tools: Optional[List[Dict]] = None, features: Optional[List[Dict]] = None,
+                 assigned: Optional[np.ndarray] = None, material: Optional[str] = None,
+                 machine: Optional[Dict] = None):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.recommendations = recommendations
+        self.valid_tools = valid_tools
+        self.features = features
+        self.assigned = assigned
+        self.material = material
+        self.machine = machine
+
+    async def plan(self) -> List[Dict]:
+        """Awaits the planner on the caller's event loop; run it outside any cpu_limiter job."""
+        if self.recommendations is None:
+            planned = await planner.plan_async(self.valid_tools, self.features, self.assigned, self.material,
+                                               self.machine)
+            self.recommendations = plan_recommendations(self.valid_tools, self.features, self.assigned, planned)
+            if ToolRecommender.cacheable(self.recommendations):
+                # A short SQLite write, kept off the event loop without taking a cpu_limiter slot
+                await asyncio.get_running_loop().run_in_executor(
+                    None, result_cache.put, self.key, self.fingerprint, self.recommendations
+                )
+        return self.recommendations
+
 
 class ToolRecommender:
     def __init__(self, db: Session):
         self.db = db
 
-    def recommend_tools(
+    def prepare_tools(
         self,
         cad_bytes: bytes,
         material: str,
         machine_type: str,
         machine_id: Optional[int] = None
-    ) -> List[Dict]:
+    ) -> PendingRecommendation:
+        """
+        The CPU stage of a recommendation, for a cpu_limiter job: everything but the
+        planner call, which PendingRecommendation.plan then awaits outside the job.
+        """
         print("🧠 Running ToolRecommender logic...")
 
-        # Step 1: Get features from CAD
-        features = process_cad_file(cad_bytes)
-
-        # Step 2: Query material and machine
-        mat: Material = self.db.query(Material).filter(Material.name.ilike(material)).first()
-        if not mat:
-            raise ValueError("Material not found.")
-        
-        machine = self.db.query(Machine).filter(Machine.title.ilike(machine_type)).first()
-        max_rpm = 10000
-        spindle_data = {}
-
-        if machine and machine.spindle_json:
-            spindle_data = json.loads(machine.spindle_json)
-            max_rpm_str = spindle_data.get("Max Speed", "")
-            if isinstance(max_rpm_str, str) and "rpm" in max_rpm_str:
-                max_rpm = int(max_rpm_str.replace("rpm", "").strip())
-
-        # Step 3: Filter tools
-        all_tools = self.db.query(Tool).all()
-        valid_tools = self.filter_valid_tools(all_tools, mat.name, mat.hardness, max_rpm, features)
-
-        # Step 4: Plan with LLM
-        return plan_tool_strategy(
-            valid_tools=valid_tools,
-            features=features,
-            material=mat.name,
-            machine={"max_rpm": max_rpm, "spindle_data": spindle_data}
-        )
+        # Everything below holds one catalog version, even if a reload installs a new one meanwhile
+        with catalog_lease(self.db) as catalog:
+            # Step 0: Same part, material and machine against the same catalog -> cached result
+            key = result_key(part_hash(cad_bytes), material, machine_type, planner.backend_id(), catalog.fingerprint)
+            cached = result_cache.get(key)
+            if cached is not None:
+                print("⚡ Recommendation served from cache")
+                return PendingRecommendation(key, catalog.fingerprint, cached)
+
+            # Step 1: Get features from CAD
+            features = process_cad_file(cad_bytes)
+
+            # Step 2: Look up material and machine in the catalog (mapped snapshot or in-memory, no query)
+            mat = catalog.material(material)
+            if not mat:
+                raise ValueError("Material not found.")
+
+            machine = catalog.machine(machine_type)
+            max_rpm = self.machine_max_rpm(machine)
+
+            # Step 3: Filter tools against the catalog columns (no tool query), rank them by speeds and feeds
+            valid_tools = self.filter_valid_tools(
+                catalog, mat["name"], mat["hardness"], max_rpm, features, self.machine_max_feed(machine)
+            )
+
+            # Step 4: Share features among the fewest tools; the LLM plans them in PendingRecommendation.plan
+            return PendingRecommendation(
+                key, catalog.fingerprint,
+                valid_tools=valid_tools,
+                features=features,
+                assigned=assign_tools(valid_tools, features),
+                material=mat["name"],
+                machine=self.planner_machine(machine, max_rpm)
+            )
+
+    def recommend_batch(self, parts: Dict[str, bytes], jobs: List[Dict]) -> Iterator[Dict]:
+        """
+        Recommendations for many (part, material, machine_type) jobs, yielded one per job in order.
+        A job that needs the planner yields its PendingRecommendation as "pending" instead,
+        for the caller to await and store as "recommendations" (see prepare_tools).
+
+        Each part is parsed once and each material / machine is looked up once.
+        Tools filtered by material and spindle speed are shared by all jobs with
+        the same material and machine, so only the feature fit runs per job, and
+        jobs already in the result cache skip even that. The whole batch runs
+        against one catalog version. A job that fails (unknown or unreadable part,
+        unknown material) yields an "error" instead of recommendations.
+        """
+        print(f"🧠 Running ToolRecommender batch of {len(jobs)} jobs...")
+        hashes = {part: part_hash(cad_bytes) for part, cad_bytes in parts.items()}
+        planner_id = planner.backend_id()
+        features_by_part: Dict[str, List[Dict] | str] = {}  # features, or why the part can't be parsed
+        candidates: Dict[tuple, object] = {}
+        decoded: Dict[int, Dict] = {}
+
+        with catalog_lease(self.db) as catalog:
+            materials = {name: catalog.material(name) for name in {job["material"] for job in jobs}}
+            machines = {title: catalog.machine(title) for title in {job["machine_type"] for job in jobs}}
+
+            for index, job in enumerate(jobs):
+                result = {"index": index, **job}
+                part, mat = job["part"], materials[job["material"]]
+                if part not in parts:
+                    yield {**result, "error": "Part not found."}
+                    continue
+                if not mat:
+                    yield {**result, "error": "Material not found."}
+                    continue
+
+                key = result_key(hashes[part], job["material"], job["machine_type"], planner_id, catalog.fingerprint)
+                cached = result_cache.get(key)
+                if cached is not None:
+                    yield {**result, "recommendations": cached}
+                    continue
+
+                if part not in features_by_part:
+                    try:
+                        features_by_part[part] = process_cad_file(parts[part])
+                    except (ValueError, CADBackendUnavailable) as e:
+                        features_by_part[part] = str(e)
+                features = features_by_part[part]
+                if isinstance(features, str):
+                    yield {**result, "error": features}
+                    continue
+
+                machine = machines[job["machine_type"]]
+                max_rpm = self.machine_max_rpm(machine)
+                pair = (mat["name"], max_rpm)
+                if pair not in candidates:
+                    candidates[pair] = catalog.candidate_rows(mat["name"], max_rpm)
+                rows = candidates[pair]
+                rows = rows[catalog.fits_any_feature(rows, features)]
+
+                valid_tools = self.tool_rows(
+                    catalog, rows, mat["name"], mat["hardness"], max_rpm, self.machine_max_feed(machine), decoded
+                )
+                yield {**result, "pending": PendingRecommendation(
+                    key, catalog.fingerprint,
+                    valid_tools=valid_tools,
+                    features=features,
+                    assigned=assign_tools(valid_tools, features),
+                    material=mat["name"],
+                    machine=self.planner_machine(machine, max_rpm)
+                )}
+
+    @staticmethod
+    def cacheable(recommendations: List[Dict]) -> bool:
+        # Rule strategies stand in for a planner call that timed out or failed; the next request retries it
+        return all(r["planner"] != "rules" for r in recommendations)
 
     @staticmethod
-    def classify_operation(tool: Tool) -> str:
-        t = tool.type.lower()
-        name = tool.name.lower()
-        if "drill" in t or "tap" in t:
-            return "drilling"
-        if tool.flute_count and tool.flute_count <= 3:
-            return "roughing"
-        if tool.flute_count and tool.flute_count >= 4:
-            return "finishing"
-        return "general"
+    def machine_max_rpm(machine: Optional[Dict]) -> int:
+        return int(machine["max_rpm"]) if machine and machine["max_rpm"] else DEFAULT_MAX_RPM
+
+    @staticmethod
+    def machine_max_feed(machine: Optional[Dict]) -> Optional[float]:
+        return machine["max_feed"] if machine else None
+
+    @staticmethod
+    def planner_machine(machine: Optional[Dict], max_rpm: int) -> Dict:
+        return {
+            "max_rpm": max_rpm,
+            "max_feed": machine["max_feed"] if machine else None,
+            "taper": machine["taper"] if machine else None,
+            "travels": [machine["x_travel"], machine["y_travel"], machine["z_travel"]] if machine else None,
+            "max_rapid": machine["max_rapid"] if machine else None,
+        }
 
     @staticmethod
     def filter_valid_tools(
-        tools: List[Tool],
+        catalog: ToolCatalog,
         material_name: str,
         material_hardness: float,
         max_rpm: int,
-        features: List[Dict]
+        features: List[Dict],
+        max_feed: Optional[float] = None
     ) -> List[Dict]:
-        valid_tools = []
-
-        for tool in tools:
-            try:
-                supported_materials = json.loads(tool.workpiece_materials)
-            except:
-                supported_materials = []
-
-            if not any(material_name.lower() in m.lower() for m in supported_materials):
-                continue
-
-            if tool.max_rpm and tool.max_rpm < max_rpm:
-                continue
-
-            for feat in features:
-                if feat.get("diameter") and tool.diameter > feat["diameter"]:
-                    continue
-                if feat.get("depth") and tool.max_depth_of_cut and tool.max_depth_of_cut < feat["depth"]:
-                    continue
+        # Material bitmask, RPM and feature fit are evaluated as NumPy columns in one pass
+        rows = catalog.filter_rows(material_name, max_rpm, features)
+        return ToolRecommender.tool_rows(catalog, rows, material_name, material_hardness, max_rpm, max_feed)
 
-                operation_type = ToolRecommender.classify_operation(tool)
-
-                valid_tools.append({
-                    **tool.__dict__,
-                    "operation_type": operation_type,
-                    "material_hardness": material_hardness,
-                    "material_name": material_name
-                })
-                break
-
-        return valid_tools
+    @staticmethod
+    def tool_rows(
+        catalog: ToolCatalog,
+        rows: np.ndarray,
+        material_name: str,
+        material_hardness: float,
+        max_rpm: int,
+        max_feed: Optional[float] = None,
+        decoded: Optional[Dict[int, Dict]] = None
+    ) -> List[Dict]:
+        """
+        Tool dicts for catalog rows, each with its speeds and feeds for its operation type,
+        highest metal removal rate first. `decoded` caches rows already decoded earlier in a batch.
+        """
+        if decoded is None:
+            decoded = {}
+        # Each row's speeds and feeds for its own operation, looked up in the catalog's speed table
+        cutting = catalog.cutting_data(rows, material_name, material_hardness, max_rpm, max_feed)
+        operations = catalog.operation_col[rows]
+        ranked = np.argsort(-cutting.mrr, kind="stable")
+        speeds_feeds = cutting.records((ranked,))
+
+        tools = []
+        for row, operation, cutting_data in zip(rows[ranked].tolist(), operations[ranked].tolist(), speeds_feeds):
+            if row not in decoded:
+                decoded[row] = catalog.rows[row]
+            tools.append({
+                **decoded[row],
+                "operation_type": OPERATION_TYPES[operation],
+                "material_hardness": material_hardness,
+                "material_name": material_name,
+                "speeds_feeds": cutting_data,
+            })
+        return tools
@@ -0,0 +1,57 @@
+"""
+Extract typed machine capabilities from the spec dictionaries scraped into the machines table
+(travels_json, spindle_json, table_json, feedrates_json).
+
+Values look like "508 mm", "8100 rpm", "25.4 m/min" or "CT40 | BT40 | HSK-A63".
+"""
+
+import json
+import re
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_number(value) -> float | None:
+    """First number in a spec value: '508 mm' -> 508.0, '137- mm' -> 137.0, missing -> None."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _NUMBER.search(value.replace(",", ""))
+    return float(match.group()) if match else None
+
+
+def _as_dict(spec) -> dict:
+    if isinstance(spec, dict):
+        return spec
+    try:
+        parsed = json.loads(spec or "{}")
+    except (TypeError, ValueError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def extract_machine_specs(travels, spindle, table, feedrates) -> dict:
+    """
+    Typed Machine columns from the four spec blocks (dicts or JSON strings).
+
+    Lengths are mm, max_rpm is rpm, max_rapid is the slowest axis rapid in m/min
+    (the rate all three axes can sustain) and max_feed the max cutting feed in m/min.
+    Unknown values are None.
+    """
+    travels, spindle, table, feedrates = map(_as_dict, (travels, spindle, table, feedrates))
+    rapids = [parse_number(feedrates.get(f"Rapids on {axis}")) for axis in "XYZ"]
+    rapids = [r for r in rapids if r is not None]
+    taper = spindle.get("Taper")
+
+    return {
+        "max_rpm": parse_number(spindle.get("Max Speed")),
+        "x_travel": parse_number(travels.get("X Axis")),
+        "y_travel": parse_number(travels.get("Y Axis")),
+        "z_travel": parse_number(travels.get("Z Axis")),
+        "table_length": parse_number(table.get("Length")),
+        "table_width": parse_number(table.get("Width")),
+        "max_rapid": min(rapids) if rapids else None,
+        "max_feed": parse_number(feedrates.get("Max Cutting")),
+        "taper": taper.strip() if isinstance(taper, str) and taper.strip() else None,
+    }
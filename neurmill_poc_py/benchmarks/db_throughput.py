@@ -0,0 +1,86 @@
+"""
+Compare the sync and async data layers under concurrent load.
+
+The sync path mirrors what FastAPI does for `def` endpoints (a session per call,
+run on a 40-thread pool); the async path mirrors the `async def` endpoints.
+
+Run from neurmill_poc_py/ (uses ./neuramill.db, upgraded by app startup or `python -m app.db.models`):
+    python -m benchmarks.db_throughput --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import crud, async_crud
+from app.db.database import SessionLocal, AsyncSessionLocal, async_engine
+
+FASTAPI_THREADPOOL_SIZE = 40
+
+
+def sync_request(title: str):
+    db = SessionLocal()
+    try:
+        crud.get_machine_by_title(db, title)
+        return crud.get_all_machines(db)
+    finally:
+        db.close()
+
+
+async def async_request(title: str):
+    async with AsyncSessionLocal() as db:
+        await async_crud.get_machine_by_title(db, title)
+        return await async_crud.get_all_machines(db)
+
+
+async def run_load(call, total: int, concurrency: int) -> list[float]:
+    """Issue `total` calls with at most `concurrency` outstanding; return per-call latencies."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+
+def report(name: str, latencies: list[float], elapsed: float):
+    ordered = sorted(latencies)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(f"{name:6s} {len(latencies) / elapsed:8.1f} req/s   "
+          f"p50 {statistics.median(ordered) * 1e3:7.2f} ms   p99 {p99 * 1e3:7.2f} ms")
+
+
+async def main(total: int, concurrency: int, title: str):
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=FASTAPI_THREADPOOL_SIZE)
+
+    # Warm up both engines so connection setup is not measured
+    await loop.run_in_executor(pool, sync_request, title)
+    await async_request(title)
+
+    start = time.perf_counter()
+    latencies = await run_load(lambda: loop.run_in_executor(pool, sync_request, title), total, concurrency)
+    report("sync", latencies, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    latencies = await run_load(lambda: async_request(title), total, concurrency)
+    report("async", latencies, time.perf_counter() - start)
+
+    pool.shutdown()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--title", default="VF-2")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.title))
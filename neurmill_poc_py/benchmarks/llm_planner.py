@@ -0,0 +1,135 @@
+"""
+Latency and cache benchmark for the strategy planner in app.services.llm_planner.
+
+Synthetic parts draw their features from fixed hole, pocket and slot sizes,
+and come in --families designs: parts of a family differ in feature positions
+and occasionally lose a feature, like revisions of one part, so prompts repeat
+across parts. Each part's features are assigned to tools with assign_features
+and planned against the deterministic FakePlannerBackend, which sleeps
+--latency seconds per call like a remote model would. Parts are planned by
+--workers threads, as cpu_limiter workers would. Configurations:
+
+- sequential:     one backend call at a time, no prompt cache
+- concurrent:     tool prompts of a part fan out (--concurrency), no prompt cache
+- cached (cold):  concurrent, with the prompt cache, first pass over the parts
+- cached (warm):  the same parts again
+
+Every configuration must return the same strategies. Needs no network access.
+
+Run from neurmill_poc_py/:
+    python -m benchmarks.llm_planner --parts 50 --latency 0.2
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.services.llm_planner import StrategyPlanner
+from app.services.planner_backends import FakePlannerBackend
+from app.services.tool_assignment import assign_features
+
+HOLE_SIZES = [3.3, 4.2, 5.0, 6.8, 8.5, 10.2, 12.0]
+POCKET_SIZES = [12.0, 16.0, 20.0, 25.0]
+SLOT_SIZES = [6.0, 8.0, 10.0]
+DEPTHS = [5.0, 10.0, 20.0, 30.0]
+MACHINE = {"max_rpm": 12000, "max_feed": 10000.0}
+
+
+def synthetic_tools(count: int, rng) -> list:
+    tools = []
+    for i in range(count):
+        drill = i % 3 == 0
+        diameter = float(rng.choice(HOLE_SIZES if drill else [3.0, 4.0, 6.0, 8.0, 10.0, 12.0]))
+        tools.append({
+            "tool_id": i, "name": f"{'Drill' if drill else 'Endmill'} {diameter} mm",
+            "type": "drill" if drill else "endmill", "diameter": diameter, "flute_count": 2 if drill else 4,
+            "max_depth_of_cut": float(round(diameter * rng.uniform(2.0, 5.0), 1)),
+            "operation_type": "drilling" if drill else "roughing",
+            "speeds_feeds": {"rpm": 8000.0, "feed_rate": 1200.0},
+        })
+    return tools
+
+
+def synthetic_part(features: int, rng) -> list:
+    part = []
+    for _ in range(features):
+        kind = rng.choice(["hole", "hole", "pocket", "slot"])
+        sizes = {"hole": HOLE_SIZES, "pocket": POCKET_SIZES, "slot": SLOT_SIZES}[kind]
+        part.append({"feature": str(kind), "diameter": float(rng.choice(sizes)), "depth": float(rng.choice(DEPTHS)),
+                     "position": [float(rng.uniform(0, 200)), float(rng.uniform(0, 200))]})
+    return part
+
+
+def variant(family: list, rng) -> list:
+    part = [{**f, "position": [float(rng.uniform(0, 200)), float(rng.uniform(0, 200))]} for f in family]
+    if rng.random() < 0.3:
+        del part[int(rng.integers(len(part)))]
+    return part
+
+
+def run(planner: StrategyPlanner, tools: list, parts: list, workers: int):
+    def plan_part(features):
+        start = time.perf_counter()
+        _, assigned = assign_features(tools, features)
+        planned = planner.plan(tools, features, assigned, "Steel 1.0038", MACHINE)
+        return time.perf_counter() - start, planned
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(plan_part, parts))
+    return time.perf_counter() - start, [r[0] for r in results], [r[1] for r in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parts", type=int, default=50)
+    parser.add_argument("--features", type=int, default=40, help="features per part")
+    parser.add_argument("--families", type=int, default=10, help="distinct part designs")
+    parser.add_argument("--tools", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per backend call")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4, help="parts planned at once")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    tools = synthetic_tools(args.tools, rng)
+    families = [synthetic_part(args.features, rng) for _ in range(args.families)]
+    parts = [variant(families[int(rng.integers(args.families))], rng) for _ in range(args.parts)]
+
+    def planner(concurrency: int, cache_size: int) -> StrategyPlanner:
+        return StrategyPlanner(FakePlannerBackend(latency=args.latency), timeout=30,
+                               concurrency=concurrency, cache_size=cache_size)
+
+    cached = planner(args.concurrency, 4096)
+    configurations = [
+        ("sequential", planner(1, 0)),
+        ("concurrent", planner(args.concurrency, 0)),
+        ("cached (cold)", cached),
+        ("cached (warm)", cached),
+    ]
+
+    print(f"{args.parts} parts of {args.families} families x {args.features} features, {args.tools} tools, "
+          f"{args.latency * 1000:.0f} ms per call, {args.workers} workers")
+    print(f"{'configuration':<14} | {'total s':>7} {'mean ms':>8} {'p95 ms':>8} | {'calls':>5} {'shared':>6} "
+          f"{'hit rate':>8}")
+    reference = None
+    for name, instance in configurations:
+        calls, shared = instance.calls, instance.shared
+        hits, lookups = instance.cache.hits, instance.cache.hits + instance.cache.misses
+        total, latencies, planned = run(instance, tools, parts, args.workers)
+        if reference is None:
+            reference = planned
+        assert planned == reference, f"{name} planned different strategies"
+        lookups = instance.cache.hits + instance.cache.misses - lookups
+        hit_rate = (instance.cache.hits - hits) / lookups if lookups else 0.0
+        latencies = np.array(latencies) * 1000
+        print(f"{name:<14} | {total:>7.2f} {latencies.mean():>8.1f} {np.percentile(latencies, 95):>8.1f} | "
+              f"{instance.calls - calls:>5} {instance.shared - shared:>6} {hit_rate:>8.1%}")
+    for _, instance in configurations:
+        instance.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Seed a synthetic tool catalog with the bulk loader in app/db/seed.py.
+
+Rows are generated in the shape of datasets/end_mills_cleaned.csv (inch and metric
+names, list-literal workpiece materials) and written to a scratch SQLite file, so
+./neuramill.db is never touched. Optionally times the old row-by-row ORM loader on
+a sample for comparison, and times an incremental refresh of the seeded catalog.
+
+Run from neurmill_poc_py/:
+    python -m benchmarks.seed_tools --rows 1000000 --legacy-rows 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models, seed
+
+WORKPIECE_MATERIALS = [
+    "['Aluminum']",
+    "['Steel', 'Stainless Steel']",
+    "['Stainless Steel', 'High Temp Alloys']",
+    "['Steel', 'Stainless Steel', 'Cast Iron']",
+    "['Steel', 'Aluminum']",
+]
+COATINGS = ["AlTiN", "DLC", "Hybrid AlCrN", "Multi-Layer TiAlN", "Uncoated"]
+
+
+def synthetic_tools(rows: int, seed_value: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed_value)
+    inch = rng.random(rows) < 0.5
+    diameter = np.round(rng.uniform(1.0, 25.0, rows), 2)
+    flutes = rng.choice([2, 3, 4, 5, 6], rows)
+    numbers = np.arange(rows).astype(str)
+    names = np.where(inch, "Dia. " + numbers + '" Carbide End Mill', "Dia. " + numbers + "mm Carbide End Mill")
+    # Metric rows carry the CSV's mm*25.4 quirk that parse_diameter undoes
+    scale = np.where(inch, 1.0, 25.4)
+    return pd.DataFrame({
+        "tool_id": np.char.add("T-", numbers),
+        "name": names,
+        "type": "end_mill",
+        "material": "carbide",
+        "diameter": diameter * scale,
+        "shank_diameter": diameter * scale,
+        "cutting_length": diameter * 3 * scale,
+        "overall_length": diameter * 8 * scale,
+        "flute_count": flutes,
+        "helix_angle": 38.0,
+        "coating": rng.choice(COATINGS, rows),
+        "workpiece_materials": rng.choice(WORKPIECE_MATERIALS, rows),
+        "center_cutting": rng.random(rows) < 0.95,
+        "price_usd": np.round(rng.uniform(10, 200, rows), 2),
+        "manufacturer": "Haas",
+        "max_depth_of_cut": diameter * 1.5 * scale,
+        "max_rpm": rng.choice([12000, 15000, 18000, 20000], rows),
+        "speed_feed_link": "https://example.com/speeds.pdf",
+        "image_link": "/content/dam/hero.png",
+        "product_link": "https://example.com/tool.html",
+    })
+
+
+def legacy_load(df: pd.DataFrame, bind) -> None:
+    """The previous loader: iterrows, parse_diameter per field, one ORM object per row."""
+    db = sessionmaker(bind=bind)()
+    for _, row in df.iterrows():
+        name = row.get("name", "")
+        db.add(models.Tool(
+            name=name, type=row.get("type"),
+            diameter=seed.parse_diameter(row.get("diameter", 0.0), name),
+            shank_diameter=seed.parse_diameter(row.get("shank_diameter", 0.0), name),
+            flute_count=row.get("flute_count", 0), material=row.get("material"), coating=row.get("coating"),
+            cutting_length=seed.parse_diameter(row.get("cutting_length", 0.0), name),
+            overall_length=seed.parse_diameter(row.get("overall_length", 0.0), name),
+            helix_angle=row.get("helix_angle", 0.0),
+            workpiece_materials=str(seed.safe_eval(row.get("workpiece_materials"), "workpiece_materials", name)),
+            center_cutting=row.get("center_cutting"), price_usd=row.get("price_usd", 0.0),
+            manufacturer=row.get("manufacturer"),
+            max_depth_of_cut=seed.parse_diameter(row.get("max_depth_of_cut", 0.0), name),
+            max_rpm=row.get("max_rpm", 0.0),
+        ))
+    db.commit()
+    db.close()
+
+
+def scratch_engine(directory: str, name: str):
+    bind = create_engine(f"sqlite:///{os.path.join(directory, name)}")
+    models.Base.metadata.create_all(bind)
+    return bind
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=0, help="Also time the old ORM loader on this many rows")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        df = synthetic_tools(args.rows)
+        print(f"generated {args.rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+        bind = scratch_engine(directory, "bulk.db")
+        start = time.perf_counter()
+        seed.prepare_tools(df)
+        prepared = time.perf_counter() - start
+        start = time.perf_counter()
+        seed.load_tools_frame(df, bind)
+        total = time.perf_counter() - start
+        with bind.connect() as conn:
+            count = conn.execute(select(func.count()).select_from(models.Tool.__table__)).scalar()
+            link_count = conn.execute(select(func.count()).select_from(models.tool_material_classes)).scalar()
+        print(f"bulk:   {count:,} tools, {link_count:,} links in {total:.1f}s "
+              f"(of which pandas transform {prepared:.1f}s) -> {count / total:,.0f} rows/s")
+
+        # Same catalog again with 1% of prices changed: only those rows are written
+        changed = df.sample(frac=0.01, random_state=0).index
+        df.loc[changed, "price_usd"] += 1.0
+        start = time.perf_counter()
+        result = seed.load_tools_frame(df, bind)
+        print(f"refresh: {result['updated']:,} updated, {result['unchanged']:,} unchanged "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        if args.legacy_rows:
+            sample = df.head(args.legacy_rows)
+            legacy_bind = scratch_engine(directory, "legacy.db")
+            start = time.perf_counter()
+            legacy_load(sample, legacy_bind)
+            elapsed = time.perf_counter() - start
+            print(f"legacy: {len(sample):,} tools in {elapsed:.1f}s -> {len(sample) / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
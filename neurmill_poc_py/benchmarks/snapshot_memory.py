@@ -0,0 +1,100 @@
+"""
+Compare per-worker memory for a memory-mapped catalog snapshot against private copies.
+
+A synthetic catalog is seeded into a scratch SQLite file (see seed_tools.py) and
+compacted to a snapshot with app.services.tool_catalog.compact_catalog. Then
+--workers processes each load the catalog, run a filter over every tool and
+touch every page of every column, either mapping the snapshot ("mapped") or
+holding their own in-memory copy of the same columns ("private", what every
+worker had before). Reported per worker, from /proc/self/smaps_rollup: PSS (the
+worker's fair share of the pages it uses) and private memory. Linux only.
+
+Run from neurmill_poc_py/:
+    python -m benchmarks.snapshot_memory --rows 200000 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from app.db import seed
+from app.services.tool_catalog import ToolCatalog, compact_catalog
+from benchmarks.seed_tools import scratch_engine, synthetic_tools
+
+PAGE = 4096
+
+
+def memory_kb() -> dict:
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                usage[parts[0].rstrip(":")] = int(parts[1])
+    return usage
+
+
+def worker(path: str, mode: str, ready, results):
+    before = memory_kb()
+    catalog = ToolCatalog.from_snapshot(path)
+    if mode == "private":
+        catalog = ToolCatalog({name: np.array(col) for name, col in catalog.columns.items()}, catalog.material_classes)
+    catalog.filter_rows("steel", 12000, [{"diameter": 1.0, "depth": 0.5}])
+    for column in catalog.columns.values():
+        column.reshape(-1).view(np.uint8)[::PAGE].sum()
+
+    # Measure once every worker holds the catalog, so shared pages are split between them
+    ready.wait()
+    after = memory_kb()
+    results.put({
+        "pss": after["Pss"] - before["Pss"],
+        "private": after["Private_Clean"] + after["Private_Dirty"] - before["Private_Clean"] - before["Private_Dirty"],
+    })
+    ready.wait()
+
+
+def measure(path: str, mode: str, workers: int) -> list:
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(path, mode, ready, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    ready.wait()
+    usage = [results.get() for _ in processes]
+    ready.wait()
+    for process in processes:
+        process.join()
+    return usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        bind = scratch_engine(directory, "catalog.db")
+        seed.load_tools_frame(synthetic_tools(args.rows), bind)
+        path = os.path.join(directory, "catalog.snapshot")
+        session = sessionmaker(bind=bind)()
+        start = time.perf_counter()
+        compact_catalog(session, path)
+        session.close()
+        print(f"compaction: {time.perf_counter() - start:.1f}s, snapshot {os.path.getsize(path) / 1e6:.1f} MB")
+
+        for mode in ("private", "mapped"):
+            usage = measure(path, mode, args.workers)
+            pss = sum(u["pss"] for u in usage) / len(usage) / 1024
+            private = sum(u["private"] for u in usage) / len(usage) / 1024
+            print(f"{mode:>8}: {args.workers} workers, per worker {pss:,.1f} MB PSS, {private:,.1f} MB private")
+
+
+if __name__ == "__main__":
+    main()
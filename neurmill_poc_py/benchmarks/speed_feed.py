@@ -0,0 +1,108 @@
+"""
+Time the vectorized speed/feed engine in app/services/speed_feed.py.
+
+- rank: cutting data and ranking for every catalog tool that can cut a material
+  (ToolRecommender.tool_rows, the per-request path), against ./neuramill.db
+  (upgraded by app startup or `python -m app.db.models`)
+- lookup: ToolCatalog.cutting_data for every catalog tool x material, from the
+  speed table against computing each material in full (as for a material
+  that is not in the catalog)
+- update: folding one new tool / material into the catalog (with_tool /
+  with_material, what crud.create_tool / create_material do) against from_db
+- table: a full tools x materials x operations table for synthetic tools
+- single: SpeedFeed.calculate_speeds_feeds per (tool, material, operation),
+  three primary-key lookups and a 1x1x1 engine call each, for comparison
+
+Run from neurmill_poc_py/:
+    python -m benchmarks.speed_feed --tools 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.db.database import SessionLocal
+from app.db.models import Material
+from app.services.speed_feed import (
+    OPERATIONS, SpeedFeed, compute_cutting_data, material_arrays, operation_arrays
+)
+from app.services.tool_catalog import CatalogTool, ToolCatalog
+from app.services.tool_selector import ToolRecommender
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, default=100_000)
+    parser.add_argument("--single", type=int, default=1000, help="calculate_speeds_feeds calls to time")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    catalog = ToolCatalog.from_db(db)
+    materials = [{"name": m.name, "hardness": m.hardness} for m in db.query(Material).order_by(Material.id)]
+    operations = list(OPERATIONS)
+
+    rows = catalog.candidate_rows("steel", 8100)
+    machine = {"max_rpm": 8100, "max_feed": 16.5}
+    material = {"name": "Steel 1.0503", "hardness": 255.0}
+    engine_only = best_of(lambda: catalog.cutting_data(rows, material["name"], material["hardness"], **machine))
+    elapsed = best_of(lambda: ToolRecommender.tool_rows(catalog, rows, "Steel 1.0503", 255.0, 8100, 16.5))
+    print(f"rank:   {len(rows)} candidate tools in {elapsed * 1000:.2f} ms "
+          f"(speeds/feeds {engine_only * 1000:.2f} ms, the rest is decoding tool rows)")
+
+    every = np.arange(len(catalog))
+    catalog_materials = catalog.material_rows()
+    def lookup_all(suffix):
+        # A suffixed name keeps the material family but misses the speed table
+        for m in catalog_materials:
+            catalog.cutting_data(every, m["name"] + suffix, m["hardness"], 8100, 16.5)
+
+    looked_up, computed = best_of(lambda: lookup_all("")), best_of(lambda: lookup_all(" (not in catalog)"))
+    print(f"lookup: {len(catalog)} tools x {len(catalog_materials)} materials in {looked_up * 1000:.2f} ms "
+          f"from the speed table, {computed * 1000:.2f} ms computed")
+
+    row = {**catalog.rows[0], "tool_id": int(catalog.id_col.max()) + 1}
+    added_tool = CatalogTool.from_row(row, catalog.material_classes[:2])
+    material = {**catalog_materials[0], "id": 10**6, "name": "Benchmark Alloy", "name_key": "benchmark alloy"}
+    with_tool = best_of(lambda: catalog.with_tool(added_tool))
+    with_material = best_of(lambda: catalog.with_material(material))
+    rebuild = best_of(lambda: ToolCatalog.from_db(db), repeat=3)
+    print(f"update: add a tool {with_tool * 1000:.2f} ms, add a material {with_material * 1000:.2f} ms, "
+          f"full rebuild {rebuild * 1000:.1f} ms")
+
+    rng = np.random.default_rng(0)
+    tools = args.tools
+    diameter = rng.uniform(1.0, 25.4, tools)
+    flutes = rng.choice([2, 3, 4, 5, 6], tools)
+    max_rpm = rng.choice([0.0, 12000.0, 20000.0], tools)
+    max_depth = diameter * 1.5
+    speed = rng.choice([1.0, 1.2, 1.25], tools)
+    material_data, operation_data = material_arrays(materials), operation_arrays(operations)
+    elapsed = best_of(lambda: compute_cutting_data(
+        diameter, flutes, max_rpm, max_depth, speed, material_data, operation_data, 8100, 16.5
+    ), repeat=3)
+    cells = tools * len(materials) * len(operations)
+    print(f"table:  {tools:,} tools x {len(materials)} materials x {len(operations)} operations "
+          f"= {cells:,} cells in {elapsed:.2f}s ({cells / elapsed / 1e6:,.1f}M cells/s)")
+
+    engine = SpeedFeed(db)
+    tool_ids = catalog.id_col[:args.single].tolist()
+    start = time.perf_counter()
+    for i, tool_id in enumerate(tool_ids):
+        engine.calculate_speeds_feeds(tool_id, 1 + i % len(materials), operations[i % len(operations)], 1)
+    elapsed = time.perf_counter() - start
+    print(f"single: {len(tool_ids)} calls in {elapsed:.2f}s ({elapsed / len(tool_ids) * 1e6:,.0f} µs per cell)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Scaling benchmark for the feature -> tool assignment in app.services.tool_assignment.
+
+For each features x tools size, synthetic holes and tools are assigned with
+assign_features, and the result is checked against the full compatibility
+matrix: every assigned tool fits its feature, and a feature is left without a
+tool only if no tool fits it. For comparison, the classic greedy set cover over
+packed bitsets (pick the tool covering the most uncovered features, repeat) is
+run on the same matrix; it reports the tool count and time of that approach.
+
+Run from neurmill_poc_py/:
+    python -m benchmarks.tool_assignment --features 10 100 1000 --tools 100 1000 10000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.tool_assignment import assign_features
+from app.services.tool_catalog import ToolCatalog
+
+# Number of set bits in every byte value
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+def synthetic(features: int, tools: int, rng) -> tuple:
+    tool_diameters = rng.choice(np.round(np.arange(0.5, 25.5, 0.5), 1), tools)
+    tool_rows = [
+        {"tool_id": i, "diameter": float(d), "max_depth_of_cut": float(round(d * rng.uniform(1.0, 4.0), 1))}
+        for i, d in enumerate(tool_diameters)
+    ]
+    feature_rows = [
+        {"feature": "hole", "diameter": float(round(rng.uniform(1.0, 30.0), 2)),
+         "depth": float(round(rng.uniform(0.5, 60.0), 2))}
+        for _ in range(features)
+    ]
+    return tool_rows, feature_rows
+
+
+def compatibility(tools, features) -> np.ndarray:
+    diameters = np.array([t["diameter"] for t in tools])
+    reaches = np.array([t["max_depth_of_cut"] for t in tools])
+    feature_diameters, feature_depths = ToolCatalog.feature_arrays(features)
+    return (diameters[:, None] <= feature_diameters[None, :]) & (reaches[:, None] >= feature_depths[None, :])
+
+
+def greedy_set_cover(fits: np.ndarray) -> int:
+    """Tools picked by greedy set cover over bitsets of the (tools, features) matrix."""
+    bits = np.packbits(fits, axis=1)
+    uncovered = np.packbits(fits.any(axis=0))
+    picked = 0
+    while uncovered.any():
+        gains = POPCOUNT[bits & uncovered].sum(axis=1)
+        best = int(np.argmax(gains))
+        uncovered &= ~bits[best]
+        picked += 1
+    return picked
+
+
+def best_of(fn, repeat: int = 5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--tools", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'features':>8} {'tools':>6} | {'assign ms':>9} {'picked':>6} {'unfit':>5} | "
+          f"{'greedy ms':>9} {'picked':>6}")
+    for features in args.features:
+        for tools in args.tools:
+            tool_rows, feature_rows = synthetic(features, tools, rng)
+            elapsed, (picked, assigned) = best_of(lambda: assign_features(tool_rows, feature_rows))
+
+            fits = compatibility(tool_rows, feature_rows)
+            covered = assigned >= 0
+            assert fits[assigned[covered], np.flatnonzero(covered)].all(), "assigned a tool that does not fit"
+            assert not fits[:, ~covered].any(), "left a feature without a tool although one fits"
+
+            greedy_elapsed, greedy_picked = best_of(lambda: greedy_set_cover(fits), repeat=1)
+            assert len(picked) <= greedy_picked
+            print(f"{features:>8} {tools:>6} | {elapsed * 1000:>9.2f} {len(picked):>6} {(~covered).sum():>5} | "
+                  f"{greedy_elapsed * 1000:>9.2f} {greedy_picked:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Run as from neurmill_poc_py/ (frontend/, datasets are found relative to it), against a
+# throwaway database and no on-disk result cache. Set before anything imports the app.
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_DIR)
+sys.path.insert(0, PROJECT_DIR)
+os.environ["NEURAMILL_DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="neuramill-tests-"), "neuramill.db")
+os.environ["NEURAMILL_RESULT_CACHE_DB"] = ""
+os.environ["NEURAMILL_SIMULATED_CAD"] = "1"
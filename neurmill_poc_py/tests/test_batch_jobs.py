@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints.tools import parse_batch_jobs
+from app.main import app
+
+PARTS = ["a.step", "b.step"]
+
+
+def jobs(part) -> str:
+    return json.dumps([{"part": part, "material": "Steel", "machine_type": "VF-2"}])
+
+
+@pytest.mark.parametrize("part, expected", [(0, "a.step"), (1, "b.step"), ("b.step", "b.step"), ("c.step", "c.step")])
+def test_job_part_by_index_or_name(part, expected):
+    assert parse_batch_jobs(PARTS, jobs(part), None, None)[0]["part"] == expected
+
+
+@pytest.mark.parametrize("part", [-1, 2, True, False, 1.0, None, ["a.step"]])
+def test_job_part_out_of_range_or_wrong_type_is_rejected(part):
+    with pytest.raises(HTTPException) as error:
+        parse_batch_jobs(PARTS, jobs(part), None, None)
+    assert error.value.status_code == 400
+
+
+def test_duplicate_part_file_names_are_rejected():
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            files = [("cad_files", ("a.step", b"first")), ("cad_files", ("a.step", b"second"))]
+            return await client.post("/api/v1/tools/recommend/batch", files=files, data={"jobs": jobs(0)})
+
+    response = asyncio.run(post())
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Duplicate part file name: a.step"
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import numpy as np
+
+from app.services import llm_planner
+from app.services.llm_planner import StrategyPlanner, planner_prompt
+from app.services.planner_backends import FakePlannerBackend, PlannerBackend
+
+TOOLS = [{"tool_id": i, "name": f"Drill {d} mm", "type": "drill", "diameter": d, "operation_type": "drilling"}
+         for i, d in enumerate([5.0, 8.0])]
+FEATURES = [{"feature": "hole", "diameter": 5.0, "depth": 10.0}, {"feature": "hole", "diameter": 8.0, "depth": 10.0}]
+MACHINE = {"max_rpm": 12000, "max_feed": 10000.0}
+
+
+class StuckBackend(PlannerBackend):
+    """Blocks the planner's event loop, like a backend that does synchronous I/O."""
+    name = "stuck"
+
+    async def plan(self, prompt):
+        time.sleep(0.5)
+        return ["drilling"] * len(prompt["features"])
+
+
+def test_waiting_for_a_slot_counts_against_the_timeout():
+    # One slot: the second prompt waits 0.2 s for it, then would need another 0.2 s
+    planner = StrategyPlanner(FakePlannerBackend(latency=0.2, jitter=0), timeout=0.3, concurrency=1, cache_size=0)
+    try:
+        planned = planner.plan(TOOLS, FEATURES, np.array([0, 1]), "Steel", MACHINE)
+    finally:
+        planner.shutdown()
+    assert sorted(planner_name for _, planner_name in planned) == ["fake", "rules"]
+    assert planner.timeouts == 1
+
+
+def test_plan_is_bounded_when_the_event_loop_is_stuck(monkeypatch):
+    monkeypatch.setattr(llm_planner, "PLAN_GRACE", 0.1)
+    planner = StrategyPlanner(StuckBackend(), timeout=0.1, concurrency=2, cache_size=0)
+    try:
+        start = time.perf_counter()
+        planned = planner.plan(TOOLS, FEATURES, np.array([0, -1]), "Steel", MACHINE)
+        elapsed = time.perf_counter() - start
+    finally:
+        time.sleep(0.5)  # let the stuck call unwind before the loop stops
+        planner.shutdown()
+    assert elapsed < 0.4
+    assert planned == [("drilling", "rules"), None]
+
+
+def test_prompt_key_ignores_positions_and_repeats():
+    holes = [{"feature": "hole", "diameter": 5.0, "depth": 10.0, "position": [0, 0]},
+             {"feature": "hole", "diameter": 8.0, "depth": 10.0, "position": [5, 5]},
+             {"feature": "Hole", "diameter": 5.0, "depth": 10.0, "position": [9, 9]}]
+    moved = [{"feature": "hole", "diameter": 8.0, "depth": 10.0, "position": [1, 2]},
+             {"feature": "hole", "diameter": 5.0, "depth": 10.0, "position": [3, 4]}]
+    key, prompt, slots = planner_prompt(TOOLS[0], holes, "Steel", MACHINE)
+    moved_key, _, moved_slots = planner_prompt(TOOLS[0], moved, "Steel", MACHINE)
+    assert key == moved_key
+    assert prompt["features"] == [{"feature": "hole", "diameter": 5.0, "depth": 10.0},
+                                  {"feature": "hole", "diameter": 8.0, "depth": 10.0}]
+    assert (slots, moved_slots) == ([0, 1, 0], [1, 0])
+    assert planner_prompt(TOOLS[1], holes, "Steel", MACHINE)[0] != key
+
+
+def test_equal_prompts_are_answered_from_the_cache():
+    backend = FakePlannerBackend(latency=0)
+    planner = StrategyPlanner(backend, timeout=1)
+    moved = [{**feature, "position": [7, 7]} for feature in FEATURES]
+    try:
+        first = planner.plan(TOOLS, FEATURES, np.array([0, 0]), "Steel", MACHINE)
+        again = planner.plan(TOOLS, moved, np.array([0, 0]), "Steel", MACHINE)
+    finally:
+        planner.shutdown()
+    assert first == again
+    assert backend.calls == 1
+    assert (planner.cache.hits, planner.cache.misses) == (1, 1)
+
+
+def test_equal_prompts_in_flight_share_one_call():
+    backend = FakePlannerBackend(latency=0.2, jitter=0)
+    planner = StrategyPlanner(backend, timeout=1)
+
+    async def plan_twice():
+        return await asyncio.gather(*(planner.plan_async(TOOLS, FEATURES, np.array([0, 1]), "Steel", MACHINE)
+                                      for _ in range(2)))
+    try:
+        first, second = asyncio.run(plan_twice())
+    finally:
+        planner.shutdown()
+    assert first == second
+    assert [planner_name for _, planner_name in first] == ["fake", "fake"]
+    assert backend.calls == 2  # one per tool, not per request
+    assert planner.shared == 2
+
+
+def test_rule_answers_are_not_cached():
+    backend = FakePlannerBackend(latency=0.3, jitter=0)
+    planner = StrategyPlanner(backend, timeout=0.1)
+    try:
+        timed_out = planner.plan(TOOLS, FEATURES, np.array([0, -1]), "Steel", MACHINE)
+        backend.latency = 0
+        retried = planner.plan(TOOLS, FEATURES, np.array([0, -1]), "Steel", MACHINE)
+    finally:
+        planner.shutdown()
+    assert timed_out[0][1] == "rules" and retried[0][1] == "fake"
+    assert backend.calls == 2
+    assert planner.cache.hits == 0
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db import crud
+from app.db.models import Base, MaterialClass, upgrade_schema
+
+NAME_LOOKUPS = [
+    (crud.get_material_by_name, "  Aluminium 6061 ", "ix_materials_name_key"),
+    (crud.get_machine_by_title, "vf-2ss", "ix_machines_title_key"),
+    (crud.get_operation_by_name, "FACING", "ix_operations_name_key"),
+]
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'neuramill.db'}")
+    Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(MaterialClass.__table__.insert(), [{"name": "steel"}, {"name": "stainless steel"}])
+    yield engine
+    engine.dispose()
+
+
+def query_plans(engine, lookup, value) -> list[list[str]]:
+    """Run a crud lookup, then EXPLAIN QUERY PLAN every statement it sent: one list of steps per statement."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    db = sessionmaker(bind=engine)()
+    try:
+        lookup(db, value)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", capture)
+    with engine.connect() as conn:
+        return [[row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                for statement, parameters in captured]
+
+
+@pytest.mark.parametrize("lookup, value, index", NAME_LOOKUPS, ids=[l[0].__name__ for l in NAME_LOOKUPS])
+def test_name_lookup_searches_index(engine, lookup, value, index):
+    (plan,) = query_plans(engine, lookup, value)
+    assert not any(step.startswith("SCAN") for step in plan), plan
+    assert any(step.startswith("SEARCH") and f"USING INDEX {index}" in step for step in plan), plan
+
+
+def test_tools_by_material_searches_link_index(engine):
+    # Matching classes are resolved with a scan of the small material_classes table, then tools via the link index
+    classes, tools = query_plans(engine, crud.get_tools_by_material, "steel")
+    assert classes == ["SCAN material_classes"]
+    assert any("SEARCH tool_material_classes USING COVERING INDEX ix_tool_material_classes_class" in step
+               for step in tools), tools
+    assert not any(step.startswith("SCAN tool") for step in tools), tools
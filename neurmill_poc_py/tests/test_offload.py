@@ -0,0 +1,68 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+
+from app.main import app
+from app.services.offload import cpu_limiter
+
+# /health must answer this fast even with every CPU worker busy and the queue full
+HEALTH_BOUND_SECONDS = 0.5
+
+
+def test_health_responds_while_cpu_limiter_is_saturated():
+    async def scenario():
+        release = threading.Event()
+        # Blocking jobs for every worker and every queue slot; the timeout only guards a failing test
+        jobs = [asyncio.create_task(cpu_limiter.run(release.wait, 10)) for _ in range(cpu_limiter.max_in_flight)]
+        await asyncio.sleep(0)
+        try:
+            assert cpu_limiter.in_flight == cpu_limiter.max_in_flight
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                start = time.perf_counter()
+                health = await client.get("/api/v1/health")
+                elapsed = time.perf_counter() - start
+                rejected = await client.post("/api/v1/preview-features", files={"file": ("part.step", b"ISO-10303-21;")})
+        finally:
+            release.set()
+            await asyncio.gather(*jobs)
+        return health, elapsed, rejected
+
+    health, elapsed, rejected = asyncio.run(scenario())
+    assert health.status_code == 200
+    assert health.json() == {"status": "ok"}
+    assert elapsed < HEALTH_BOUND_SECONDS
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert cpu_limiter.in_flight == 0
+
+
+def test_batch_is_admitted_before_streaming():
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            files = [("cad_files", ("a.step", b"ISO-10303-21;"))]
+            data = {"materials": ["Unknown alloy"], "machine_types": ["VF-2"]}
+
+            release = threading.Event()
+            jobs = [asyncio.create_task(cpu_limiter.run(release.wait, 10)) for _ in range(cpu_limiter.max_in_flight)]
+            await asyncio.sleep(0)
+            try:
+                busy = await client.post("/api/v1/tools/recommend/batch", files=files, data=data)
+            finally:
+                release.set()
+                await asyncio.gather(*jobs)
+
+            streamed = await client.post("/api/v1/tools/recommend/batch", files=files, data=data)
+        return busy, streamed
+
+    busy, streamed = asyncio.run(scenario())
+    # Rejected as a whole with a proper 429, not a 200 cut short
+    assert busy.status_code == 429
+    assert int(busy.headers["Retry-After"]) >= 1
+    assert streamed.status_code == 200
+    assert [json.loads(line)["error"] for line in streamed.text.splitlines()] == ["Material not found."]
+    assert cpu_limiter.in_flight == 0
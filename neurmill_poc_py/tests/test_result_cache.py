@@ -0,0 +1,19 @@
+from app.services.llm_planner import StrategyPlanner
+from app.services.planner_backends import FakePlannerBackend, PlannerBackend
+from app.services.result_cache import ResultCache, result_key
+
+
+class ModelBackend(PlannerBackend):
+    name = "openai"
+    model = "gpt-4o-mini"
+
+
+def test_results_are_not_shared_across_planner_backends(tmp_path):
+    fake, model = StrategyPlanner(FakePlannerBackend()), StrategyPlanner(ModelBackend())
+    assert (fake.backend_id(), model.backend_id()) == ("fake", "openai:gpt-4o-mini")
+
+    cache = ResultCache(str(tmp_path / "results.db"))
+    cache.put(result_key("part", "Steel", "VF-2", fake.backend_id(), "catalog"), "catalog", [{"planner": "fake"}])
+    restarted = ResultCache(str(tmp_path / "results.db"))
+    assert restarted.get(result_key("part", "steel", "VF-2", model.backend_id(), "catalog")) is None
+    assert restarted.get(result_key("part", "steel", "VF-2", fake.backend_id(), "catalog")) == [{"planner": "fake"}]
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from app.services import tool_catalog
+
+
+class FakeCatalog:
+    source = "db"
+
+    def __len__(self):
+        return 0
+
+
+def test_loading_the_catalog_does_not_hold_the_lease_lock(monkeypatch):
+    monkeypatch.setattr(tool_catalog, "_current", None)
+    monkeypatch.setattr(tool_catalog, "_draining", {})
+    loading, release = threading.Semaphore(0), threading.Event()
+    loaded = []
+
+    def slow_load(db):
+        loading.release()
+        release.wait(5)
+        loaded.append(FakeCatalog())
+        return loaded[-1]
+
+    monkeypatch.setattr(tool_catalog, "load_catalog", slow_load)
+    leased = []
+
+    def lease():
+        with tool_catalog.catalog_lease(None) as catalog:
+            leased.append(catalog)
+
+    first, second = threading.Thread(target=lease), threading.Thread(target=lease)
+    first.start()
+    assert loading.acquire(timeout=5)
+    start = time.perf_counter()
+    assert tool_catalog.catalog_status()["version"] is None
+    assert time.perf_counter() - start < 0.5
+    second.start()
+    assert loading.acquire(timeout=5)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    # Both loads finished, but only one version was installed and both requests leased it
+    assert len(loaded) == 2 and leased[0] is leased[1]
+    assert tool_catalog.catalog_status()["leases"] == 0